@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from word_counter_dsc.config import (
+    ANNOUNCE_CHANNEL_INTERVAL_SECONDS,
+    ANNOUNCE_COALESCE_SECONDS,
+    ANNOUNCE_CONCURRENCY,
+    ANNOUNCE_MAX_PENDING,
+)
+
+logger = logging.getLogger("word_counter_dsc.announcements")
+
+# send(channel_id, items) -> None; items are the queued values in submit order.
+SendFn = Callable[[int, list], Awaitable[None]]
+
+
+class AnnouncementQueue:
+    """Background, per-channel send queue for bot announcements (medal congrats).
+
+    ``submit()`` never waits on Discord: it records the item and makes sure the channel has
+    a sender task. That task waits ``coalesce`` seconds (and at least ``interval`` since the
+    channel's previous send), then hands everything queued for the channel to ``send`` as
+    one batch, so a burst of unlocks becomes one message. Items submitted again under the
+    same key before they are sent replace the older one (e.g. a user crossing two tiers of
+    a keyword only gets the higher one announced).
+
+    At most ``concurrency`` channels send at once. If ``send`` raises an error carrying
+    ``retry_after`` (discord.RateLimited, or a 429 surfaced by discord.py), the batch is put
+    back and the channel waits that long; any other error drops the batch and is logged.
+    """
+
+    def __init__(
+        self,
+        send: SendFn,
+        coalesce: float = ANNOUNCE_COALESCE_SECONDS,
+        interval: float = ANNOUNCE_CHANNEL_INTERVAL_SECONDS,
+        max_pending: int = ANNOUNCE_MAX_PENDING,
+        concurrency: int = ANNOUNCE_CONCURRENCY,
+    ):
+        self.send = send
+        self.coalesce = max(0.0, float(coalesce))
+        self.interval = max(0.0, float(interval))
+        self.max_pending = max(1, int(max_pending))
+
+        # channel_id -> {key: item}, in submit order (a replaced key moves to the end)
+        self._pending: dict[int, dict[Hashable, Any]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        # channel_id -> monotonic time the channel may send again
+        self._next_send: dict[int, float] = {}
+        self._sem = asyncio.Semaphore(max(1, int(concurrency)))
+        self._wake = asyncio.Event()
+        self._depth = 0
+        self._closing = False
+
+        # Metrics
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.messages = 0
+        self.delivered = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.max_depth = 0
+
+    def submit(self, channel_id: int, key: Hashable, item: Any) -> bool:
+        """Queue ``item`` for ``channel_id``. Returns False if it was dropped."""
+        if self._closing:
+            self.dropped += 1
+            return False
+        channel_id = int(channel_id)
+        pending = self._pending.get(channel_id)
+        if pending is not None and key in pending:
+            del pending[key]
+            self.coalesced += 1
+        elif self._depth >= self.max_pending:
+            self.dropped += 1
+            return False
+        else:
+            self._depth += 1
+        self._pending.setdefault(channel_id, {})[key] = item
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._depth)
+
+        task = self._tasks.get(channel_id)
+        if task is None or task.done():
+            self._tasks[channel_id] = asyncio.create_task(self._drain(channel_id), name=f"announce-{channel_id}")
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self._depth,
+            "max_depth": self.max_depth,
+            "channels": len(self._pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "messages": self.messages,
+            "delivered": self.delivered,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
+
+    async def _wait(self, delay: float) -> None:
+        """Sleep ``delay`` seconds, or less if the queue starts closing."""
+        if delay <= 0 or self._closing:
+            return
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def _requeue(self, channel_id: int, batch: dict[Hashable, Any]) -> None:
+        # Anything submitted meanwhile is newer and wins over the returned items.
+        newer = self._pending.get(channel_id, {})
+        merged = {**batch, **newer}
+        self._depth += len(merged) - len(newer)
+        self._pending[channel_id] = merged
+
+    async def _drain(self, channel_id: int) -> None:
+        try:
+            while self._pending.get(channel_id):
+                wait_until = max(time.monotonic() + self.coalesce, self._next_send.get(channel_id, 0.0))
+                await self._wait(wait_until - time.monotonic())
+                async with self._sem:
+                    batch = self._pending.pop(channel_id, None)
+                    if not batch:
+                        break
+                    self._depth -= len(batch)
+                    try:
+                        await self.send(channel_id, list(batch.values()))
+                    except Exception as e:
+                        retry_after = getattr(e, "retry_after", None)
+                        if retry_after is None or self._closing:
+                            self.failures += 1
+                            logger.exception("Announcement to channel %s failed (%d item(s))", channel_id, len(batch))
+                        else:
+                            self.rate_limited += 1
+                            self._requeue(channel_id, batch)
+                            self._next_send[channel_id] = time.monotonic() + float(retry_after)
+                            continue
+                    else:
+                        self.messages += 1
+                        self.delivered += len(batch)
+                    self._next_send[channel_id] = time.monotonic() + self.interval
+        finally:
+            if self._tasks.get(channel_id) is asyncio.current_task():
+                del self._tasks[channel_id]
+            if self._next_send.get(channel_id, 0.0) <= time.monotonic():
+                self._next_send.pop(channel_id, None)
+
+    async def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop accepting items and send what is queued now (ignoring the coalesce/interval waits)."""
+        self._closing = True
+        self._wake.set()
+        tasks = list(self._tasks.values())
+        if tasks:
+            _done, stuck = await asyncio.wait(tasks, timeout=timeout)
+            for t in stuck:
+                t.cancel()
+            if stuck:
+                logger.warning("Announcement queue close timed out with %d item(s) left", self._depth)
+                await asyncio.gather(*stuck, return_exceptions=True)
+        self._tasks = {}
@@ -0,0 +1,190 @@
+"""Unicode emoji extraction benchmark.
+
+Compares emoji_data.extract_emojis (one precompiled regex scan) against a frozen
+copy of the original per-codepoint extractor from cogs/emoji_stats.py on a synthetic
+chat corpus, and checks that multi-codepoint sequences come back as single emoji.
+
+    python -m word_counter_dsc.benchmarks.bench_emoji [--messages 100000] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import unicodedata
+from typing import List
+
+from word_counter_dsc.emoji_data import extract_emojis
+
+# ---------------------------------------------------------------------------
+# Reference implementation (verbatim copy of the pre-table extractor)
+# ---------------------------------------------------------------------------
+def reference_extract_unicode_emojis(text: str) -> list[str]:
+    """Best-effort unicode emoji extractor.
+
+    We intentionally avoid extra deps. This catches the most common emoji blocks
+    (including flags) and is safe (won't crash on odd unicode).
+    """
+    if not text:
+        return []
+
+    out: list[str] = []
+
+    def is_emoji_cp(cp: int) -> bool:
+        # Common emoji ranges
+        return (
+            0x1F300 <= cp <= 0x1FAFF
+            or 0x2600 <= cp <= 0x26FF
+            or 0x2700 <= cp <= 0x27BF
+            or 0x1F000 <= cp <= 0x1F02F
+            or 0x1F1E6 <= cp <= 0x1F1FF  # regional indicators (flags)
+            or 0xFE00 <= cp <= 0xFE0F  # variation selectors
+            or 0x200D == cp  # ZWJ
+            or 0x20E3 == cp  # keycap
+        )
+
+    # Build simple sequences for:
+    # - flags (regional indicator pairs)
+    # - ZWJ sequences (e.g., family emojis)
+    # - keycaps
+    i = 0
+    s = text
+    n = len(s)
+    while i < n:
+        cp = ord(s[i])
+
+        # Flag: two regional indicators
+        if 0x1F1E6 <= cp <= 0x1F1FF and i + 1 < n:
+            cp2 = ord(s[i + 1])
+            if 0x1F1E6 <= cp2 <= 0x1F1FF:
+                out.append(s[i : i + 2])
+                i += 2
+                continue
+
+        # Keycap: [0-9#*] + optional VS16 + keycap
+        if s[i] in "0123456789#*":
+            j = i + 1
+            if j < n and ord(s[j]) == 0xFE0F:
+                j += 1
+            if j < n and ord(s[j]) == 0x20E3:
+                out.append(s[i : j + 1])
+                i = j + 1
+                continue
+
+        # Single codepoint emoji (and allow ZWJ chains)
+        if is_emoji_cp(cp):
+            j = i + 1
+            # consume VS16/ZWJ chains conservatively
+            while j < n and is_emoji_cp(ord(s[j])):
+                j += 1
+            emoji = s[i:j]
+            # Filter out pure modifiers/selectors
+            if any(0x1F300 <= ord(ch) <= 0x1FAFF or 0x2600 <= ord(ch) <= 0x27BF for ch in emoji):
+                out.append(emoji)
+            i = j
+            continue
+
+        i += 1
+
+    # Final cleanup: drop empty / whitespace / non-emoji
+    cleaned: list[str] = []
+    for e in out:
+        if not e or e.isspace():
+            continue
+        # defensive: some sequences might include only selectors
+        if any("EMOJI" in unicodedata.name(ch, "") for ch in e):
+            cleaned.append(e)
+        else:
+            # keep common pictographs anyway
+            if any(0x1F300 <= ord(ch) <= 0x1FAFF or 0x2600 <= ord(ch) <= 0x27BF for ch in e):
+                cleaned.append(e)
+    return cleaned
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+_WORDS = "lol bro the game gg pizza ok yes no idk based fr ngl tbh brb hello WORLD 2024 #1".split()
+
+_EMOJI = [
+    "😂", "🔥", "❤️", "❤", "👍", "👍🏽", "🙏🏿", "✨", "✅", "🫠", "🥹", "☕", "⭐",
+    "🇮🇳", "🇺🇸", "1️⃣", "#️⃣", "👨\u200d👩\u200d👧\u200d👦", "🏳️\u200d🌈", "👩🏽\u200d💻",
+    "🏴\U000E0067\U000E0062\U000E0073\U000E0063\U000E0074\U000E007F",
+]
+
+# Sequences that must each come back as exactly one emoji.
+SEQUENCES = {
+    "flag": "🇮🇳",
+    "keycap": "1️⃣",
+    "bare keycap": "#\u20e3",
+    "skin tone": "👍🏽",
+    "zwj family": "👨\u200d👩\u200d👧\u200d👦",
+    "zwj profession + tone": "👩🏽\u200d💻",
+    "zwj flag": "🏳️\u200d🌈",
+    "subdivision flag": "🏴\U000E0067\U000E0062\U000E0065\U000E006E\U000E0067\U000E007F",
+    "text symbol + VS16": "©️",
+}
+
+
+def build_corpus(n_messages: int, seed: int = 7, emoji_share: float = 0.4) -> List[str]:
+    """Chat lines where roughly ``emoji_share`` of messages contain emoji."""
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n_messages):
+        parts = [rnd.choice(_WORDS) for _ in range(rnd.randint(1, 14))]
+        if rnd.random() < emoji_share:
+            for _ in range(rnd.randint(1, 4)):
+                parts.insert(rnd.randint(0, len(parts)), rnd.choice(_EMOJI))
+        out.append(" ".join(parts))
+    return out
+
+
+def check_sequences() -> int:
+    for label, seq in SEQUENCES.items():
+        got = extract_emojis(f"a {seq} b")
+        if got != [seq]:
+            raise AssertionError(f"{label}: expected one emoji {seq!r}, got {got!r}")
+    return len(SEQUENCES)
+
+
+def _time(fn, corpus: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for msg in corpus:
+            fn(msg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"sequences: OK ({check_sequences()} multi-codepoint sequences matched whole)")
+
+    corpus = build_corpus(args.messages, args.seed)
+    same = sum(1 for m in corpus if extract_emojis(m) == reference_extract_unicode_emojis(m))
+    # The reference glues adjacent emoji together and drops flags/keycaps, so outputs differ on purpose.
+    print(f"identical output: {same}/{len(corpus)} messages")
+
+    ref = _time(reference_extract_unicode_emojis, corpus, args.repeat)
+    new = _time(extract_emojis, corpus, args.repeat)
+    with_emoji = [m for m in corpus if not m.isascii()]
+    ref_e = _time(reference_extract_unicode_emojis, with_emoji, args.repeat)
+    new_e = _time(extract_emojis, with_emoji, args.repeat)
+
+    def row(label: str, n: int, a: float, b: float) -> str:
+        return f"{label:<12} {n:>9} msgs  reference {a * 1e6 / max(n, 1):7.2f} us/msg  current {b * 1e6 / max(n, 1):7.2f} us/msg  speedup x{a / b:5.2f}"
+
+    print(row("mixed", len(corpus), ref, new))
+    print(row("with emoji", len(with_emoji), ref_e, new_e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Query-plan + latency + size benchmark for the word count read/purge paths.
+
+Builds a synthetic SQLite database with the bot's base schema (text ``word`` columns, primary
+keys only) and runs the original query shapes used by /rank, /search, /top, /me, the medal
+total lookup and stopword purges. It then applies the startup migrations
+(database.MIGRATIONS: indexes, user/guild rollups, interned word ids) and runs the queries the
+bot issues now. Prints the EXPLAIN QUERY PLAN for each, the median latency, and the size of
+the count tables and their indexes before and after.
+
+    python -m word_counter_dsc.benchmarks.bench_queries [--guilds 20] [--rows 400000] [--runs 30]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from word_counter_dsc.database import MIGRATIONS, SCHEMA_SQLITE
+
+# (label, statements, params) -- every statement runs with the same params.
+Query = Tuple[str, Sequence[str], Tuple[Any, ...]]
+
+_WID = "(SELECT word_id FROM words WHERE word=?)"
+
+
+def build_db(path: str, guilds: int, rows: int, seed: int) -> Tuple[int, int, str]:
+    """Fill word_counts with a Zipf-ish vocabulary; returns (guild_id, user_id, word) of a busy key."""
+    rnd = random.Random(seed)
+    vocab = [f"word{i:05d}" for i in range(20000)]
+    cum, acc = [], 0.0
+    for i in range(len(vocab)):
+        acc += 1.0 / (i + 1)
+        cum.append(acc)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQLITE)
+    data = {}
+    gids = [1000 + g for g in range(guilds)]
+    for _ in range(rows):
+        gid = rnd.choice(gids)
+        key = (gid, rnd.randrange(30), rnd.randrange(500), rnd.choices(vocab, cum_weights=cum)[0])
+        data[key] = data.get(key, 0) + rnd.randint(1, 5)
+    conn.executemany(
+        "INSERT INTO word_counts (guild_id, channel_id, user_id, word, count, updated_at) VALUES (?, ?, ?, ?, ?, 0)",
+        [(g, c, u, w, n) for (g, c, u, w), n in data.items()],
+    )
+    conn.executemany(
+        "INSERT INTO keywords (guild_id, word, created_at) VALUES (?, ?, 0)",
+        [(g, w) for g in gids for w in vocab[:25]],
+    )
+    conn.commit()
+    conn.close()
+    return gids[0], 7, vocab[3]
+
+
+def base_queries(gid: int, uid: int, word: str) -> List[Query]:
+    """The original reads/purges: GROUP BY over per-channel rows keyed by word text."""
+    return [
+        (
+            "rank/search top users",
+            ["SELECT user_id, SUM(count) AS total FROM word_counts WHERE guild_id=? AND word=? "
+             "GROUP BY user_id ORDER BY total DESC LIMIT 10"],
+            (gid, word),
+        ),
+        ("search total", ["SELECT SUM(count) AS total FROM word_counts WHERE guild_id=? AND word=?"], (gid, word)),
+        (
+            "medal user total",
+            ["SELECT COALESCE(SUM(count), 0) AS total FROM word_counts WHERE guild_id=? AND user_id=? AND word=?"],
+            (gid, uid, word),
+        ),
+        (
+            "top words for user",
+            ["SELECT word, SUM(count) AS total FROM word_counts WHERE guild_id=? AND user_id=? "
+             "GROUP BY word ORDER BY total DESC LIMIT 30"],
+            (gid, uid),
+        ),
+        (
+            "top words for server",
+            ["SELECT word, SUM(count) AS total FROM word_counts WHERE guild_id=? "
+             "GROUP BY word ORDER BY total DESC LIMIT 30"],
+            (gid,),
+        ),
+        (
+            "/me keyword totals",
+            ["SELECT wc.word AS keyword, SUM(wc.count) AS total FROM word_counts wc "
+             "JOIN keywords k ON k.guild_id = wc.guild_id AND k.word = wc.word "
+             "WHERE wc.guild_id=? AND wc.user_id=? GROUP BY wc.word ORDER BY total DESC"],
+            (gid, uid),
+        ),
+        ("stopword purge (guild)", ["DELETE FROM word_counts WHERE guild_id=? AND word=?"], (gid, word)),
+        ("core stopword purge", ["DELETE FROM word_counts WHERE word=?"], (word,)),
+    ]
+
+
+def current_queries(gid: int, uid: int, word: str) -> List[Query]:
+    """The same operations as the bot runs them now (rollups + word ids); labels match base_queries()."""
+    purge_tables = ("word_counts", "user_word_totals", "guild_word_totals")
+    return [
+        (
+            "rank/search top users",
+            [f"SELECT user_id, count AS total FROM user_word_totals WHERE guild_id=? AND word_id={_WID} "
+             "AND count > 0 ORDER BY count DESC LIMIT 10"],
+            (gid, word),
+        ),
+        (
+            "search total",
+            [f"SELECT count AS total FROM guild_word_totals WHERE guild_id=? AND word_id={_WID}"],
+            (gid, word),
+        ),
+        (
+            "medal user total",
+            [f"SELECT count AS total FROM user_word_totals WHERE guild_id=? AND user_id=? AND word_id={_WID}"],
+            (gid, uid, word),
+        ),
+        (
+            "top words for user",
+            ["SELECT w.word, t.count AS total FROM user_word_totals t JOIN words w ON w.word_id = t.word_id "
+             "WHERE t.guild_id=? AND t.user_id=? ORDER BY t.count DESC LIMIT 30"],
+            (gid, uid),
+        ),
+        (
+            "top words for server",
+            ["SELECT w.word, t.count AS total FROM guild_word_totals t JOIN words w ON w.word_id = t.word_id "
+             "WHERE t.guild_id=? ORDER BY t.count DESC LIMIT 30"],
+            (gid,),
+        ),
+        (
+            "/me keyword totals",
+            ["SELECT k.word AS keyword, t.count AS total FROM keywords k JOIN words w ON w.word = k.word "
+             "JOIN user_word_totals t ON t.guild_id = k.guild_id AND t.user_id=? AND t.word_id = w.word_id "
+             "WHERE k.guild_id=? ORDER BY total DESC"],
+            (uid, gid),
+        ),
+        (
+            "stopword purge (guild)",
+            [f"DELETE FROM {t} WHERE guild_id=? AND word_id={_WID}" for t in purge_tables],
+            (gid, word),
+        ),
+        (
+            "core stopword purge",
+            [f"DELETE FROM {t} WHERE word_id IN (SELECT word_id FROM words WHERE word IN (?))" for t in purge_tables],
+            (word,),
+        ),
+    ]
+
+
+def _time(fn: Callable[[], Any], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples)
+
+
+def measure(path: str, qs: List[Query], runs: int) -> Dict[str, Tuple[str, float]]:
+    conn = sqlite3.connect(path, isolation_level=None)
+    out = {}
+    for label, stmts, params in qs:
+        plan = " || ".join(
+            " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)) for sql in stmts
+        )
+        if stmts[0].startswith("DELETE"):
+            def run(stmts=stmts, params=params):
+                # Measure the delete without losing the rows for the next run.
+                conn.execute("BEGIN")
+                for sql in stmts:
+                    conn.execute(sql, params)
+                conn.execute("ROLLBACK")
+        else:
+            def run(stmts=stmts, params=params):
+                conn.execute(stmts[0], params).fetchall()
+        run()  # warm the page cache
+        out[label] = (plan, _time(run, runs))
+    conn.close()
+    return out
+
+
+def sizes(path: str) -> Dict[str, int]:
+    """Bytes per table/index of the word count tables (dbstat), plus the whole file."""
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    except sqlite3.OperationalError:
+        rows = []  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+    conn.close()
+    out = {name: int(n) for name, n in rows if "word" in name}
+    out["(file)"] = os.path.getsize(path)
+    return out
+
+
+def apply_migrations(path: str) -> None:
+    conn = sqlite3.connect(path)
+    for _version, _desc, statements in MIGRATIONS:
+        for stmt in statements.get("sqlite", []):
+            conn.execute(stmt)
+        conn.commit()
+    conn.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--guilds", type=int, default=20)
+    ap.add_argument("--rows", type=int, default=400_000)
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        gid, uid, word = build_db(path, args.guilds, args.rows, args.seed)
+        n = sqlite3.connect(path).execute("SELECT COUNT(*) FROM word_counts").fetchone()[0]
+        print(f"word_counts rows: {n:,} across {args.guilds} guilds (built in {time.perf_counter() - t0:.1f}s)\n")
+
+        size_before = sizes(path)
+        before = measure(path, base_queries(gid, uid, word), args.runs)
+        t0 = time.perf_counter()
+        apply_migrations(path)
+        print(f"migrations applied in {(time.perf_counter() - t0) * 1000.0:.0f} ms\n")
+        size_after = sizes(path)
+        after = measure(path, current_queries(gid, uid, word), args.runs)
+
+        for label, (plan_b, ms_b) in before.items():
+            plan_a, ms_a = after[label]
+            print(f"{label}")
+            print(f"  before: {ms_b:8.3f} ms  {plan_b}")
+            print(f"  after:  {ms_a:8.3f} ms  {plan_a}")
+            print(f"  speedup: {ms_b / ms_a if ms_a else float('inf'):.1f}x\n")
+
+        print("sizes (KiB)")
+        for name in sorted(set(size_before) | set(size_after)):
+            b, a = size_before.get(name), size_after.get(name)
+            cols = [f"{v / 1024:10,.0f}" if v is not None else f"{'-':>10}" for v in (b, a)]
+            print(f"  {name:<36} before {cols[0]}  after {cols[1]}")
+
+
+if __name__ == "__main__":
+    main()
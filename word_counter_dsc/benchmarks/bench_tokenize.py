@@ -0,0 +1,143 @@
+"""Tokenizer benchmark + equivalence check.
+
+Compares utils.tokenize / normalize_word against a frozen copy of the original
+implementation (NFKC on every message and every token, no memoization) on a
+synthetic chat corpus, and fails loudly if any output differs.
+
+    python -m word_counter_dsc.benchmarks.bench_tokenize [--messages 200000] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+from typing import List
+
+from word_counter_dsc.utils import normalize_word, tokenize
+
+# ---------------------------------------------------------------------------
+# Reference implementation (verbatim behaviour of the pre-fast-path tokenizer)
+# ---------------------------------------------------------------------------
+_REF_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z0-9]+)*|[\u0900-\u097F]+", re.UNICODE)
+_REF_CONTRACTION_RE = re.compile(r"^([a-z]+)(?:'(?:d|ll|ve|re|m|s|t))$", re.IGNORECASE)
+
+
+def reference_normalize_word(w: str) -> str:
+    if not w:
+        return ""
+    w = unicodedata.normalize("NFKC", w)
+    w = w.replace("’", "'").replace("‘", "'")
+    w = w.casefold()
+    w = re.sub(r"^[^\w\u0900-\u097F']+|[^\w\u0900-\u097F']+$", "", w)
+    m = _REF_CONTRACTION_RE.match(w)
+    if m:
+        w = m.group(1)
+    return w
+
+
+def reference_tokenize(s: str) -> List[str]:
+    s = (s or "").strip()
+    if not s:
+        return []
+    s = unicodedata.normalize("NFKC", s).replace("’", "'").replace("‘", "'")
+    out: List[str] = []
+    for t in _REF_TOKEN_RE.findall(s):
+        nt = reference_normalize_word(t)
+        if nt:
+            out.append(nt)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+_ASCII_WORDS = (
+    "lol lmao bro the and you i it that is was what why how ok okay yes no nah "
+    "pizza game gg wp noob pog based cringe fr ngl tbh idk imo brb afk sus "
+    "they'd he'll it's can't don't won't i'm we're you've she's o'clock rock'n'roll "
+    "Hello WORLD LoVe USER123 19 2024 x1 a1b2 hahaha HAHAHA"
+).split()
+
+_UNICODE_WORDS = [
+    "café", "naïve", "Straße", "İstanbul", "ﬁne", "ＨＥＬＬＯ", "ｆｕｌｌｗｉｄｔｈ", "it’s", "they’d", "‘quoted’",
+    "नमस्ते", "क्या", "हाँ", "Ωmega", "Ⅻ", "①", "ｘ２", "ǅemal", "ﬀ", "école",
+]
+
+_PUNCT = ["", "", "", "!", "?", "...", ",", ".", "!!!", " :)", " <:pepe:123>", " 😂", " 👍🏽", " https://x.y/z?q=1"]
+
+
+def build_corpus(n_messages: int, seed: int = 7, unicode_share: float = 0.15) -> List[str]:
+    """Mostly-ASCII chat lines with a configurable share of messages containing Unicode."""
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n_messages):
+        n = rnd.randint(1, 14)
+        words = []
+        use_unicode = rnd.random() < unicode_share
+        for _ in range(n):
+            if use_unicode and rnd.random() < 0.3:
+                w = rnd.choice(_UNICODE_WORDS)
+            else:
+                w = rnd.choice(_ASCII_WORDS)
+            if rnd.random() < 0.1:
+                w = w.upper()
+            words.append(w + rnd.choice(_PUNCT))
+        out.append(" ".join(words))
+    # Edge cases appended verbatim
+    out.extend(["", "   ", "!!! ... ???", "I'm 19, it's fine. user123", "'''", "’’’", "a’b’c", "ＡＢＣ’ｓ"])
+    return out
+
+
+def check_equivalence(corpus: List[str]) -> int:
+    """Return the number of messages checked; raise on the first mismatch."""
+    for msg in corpus:
+        got = tokenize(msg)
+        want = reference_tokenize(msg)
+        if got != want:
+            raise AssertionError(f"tokenize mismatch for {msg!r}: {got!r} != {want!r}")
+        for part in msg.split():
+            if normalize_word(part) != reference_normalize_word(part):
+                raise AssertionError(f"normalize_word mismatch for {part!r}")
+    return len(corpus)
+
+
+def _time(fn, corpus: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for msg in corpus:
+            fn(msg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=200_000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    corpus = build_corpus(args.messages, args.seed)
+    checked = check_equivalence(corpus)
+    print(f"equivalence: OK ({checked} messages, outputs identical to reference)")
+
+    ref = _time(reference_tokenize, corpus, args.repeat)
+    new = _time(tokenize, corpus, args.repeat)
+    ascii_only = [m for m in corpus if m.isascii()]
+    ref_a = _time(reference_tokenize, ascii_only, args.repeat)
+    new_a = _time(tokenize, ascii_only, args.repeat)
+
+    def row(label: str, n: int, a: float, b: float) -> str:
+        return f"{label:<12} {n:>9} msgs  reference {a * 1e6 / max(n, 1):7.2f} us/msg  current {b * 1e6 / max(n, 1):7.2f} us/msg  speedup x{a / b:5.2f}"
+
+    print(row("mixed", len(corpus), ref, new))
+    print(row("ascii-only", len(ascii_only), ref_a, new_a))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
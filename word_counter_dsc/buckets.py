@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from word_counter_dsc.config import (
+    BUCKET_DAILY_RETENTION_DAYS,
+    BUCKET_MONTHLY_RETENTION_MONTHS,
+    BUCKET_WEEKLY_RETENTION_WEEKS,
+)
+
+# word_buckets / emoji_buckets ``grain`` values; ``bucket`` is the UTC start of the period.
+GRAIN_DAY = 0
+GRAIN_WEEK = 1
+GRAIN_MONTH = 2
+
+DAY = 86400
+WEEK = 7 * DAY
+
+_UPSERT_WORD_BUCKET_SQL = """
+INSERT INTO word_buckets (guild_id, grain, bucket, word_id, user_id, count)
+VALUES (?, 0, ?, ?, ?, ?)
+ON CONFLICT(guild_id, grain, bucket, word_id, user_id)
+DO UPDATE SET count = word_buckets.count + excluded.count
+"""
+
+_UPSERT_GUILD_WORD_BUCKET_SQL = """
+INSERT INTO guild_word_buckets (guild_id, grain, bucket, word_id, count)
+VALUES (?, 0, ?, ?, ?)
+ON CONFLICT(guild_id, grain, bucket, word_id)
+DO UPDATE SET count = guild_word_buckets.count + excluded.count
+"""
+
+_UPSERT_EMOJI_BUCKET_SQL = """
+INSERT INTO emoji_buckets (guild_id, grain, bucket, custom, emoji, user_id, count)
+VALUES (?, 0, ?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, grain, bucket, custom, emoji, user_id)
+DO UPDATE SET count = emoji_buckets.count + excluded.count
+"""
+
+# Bucket tables -> their key columns after (guild_id, grain, bucket).
+_BUCKET_TABLES = {
+    "word_buckets": ("word_id", "user_id"),
+    "guild_word_buckets": ("word_id",),
+    "emoji_buckets": ("custom", "emoji", "user_id"),
+}
+
+
+def day_start(ts: int) -> int:
+    """UTC midnight at or before ``ts``."""
+    ts = int(ts)
+    return ts - ts % DAY
+
+
+def week_start(ts: int) -> int:
+    """UTC Monday midnight at or before ``ts`` (1970-01-01 was a Thursday)."""
+    d = day_start(ts)
+    return d - ((d // DAY + 3) % 7) * DAY
+
+
+def month_start(ts: int, shift: int = 0) -> int:
+    """UTC first of the month containing ``ts``, moved ``shift`` months forward/back."""
+    dt = datetime.fromtimestamp(int(ts), tz=timezone.utc)
+    m = dt.year * 12 + dt.month - 1 + shift
+    return int(datetime(m // 12, m % 12 + 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+async def upsert_word_buckets(tx: Any, rows: Iterable[tuple[int, int, int, int, int]]) -> None:
+    """Add (guild_id, user_id, word_id, day, count) rows onto the daily word buckets
+    (per user, and summed per guild).
+
+    ``day`` is any timestamp inside the day (the message time, not the write time).
+    """
+    agg: dict[tuple[int, int, int, int], int] = {}
+    per_guild: dict[tuple[int, int, int], int] = {}
+    for gid, uid, wid, ts, c in rows:
+        key = (int(gid), day_start(ts), int(wid), int(uid))
+        agg[key] = agg.get(key, 0) + int(c)
+        per_guild[key[:3]] = per_guild.get(key[:3], 0) + int(c)
+    if agg:
+        await tx.executemany(_UPSERT_WORD_BUCKET_SQL, [(*key, c) for key, c in agg.items()])
+        await tx.executemany(_UPSERT_GUILD_WORD_BUCKET_SQL, [(*key, c) for key, c in per_guild.items()])
+
+
+async def upsert_emoji_buckets(tx: Any, rows: Iterable[tuple[int, int, bool, str, int, int]]) -> None:
+    """Add (guild_id, user_id, custom, emoji, day, count) rows onto the daily emoji buckets."""
+    agg: dict[tuple[int, int, int, str, int], int] = {}
+    for gid, uid, custom, emoji, ts, c in rows:
+        key = (int(gid), day_start(ts), 1 if custom else 0, str(emoji), int(uid))
+        agg[key] = agg.get(key, 0) + int(c)
+    if agg:
+        await tx.executemany(_UPSERT_EMOJI_BUCKET_SQL, [(*key, c) for key, c in agg.items()])
+
+
+def _cutoffs(now: int) -> tuple[int, int, Optional[int]]:
+    """(days before this compact into weeks, weeks before this into months, months before this are dropped)."""
+    # Aligned to a week start, so only complete weeks are ever compacted.
+    day_cut = week_start(day_start(now) - BUCKET_DAILY_RETENTION_DAYS * DAY)
+    week_cut = week_start(now) - BUCKET_WEEKLY_RETENTION_WEEKS * WEEK
+    month_cut = month_start(now, -BUCKET_MONTHLY_RETENTION_MONTHS) if BUCKET_MONTHLY_RETENTION_MONTHS > 0 else None
+    return day_cut, week_cut, month_cut
+
+
+async def _roll_up(dbx: Any, table: str, guild_id: int, src: int, dst: int, cutoff: int) -> int:
+    """Merge a guild's ``src``-grain buckets older than ``cutoff`` into ``dst``-grain ones. Returns targets written."""
+    keys = _BUCKET_TABLES[table]
+    cols = ", ".join(keys)
+    rows = await dbx.fetchall(
+        f"SELECT DISTINCT bucket FROM {table} WHERE guild_id=? AND grain=? AND bucket < ?",
+        (guild_id, src, cutoff),
+    )
+    to_target = week_start if dst == GRAIN_WEEK else month_start
+    # Each target covers one contiguous range of source buckets.
+    ranges: dict[int, list[int]] = {}
+    for r in rows:
+        b = int(r["bucket"])
+        span = ranges.setdefault(to_target(b), [b, b])
+        span[0], span[1] = min(span[0], b), max(span[1], b)
+
+    for target, (lo, hi) in sorted(ranges.items()):
+        async with dbx.transaction() as tx:
+            await tx.execute(
+                f"""
+                INSERT INTO {table} (guild_id, grain, bucket, {cols}, count)
+                SELECT guild_id, ?, ?, {cols}, SUM(count)
+                FROM {table} WHERE guild_id=? AND grain=? AND bucket >= ? AND bucket <= ?
+                GROUP BY guild_id, {cols}
+                ON CONFLICT(guild_id, grain, bucket, {cols})
+                DO UPDATE SET count = {table}.count + excluded.count
+                """,
+                (dst, target, guild_id, src, lo, hi),
+            )
+            await tx.execute(
+                f"DELETE FROM {table} WHERE guild_id=? AND grain=? AND bucket >= ? AND bucket <= ?",
+                (guild_id, src, lo, hi),
+            )
+    return len(ranges)
+
+
+async def compact_buckets(dbx: Any, guild_ids: Iterable[int], now: Optional[int] = None) -> dict[str, int]:
+    """Apply the retention policy to the given guilds' word and emoji buckets.
+
+    Days older than BUCKET_DAILY_RETENTION_DAYS (rounded back to a week start) become weekly
+    buckets, weeks older than BUCKET_WEEKLY_RETENTION_WEEKS become monthly buckets (a week
+    counts towards the month it starts in), and with BUCKET_MONTHLY_RETENTION_MONTHS set,
+    older months are deleted. Each target bucket is written and its sources deleted in one
+    transaction, so counts are never lost or doubled if this is interrupted.
+    """
+    day_cut, week_cut, month_cut = _cutoffs(int(time.time()) if now is None else int(now))
+    stats = {"guilds": 0, "weeks": 0, "months": 0, "dropped": 0}
+    for gid in guild_ids:
+        gid = int(gid)
+        stats["guilds"] += 1
+        for table in _BUCKET_TABLES:
+            stats["weeks"] += await _roll_up(dbx, table, gid, GRAIN_DAY, GRAIN_WEEK, day_cut)
+            stats["months"] += await _roll_up(dbx, table, gid, GRAIN_WEEK, GRAIN_MONTH, week_cut)
+            if month_cut is not None:
+                row = await dbx.fetchone(
+                    f"SELECT COUNT(*) AS n FROM {table} WHERE guild_id=? AND grain=? AND bucket < ?",
+                    (gid, GRAIN_MONTH, month_cut),
+                )
+                if row and int(row["n"]):
+                    await dbx.execute(
+                        f"DELETE FROM {table} WHERE guild_id=? AND grain=? AND bucket < ?",
+                        (gid, GRAIN_MONTH, month_cut),
+                    )
+                    stats["dropped"] += int(row["n"])
+    # Bucket tables start empty and grow daily; keep the planner's picture of them current.
+    await dbx.refresh_stats(_BUCKET_TABLES)
+    return stats
+
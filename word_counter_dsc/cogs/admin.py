@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from word_counter_dsc.maintenance import get_scheduler
+from word_counter_dsc.ui.theme import Theme, base_embed
+from word_counter_dsc.utils import safe_allowed_mentions
+
+
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+class AdminCog(commands.GroupCog, group_name="admin", group_description="Server maintenance (admins)"):
+    """Slash-command group: /admin ... (hidden from members without Manage Server by default)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        super().__init__()
+
+    # ---------------------------
+    # /admin rebuild-rollups  (EPHEMERAL)
+    # ---------------------------
+    @app_commands.command(
+        name="rebuild-rollups",
+        description="Recompute this server's word totals from the per-channel counts.",
+    )
+    async def rebuild_rollups(self, interaction: discord.Interaction):
+        assert self.bot.dbx is not None
+        gid = int(interaction.guild_id or 0)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        t0 = time.perf_counter()
+        # Commit buffered increments first so the rebuilt totals include them.
+        tracker = self.bot.get_cog("TrackerCog")
+        buffer = getattr(tracker, "buffer", None)
+        if buffer is not None:
+            await buffer.flush()
+        rows = await self.bot.dbx.rebuild_rollups(gid)
+        elapsed = time.perf_counter() - t0
+
+        self.bot.logger.info("Rollups rebuilt: guild=%s rows=%d (%.2fs)", gid, rows, elapsed)
+        emb = base_embed("Rollups Rebuilt", "User and server word totals were regenerated.", color=Theme.OK)
+        emb.add_field(name="User/word totals", value=f"{rows:,}", inline=True)
+        emb.add_field(name="Took", value=f"{elapsed:.2f}s", inline=True)
+        await interaction.followup.send(embed=emb, ephemeral=True, allowed_mentions=safe_allowed_mentions())
+
+    # ---------------------------
+    # /admin maintenance  (EPHEMERAL)
+    # ---------------------------
+    @app_commands.command(name="maintenance", description="Show the background maintenance jobs and their run times.")
+    async def maintenance(self, interaction: discord.Interaction):
+        stats = get_scheduler(self.bot).stats()
+        emb = base_embed("Maintenance Jobs", "Jobs run in the background; times are per run on this bot process.")
+        for name, s in sorted(stats.items()):
+            last = f"<t:{s['last_started']}:R>" if s["last_started"] else "not yet"
+            state = " (running)" if s["running"] else ""
+            emb.add_field(
+                name=f"{name}{state}",
+                value=(
+                    f"every {s['interval'] / 3600:g}h, last {last}\n"
+                    f"runs {s['runs']}, failed {s['failures']}, skipped {s['skipped']}\n"
+                    f"last {s['last_ms']:.0f} ms, avg {s['avg_ms']:.0f} ms, max {s['max_ms']:.0f} ms"
+                ),
+                inline=False,
+            )
+        if not stats:
+            emb.description = "No maintenance jobs are registered."
+        await interaction.response.send_message(embed=emb, ephemeral=True, allowed_mentions=safe_allowed_mentions())
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AdminCog(bot))
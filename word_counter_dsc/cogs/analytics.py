@@ -1,31 +1,46 @@
-from discord.ext import commands
+from __future__ import annotations
+
 import discord
+from discord import app_commands
+from discord.ext import commands
+
+from word_counter_dsc.leaderboards import WINDOW_CHOICES, WINDOW_LABELS, top_words, user_summary
+from word_counter_dsc.ui.theme import base_embed
+from word_counter_dsc.utils import safe_allowed_mentions
+
 
-class Analytics(commands.Cog):
-    def __init__(self, bot):
+class AnalyticsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @discord.app_commands.command(name="userstats", description="User analytics")
-    async def userstats(self, interaction: discord.Interaction, user: discord.Member):
-        async with self.bot.db_lock:
-            cursor = await self.bot.db.execute("""
-            SELECT word, SUM(count) as total
-            FROM word_counts
-            WHERE guild_id=? AND user_id=?
-            GROUP BY word
-            ORDER BY total DESC
-            LIMIT 5
-            """, (interaction.guild.id, user.id))
-            rows = await cursor.fetchall()
-
-        if not rows:
-            return await interaction.response.send_message("No data.", ephemeral=True)
-
-        embed = discord.Embed(title=f"📈 Stats for {user.display_name}", color=0xffcc00)
-        for word, total in rows:
-            embed.add_field(name=word, value=str(total), inline=False)
-
-        await interaction.response.send_message(embed=embed)
-
-async def setup(bot):
-    await bot.add_cog(Analytics(bot))
+    @app_commands.command(name="userstats", description="Word stats for a user in this server.")
+    @app_commands.describe(user="Whose stats to show (default: you)", window="Time range (default: all time)")
+    @app_commands.choices(window=WINDOW_CHOICES)
+    async def userstats(
+        self,
+        interaction: discord.Interaction,
+        user: discord.Member | None = None,
+        window: app_commands.Choice[str] | None = None,
+    ):
+        assert self.bot.dbx is not None
+        gid = int(interaction.guild_id or 0)
+        member = user or interaction.user
+        win = window.value if window else "all"
+
+        total, distinct = await user_summary(self.bot.dbx, gid, int(member.id), win)
+        if not total:
+            await interaction.response.send_message("No data.", ephemeral=True)
+            return
+        rows = await top_words(self.bot.dbx, gid, 5, win, user_id=int(member.id))
+
+        emb = base_embed(f"📈 Stats for {member.display_name}", f"{WINDOW_LABELS[win].capitalize()}.")
+        emb.add_field(name="Words counted", value=f"{total:,}", inline=True)
+        emb.add_field(name="Distinct words", value=f"{distinct:,}", inline=True)
+        if rows:
+            lines = [f"**{i}.** `{r['word']}` — **{int(r['total']):,}**" for i, r in enumerate(rows, start=1)]
+            emb.add_field(name="Top words", value="\n".join(lines), inline=False)
+        await interaction.response.send_message(embed=emb, allowed_mentions=safe_allowed_mentions())
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AnalyticsCog(bot))
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from word_counter_dsc.config import (
+    AUTO_BACKFILL_ENABLED,
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_PAGE_DELAY_SECONDS,
+)
+from word_counter_dsc.pipeline import get_pipeline
+from word_counter_dsc.ui.theme import Theme, base_embed
+from word_counter_dsc.utils import safe_allowed_mentions
+
+# discord.py fetches history in pages of this many messages.
+_HISTORY_PAGE = 100
+# Minimum seconds between INFO progress lines per guild.
+_LOG_EVERY_SECONDS = 30.0
+
+
+@dataclass
+class BackfillProgress:
+    guild_id: int
+    channels_total: int = 0
+    channels_done: int = 0
+    messages: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    last_log: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Messages per second since the run started."""
+        return self.messages / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class BackfillCog(commands.GroupCog, group_name="backfill", group_description="History backfill progress"):
+    """Counts existing channel history for channels that have no stats yet.
+
+    Each channel is walked oldest-first between a stored watermark (last counted message id)
+    and a cutoff id taken when the guild was first planned; anything newer is counted by the
+    live listener. Batches go through the ingest pipeline's stages (IngestPipeline.commit),
+    so history lands in the same word, emoji and medal stats as live traffic, and each
+    batch's rows and the new watermark are committed in one transaction; a restart resumes
+    exactly where the last commit left off.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        super().__init__()
+        self._sem = asyncio.Semaphore(max(1, BACKFILL_CONCURRENCY))
+        self._tasks: dict[int, asyncio.Task] = {}
+        self.progress: dict[int, BackfillProgress] = {}
+        # Live counting covers messages from the first gateway connection onwards.
+        self._live_since: Optional[datetime] = None
+
+    async def cog_unload(self) -> None:
+        # Uncommitted batches are simply dropped; the stored watermark is still consistent.
+        for task in self._tasks.values():
+            task.cancel()
+        for task in self._tasks.values():
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks.clear()
+
+    # ---------------------------
+    # Scheduling
+    # ---------------------------
+    @commands.Cog.listener()
+    async def on_connect(self):
+        if self._live_since is None:
+            self._live_since = discord.utils.utcnow()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not AUTO_BACKFILL_ENABLED:
+            return
+        for guild in self.bot.guilds:
+            self.schedule(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        if AUTO_BACKFILL_ENABLED:
+            self.schedule(guild, live_since=discord.utils.utcnow())
+
+    def schedule(self, guild: discord.Guild, live_since: Optional[datetime] = None) -> bool:
+        """Start (or resume) the backfill for a guild unless one is already running."""
+        gid = int(guild.id)
+        task = self._tasks.get(gid)
+        if task is not None and not task.done():
+            return False
+        since = live_since or self._live_since or discord.utils.utcnow()
+        self._tasks[gid] = asyncio.create_task(self._run_guild(guild, since), name=f"backfill-{gid}")
+        return True
+
+    async def _plan(self, guild: discord.Guild, live_since: datetime) -> list[Any]:
+        """Return the unfinished backfill_state rows for the guild, planning channels that have none.
+
+        Each channel is decided on its own. A channel without a row is backfilled up to
+        ``live_since`` unless it already has counts from messages sent before then, i.e. its
+        history was counted live by an earlier run (counts only from messages since
+        ``live_since`` are this run's live traffic and don't stop the backfill).
+        """
+        dbx = self.bot.dbx
+        gid = int(guild.id)
+        select = "SELECT channel_id, last_message_id, cutoff_id, done FROM backfill_state WHERE guild_id=?"
+        rows = await dbx.fetchall(select, (gid,))
+        planned = {int(r["channel_id"]) for r in rows}
+        fresh = [int(ch.id) for ch in self._readable_channels(guild) if int(ch.id) not in planned]
+        if fresh:
+            since = int(live_since.timestamp())
+            counted = {
+                int(r["channel_id"])
+                for r in await dbx.fetchall(
+                    "SELECT channel_id FROM word_counts WHERE guild_id=? GROUP BY channel_id HAVING MIN(updated_at) < ?",
+                    (gid, since),
+                )
+            }
+            cutoff = discord.utils.time_snowflake(live_since)
+            now = int(time.time())
+            await dbx.executemany(
+                """
+                INSERT INTO backfill_state (guild_id, channel_id, last_message_id, cutoff_id, messages, done, updated_at)
+                VALUES (?, ?, 0, ?, 0, ?, ?)
+                ON CONFLICT(guild_id, channel_id) DO NOTHING
+                """,
+                [(gid, cid, cutoff, 1 if cid in counted else 0, now) for cid in fresh],
+            )
+            rows = await dbx.fetchall(select, (gid,))
+        return [r for r in rows if not int(r["done"])]
+
+    @staticmethod
+    def _readable_channels(guild: discord.Guild) -> list[discord.TextChannel]:
+        me = guild.me
+        out = []
+        for ch in guild.text_channels:
+            perms = ch.permissions_for(me) if me is not None else None
+            if perms is None or (perms.view_channel and perms.read_message_history):
+                out.append(ch)
+        return out
+
+    # ---------------------------
+    # Walking history
+    # ---------------------------
+    async def _run_guild(self, guild: discord.Guild, live_since: datetime) -> None:
+        if not self.bot.dbx:
+            return
+        gid = int(guild.id)
+        try:
+            pending = await self._plan(guild, live_since)
+        except Exception:
+            self.bot.logger.exception("Backfill planning failed (guild=%s)", gid)
+            return
+        if not pending:
+            return
+
+        prog = BackfillProgress(guild_id=gid, channels_total=len(pending))
+        self.progress[gid] = prog
+        self.bot.logger.info("Backfill started: guild=%s channels=%d", gid, len(pending))
+
+        await asyncio.gather(
+            *(self._run_channel(guild, row, prog) for row in pending),
+            return_exceptions=True,
+        )
+        prog.finished_at = time.monotonic()
+        self.bot.logger.info(
+            "Backfill finished: guild=%s channels=%d/%d messages=%d (%.0f msg/s)",
+            gid, prog.channels_done, prog.channels_total, prog.messages, prog.rate,
+        )
+
+    async def _run_channel(self, guild: discord.Guild, row: Any, prog: BackfillProgress) -> None:
+        gid = int(guild.id)
+        cid = int(row["channel_id"])
+        channel = guild.get_channel(cid)
+        if channel is None or not hasattr(channel, "history"):
+            return
+        after_id = int(row["last_message_id"])
+        cutoff_id = int(row["cutoff_id"])
+
+        async with self._sem:
+            batch: list[discord.Message] = []
+            last_id = after_id
+            seen = 0  # messages since the last commit
+            walked = 0
+            try:
+                async for msg in channel.history(
+                    limit=None,
+                    after=discord.Object(id=after_id) if after_id else None,
+                    before=discord.Object(id=cutoff_id),
+                    oldest_first=True,
+                ):
+                    last_id = int(msg.id)
+                    if not msg.author.bot:
+                        batch.append(msg)
+                    seen += 1
+                    walked += 1
+                    if seen >= BACKFILL_BATCH_SIZE:
+                        await self._commit_batch(gid, cid, batch, last_id, seen, done=False)
+                        prog.messages += seen
+                        self._maybe_log(prog)
+                        batch, seen = [], 0
+                    if walked % _HISTORY_PAGE == 0 and BACKFILL_PAGE_DELAY_SECONDS > 0:
+                        await asyncio.sleep(BACKFILL_PAGE_DELAY_SECONDS)
+            except discord.Forbidden:
+                self.bot.logger.warning("Backfill: no history access (guild=%s channel=%s)", gid, cid)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.bot.logger.exception("Backfill failed (guild=%s channel=%s); will resume on restart", gid, cid)
+                return
+
+            await self._commit_batch(gid, cid, batch, last_id, seen, done=True)
+            prog.messages += seen
+            prog.channels_done += 1
+            self._maybe_log(prog)
+
+    async def _commit_batch(
+        self, guild_id: int, channel_id: int, batch: list[discord.Message], last_id: int, seen: int, done: bool
+    ) -> None:
+        """Run a batch through the ingest pipeline's stages and commit their rows with the watermark."""
+        pipeline = get_pipeline(self.bot)
+        parsed = await pipeline.parse_batch(batch, live=False)
+
+        async def watermark(tx: Any) -> None:
+            await tx.execute(
+                """
+                UPDATE backfill_state
+                SET last_message_id=?, messages=messages+?, done=?, updated_at=?
+                WHERE guild_id=? AND channel_id=?
+                """,
+                (last_id, seen, 1 if done else 0, int(time.time()), guild_id, channel_id),
+            )
+
+        await pipeline.commit(parsed, then=watermark)
+
+    def _maybe_log(self, prog: BackfillProgress) -> None:
+        now = time.monotonic()
+        if now - prog.last_log < _LOG_EVERY_SECONDS and prog.channels_done < prog.channels_total:
+            return
+        prog.last_log = now
+        self.bot.logger.info(
+            "Backfill progress: guild=%s channels=%d/%d messages=%d (%.0f msg/s)",
+            prog.guild_id, prog.channels_done, prog.channels_total, prog.messages, prog.rate,
+        )
+
+    # ---------------------------
+    # /backfill status  (EPHEMERAL)
+    # ---------------------------
+    @app_commands.command(name="status", description="Show history backfill progress for this server.")
+    async def status(self, interaction: discord.Interaction):
+        assert self.bot.dbx is not None
+        gid = int(interaction.guild_id or 0)
+        row = await self.bot.dbx.fetchone(
+            """
+            SELECT COUNT(*) AS channels, COALESCE(SUM(done), 0) AS done, COALESCE(SUM(messages), 0) AS messages
+            FROM backfill_state WHERE guild_id=?
+            """,
+            (gid,),
+        )
+        channels = int(row["channels"] if row else 0)
+        if not channels:
+            msg = "No history backfill for this server."
+            if not AUTO_BACKFILL_ENABLED:
+                msg += " (AUTO_BACKFILL_ENABLED is off)"
+            await interaction.response.send_message(msg, ephemeral=True)
+            return
+
+        done = int(row["done"])
+        task = self._tasks.get(gid)
+        running = task is not None and not task.done()
+        state = "running" if running else ("complete" if done >= channels else "paused")
+        emb = base_embed(
+            "History Backfill",
+            f"Status: **{state}**",
+            color=Theme.OK if state == "complete" else Theme.INFO,
+        )
+        emb.add_field(name="Channels", value=f"{done}/{channels}", inline=True)
+        emb.add_field(name="Messages", value=f"{int(row['messages']):,}", inline=True)
+        prog = self.progress.get(gid)
+        if prog is not None:
+            emb.add_field(name="Rate", value=f"{prog.rate:,.0f} msg/s", inline=True)
+        await interaction.response.send_message(embed=emb, ephemeral=True, allowed_mentions=safe_allowed_mentions())
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BackfillCog(bot))
@@ -3,106 +3,105 @@ from __future__ import annotations
 import re
 import time
 from collections import Counter
-import unicodedata
+from typing import Any, Sequence
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from word_counter_dsc.buckets import upsert_emoji_buckets
+from word_counter_dsc.config import COUNT_CAP, COUNT_MODE
+from word_counter_dsc.emoji_data import extract_emojis
+from word_counter_dsc.pipeline import ParsedMessage, Stage, get_pipeline
 from word_counter_dsc.ui.theme import base_embed
 from word_counter_dsc.ui.pagination import Paginator
-from word_counter_dsc.utils import safe_allowed_mentions
+from word_counter_dsc.utils import apply_count_mode, safe_allowed_mentions
 
 
 # Discord custom emoji formats in message content:
 #   <:name:id>
 #   <a:name:id>
-_CUSTOM_EMOJI_RE = re.compile(r"<a?:([A-Za-z0-9_]{2,32}):\d+>")
+_CUSTOM_EMOJI_RE = re.compile(r"<a?:[A-Za-z0-9_]{2,32}:(\d+)>")
 
 # Some users may type :name: expecting it to become an emoji.
 _COLON_EMOJI_RE = re.compile(r"(?<!\w):([A-Za-z0-9_]{2,32}):(?!\w)")
 
 
 def _extract_unicode_emojis(text: str) -> list[str]:
-    """Best-effort unicode emoji extractor.
+    """Unicode emoji sequences in a message (flags, keycaps, skin tones and ZWJ
+    sequences each count as one emoji). Single regex scan; see emoji_data."""
+    return extract_emojis(text)
 
-    We intentionally avoid extra deps. This catches the most common emoji blocks
-    (including flags) and is safe (won't crash on odd unicode).
+
+_UPSERT_CUSTOM_SQL = """
+INSERT INTO emoji_counts (guild_id, user_id, emoji_name, count, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, user_id, emoji_name)
+DO UPDATE SET count = emoji_counts.count + excluded.count,
+              updated_at = excluded.updated_at
+"""
+
+_UPSERT_UNICODE_SQL = """
+INSERT INTO unicode_emoji_counts (guild_id, user_id, emoji, count, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, user_id, emoji)
+DO UPDATE SET count = unicode_emoji_counts.count + excluded.count,
+              updated_at = excluded.updated_at
+"""
+
+
+async def upsert_emoji_counts(dbx, batch: Sequence[ParsedMessage], now: int) -> None:
+    """Add a batch's custom + unicode emoji counts, aggregated per (guild, user, emoji),
+    plus the daily emoji buckets of each message's send day.
+
+    ``dbx`` should be a transaction handle so the totals and buckets commit together.
     """
-    if not text:
-        return []
-
-    out: list[str] = []
-
-    def is_emoji_cp(cp: int) -> bool:
-        # Common emoji ranges
-        return (
-            0x1F300 <= cp <= 0x1FAFF
-            or 0x2600 <= cp <= 0x26FF
-            or 0x2700 <= cp <= 0x27BF
-            or 0x1F000 <= cp <= 0x1F02F
-            or 0x1F1E6 <= cp <= 0x1F1FF  # regional indicators (flags)
-            or 0xFE00 <= cp <= 0xFE0F  # variation selectors
-            or 0x200D == cp  # ZWJ
-            or 0x20E3 == cp  # keycap
-        )
+    custom: Counter = Counter()
+    uni: Counter = Counter()
+    buckets = []
+    for p in batch:
+        for name, c in p.custom_emojis.items():
+            custom[(p.guild_id, p.user_id, name)] += c
+            buckets.append((p.guild_id, p.user_id, True, name, p.created_at, c))
+        for emoji, c in p.unicode_emojis.items():
+            uni[(p.guild_id, p.user_id, emoji)] += c
+            buckets.append((p.guild_id, p.user_id, False, emoji, p.created_at, c))
+    if custom:
+        await dbx.executemany(_UPSERT_CUSTOM_SQL, [(g, u, str(n), int(c), now) for (g, u, n), c in custom.items()])
+    if uni:
+        await dbx.executemany(_UPSERT_UNICODE_SQL, [(g, u, str(e), int(c), now) for (g, u, e), c in uni.items()])
+    await upsert_emoji_buckets(dbx, buckets)
+
+
+class EmojiCountStage(Stage):
+    """Pipeline stage: write emoji counts, one bulk upsert per table per batch."""
+
+    name = "emoji_counts"
+    order = 20
 
-    # Build simple sequences for:
-    # - flags (regional indicator pairs)
-    # - ZWJ sequences (e.g., family emojis)
-    # - keycaps
-    i = 0
-    s = text
-    n = len(s)
-    while i < n:
-        cp = ord(s[i])
-
-        # Flag: two regional indicators
-        if 0x1F1E6 <= cp <= 0x1F1FF and i + 1 < n:
-            cp2 = ord(s[i + 1])
-            if 0x1F1E6 <= cp2 <= 0x1F1FF:
-                out.append(s[i : i + 2])
-                i += 2
-                continue
-
-        # Keycap: [0-9#*] + optional VS16 + keycap
-        if s[i] in "0123456789#*":
-            j = i + 1
-            if j < n and ord(s[j]) == 0xFE0F:
-                j += 1
-            if j < n and ord(s[j]) == 0x20E3:
-                out.append(s[i : j + 1])
-                i = j + 1
-                continue
-
-        # Single codepoint emoji (and allow ZWJ chains)
-        if is_emoji_cp(cp):
-            j = i + 1
-            # consume VS16/ZWJ chains conservatively
-            while j < n and is_emoji_cp(ord(s[j])):
-                j += 1
-            emoji = s[i:j]
-            # Filter out pure modifiers/selectors
-            if any(0x1F300 <= ord(ch) <= 0x1FAFF or 0x2600 <= ord(ch) <= 0x27BF for ch in emoji):
-                out.append(emoji)
-            i = j
-            continue
-
-        i += 1
-
-    # Final cleanup: drop empty / whitespace / non-emoji
-    cleaned: list[str] = []
-    for e in out:
-        if not e or e.isspace():
-            continue
-        # defensive: some sequences might include only selectors
-        if any("EMOJI" in unicodedata.name(ch, "") for ch in e):
-            cleaned.append(e)
-        else:
-            # keep common pictographs anyway
-            if any(0x1F300 <= ord(ch) <= 0x1FAFF or 0x2600 <= ord(ch) <= 0x27BF for ch in e):
-                cleaned.append(e)
-    return cleaned
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def process(self, batch: Sequence[ParsedMessage]) -> None:
+        if self.bot.dbx and any(p.custom_emojis or p.unicode_emojis for p in batch):
+            async with self.bot.dbx.transaction() as tx:
+                await self.write(tx, batch, None)
+
+    async def write(self, tx: Any, batch: Sequence[ParsedMessage], prepared: Any) -> None:
+        await upsert_emoji_counts(tx, batch, int(time.time()))
+
+
+class GuildEmojiIndex:
+    """A guild's custom emojis, by id (authoritative) and by current name."""
+
+    __slots__ = ("by_id", "by_name")
+
+    def __init__(self, emojis):
+        self.by_id: dict[int, str] = {}
+        self.by_name: dict[str, int] = {}
+        for e in emojis or []:
+            self.by_id[int(e.id)] = str(e.name)
+            self.by_name.setdefault(str(e.name), int(e.id))
 
 
 class EmojiStatsCog(commands.Cog):
@@ -110,59 +109,130 @@ class EmojiStatsCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # guild_id -> emoji index; maintained from guild/emoji events, not rebuilt per message.
+        self._emoji_index: dict[int, GuildEmojiIndex] = {}
+
+    async def cog_load(self):
+        get_pipeline(self.bot).add_stage(EmojiCountStage(self.bot))
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stage(EmojiCountStage.name)
+
+    def _index_for(self, guild: discord.Guild | None, guild_id: int) -> GuildEmojiIndex | None:
+        idx = self._emoji_index.get(guild_id)
+        if idx is None:
+            # First use before the guild's events arrived (e.g. cog reloaded): build once.
+            guild = guild or self.bot.get_guild(guild_id)
+            if guild is None:
+                return None
+            idx = self._emoji_index[guild_id] = GuildEmojiIndex(guild.emojis)
+        return idx
 
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild or not self.bot.dbx:
-            return
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            await self._sync_guild(guild, guild.emojis)
 
-        text = (message.content or "").strip()
-        if not text:
-            return
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        await self._sync_guild(guild, guild.emojis)
 
-        guild = message.guild
-        guild_emoji_names = {e.name for e in (guild.emojis or [])}
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self._emoji_index.pop(int(guild.id), None)
 
-        # Collect custom emoji name occurrences from both formats.
-        names: list[str] = []
-        names.extend(_CUSTOM_EMOJI_RE.findall(text))
-        names.extend(_COLON_EMOJI_RE.findall(text))
-        counts_custom = Counter(n for n in names if n in guild_emoji_names)
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        await self._sync_guild(guild, after, before)
 
-        # Collect unicode emoji occurrences.
-        unicode_list = _extract_unicode_emojis(text)
-        counts_unicode = Counter(unicode_list)
+    async def _sync_guild(self, guild: discord.Guild, emojis, before=None) -> None:
+        """Replace the guild's emoji index and carry counts over to renamed emojis.
 
-        if not counts_custom and not counts_unicode:
+        Counts are stored by name. The last seen name of every emoji id is kept in
+        guild_emojis, so renames are found by id even when they happened while the bot was
+        offline or disconnected (checked again on ready and on join).
+        """
+        gid = int(guild.id)
+        old = self._emoji_index.get(gid) or GuildEmojiIndex(before)
+        new = GuildEmojiIndex(emojis)
+        self._emoji_index[gid] = new
+        if not self.bot.dbx:
             return
+        try:
+            async with self.bot.dbx.transaction() as tx:
+                rows = await tx.fetchall("SELECT emoji_id, name FROM guild_emojis WHERE guild_id=?", (gid,))
+                # Nothing stored yet (first run for this guild): fall back to the in-memory names.
+                seen = {int(r["emoji_id"]): str(r["name"]) for r in rows} if rows else old.by_id
+                renames = {eid: (old_name, new.by_id[eid]) for eid, old_name in seen.items()
+                           if eid in new.by_id and new.by_id[eid] != old_name}
+                if renames:
+                    await self._migrate_renames(tx, gid, renames)
+                stored = {int(r["emoji_id"]): str(r["name"]) for r in rows}
+                if stored != new.by_id:
+                    gone = [(gid, eid) for eid in stored if eid not in new.by_id]
+                    if gone:
+                        await tx.executemany("DELETE FROM guild_emojis WHERE guild_id=? AND emoji_id=?", gone)
+                    await tx.executemany(
+                        """
+                        INSERT INTO guild_emojis (guild_id, emoji_id, name) VALUES (?, ?, ?)
+                        ON CONFLICT(guild_id, emoji_id) DO UPDATE SET name = excluded.name
+                        """,
+                        [(gid, eid, name) for eid, name in new.by_id.items() if stored.get(eid) != name],
+                    )
+        except Exception:
+            self.bot.logger.exception("Emoji rename migration failed (guild=%s)", gid)
+
+    async def _migrate_renames(self, tx, guild_id: int, renames: dict[int, tuple[str, str]]) -> None:
+        # Two steps through per-id placeholders so swapped names (a<->b) don't merge.
+        for eid, (old_name, _new_name) in renames.items():
+            await self._move_emoji_rows(tx, guild_id, old_name, f"#{eid}")
+        for eid, (_old_name, new_name) in renames.items():
+            await self._move_emoji_rows(tx, guild_id, f"#{eid}", new_name)
+
+    @staticmethod
+    async def _move_emoji_rows(tx, guild_id: int, src: str, dst: str) -> None:
+        await tx.execute(
+            """
+            INSERT INTO emoji_counts (guild_id, user_id, emoji_name, count, updated_at)
+            SELECT guild_id, user_id, ?, count, updated_at
+            FROM emoji_counts WHERE guild_id=? AND emoji_name=?
+            ON CONFLICT(guild_id, user_id, emoji_name)
+            DO UPDATE SET count = emoji_counts.count + excluded.count,
+                          updated_at = excluded.updated_at
+            """,
+            (dst, guild_id, src),
+        )
+        await tx.execute("DELETE FROM emoji_counts WHERE guild_id=? AND emoji_name=?", (guild_id, src))
+        await tx.execute(
+            """
+            INSERT INTO emoji_buckets (guild_id, grain, bucket, custom, emoji, user_id, count)
+            SELECT guild_id, grain, bucket, custom, ?, user_id, count
+            FROM emoji_buckets WHERE guild_id=? AND custom=1 AND emoji=?
+            ON CONFLICT(guild_id, grain, bucket, custom, emoji, user_id)
+            DO UPDATE SET count = emoji_buckets.count + excluded.count
+            """,
+            (dst, guild_id, src),
+        )
+        await tx.execute("DELETE FROM emoji_buckets WHERE guild_id=? AND custom=1 AND emoji=?", (guild_id, src))
 
-        now = int(time.time())
-        gid = int(guild.id)
-        uid = int(message.author.id)
-
-        for name, c in counts_custom.items():
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO emoji_counts (guild_id, user_id, emoji_name, count, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, user_id, emoji_name)
-                DO UPDATE SET count = emoji_counts.count + excluded.count,
-                              updated_at = excluded.updated_at
-                """,
-                (gid, uid, str(name), int(c), now),
-            )
+    def count_emojis(self, guild: discord.Guild | None, guild_id: int, text: str) -> tuple[Counter, Counter]:
+        """Emoji parsing for one message: (custom emoji by current name, unicode emoji)."""
+        # Collect custom emoji occurrences from both formats, resolved to the emoji's current name.
+        names: list[str] = []
+        if ":" in text:
+            idx = self._index_for(guild, guild_id)
+            if idx is not None and idx.by_id:
+                for eid in _CUSTOM_EMOJI_RE.findall(text):
+                    name = idx.by_id.get(int(eid))
+                    if name:
+                        names.append(name)
+                names.extend(n for n in _COLON_EMOJI_RE.findall(text) if n in idx.by_name)
+        counts_custom = apply_count_mode(Counter(names), COUNT_MODE, COUNT_CAP)
 
-        for emoji, c in counts_unicode.items():
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO unicode_emoji_counts (guild_id, user_id, emoji, count, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, user_id, emoji)
-                DO UPDATE SET count = unicode_emoji_counts.count + excluded.count,
-                              updated_at = excluded.updated_at
-                """,
-                (gid, uid, str(emoji), int(c), now),
-            )
+        # Collect unicode emoji occurrences.
+        unicode_list = _extract_unicode_emojis(text)
+        counts_unicode = apply_count_mode(Counter(unicode_list), COUNT_MODE, COUNT_CAP)
+        return counts_custom, counts_unicode
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -177,24 +247,15 @@ class EmojiStatsCog(commands.Cog):
 
         # Custom emoji reaction
         if payload.emoji and payload.emoji.id is not None:
-            guild = self.bot.get_guild(payload.guild_id)
-            if not guild:
-                return
-            guild_emoji_names = {e.name for e in (guild.emojis or [])}
-            name = payload.emoji.name
-            if not name or name not in guild_emoji_names:
+            idx = self._index_for(None, gid)
+            # Only this guild's emojis count; reactions with other servers' emojis are ignored.
+            name = idx.by_id.get(int(payload.emoji.id)) if idx is not None else None
+            if not name:
                 return
 
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO emoji_counts (guild_id, user_id, emoji_name, count, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, user_id, emoji_name)
-                DO UPDATE SET count = emoji_counts.count + excluded.count,
-                              updated_at = excluded.updated_at
-                """,
-                (gid, uid, str(name), 1, now),
-            )
+            async with self.bot.dbx.transaction() as tx:
+                await tx.execute(_UPSERT_CUSTOM_SQL, (gid, uid, str(name), 1, now))
+                await upsert_emoji_buckets(tx, [(gid, uid, True, str(name), now, 1)])
             return
 
         # Unicode emoji reaction
@@ -202,16 +263,9 @@ class EmojiStatsCog(commands.Cog):
             e = str(payload.emoji)
             if not e:
                 return
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO unicode_emoji_counts (guild_id, user_id, emoji, count, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, user_id, emoji)
-                DO UPDATE SET count = unicode_emoji_counts.count + excluded.count,
-                              updated_at = excluded.updated_at
-                """,
-                (gid, uid, e, 1, now),
-            )
+            async with self.bot.dbx.transaction() as tx:
+                await tx.execute(_UPSERT_UNICODE_SQL, (gid, uid, e, 1, now))
+                await upsert_emoji_buckets(tx, [(gid, uid, False, e, now, 1)])
 
     @app_commands.command(name="emoji", description="Show top and bottom used server emojis.")
     @app_commands.describe(n="How many emojis to show in top/bottom lists (default 10).")
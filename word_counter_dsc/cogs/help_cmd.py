@@ -20,6 +20,9 @@ BOT_DESC = (
     "• `/top [user]` — top tracked words (server or user)\n"
     "• `/search <word>` — leaderboard for any tracked word\n"
     "• `/rank <keyword>` — leaderboard for a keyword\n"
+    "• `/leaderboard` — the server's top 10 words\n"
+    "• `/userstats [user]` — word totals and top words for a user\n"
+    "  (all of these take `window`: today and yesterday (UTC) / 7 days / 30 days / all time)\n"
     "• `/emoji` — emoji usage stats (incl. reactions)\n"
     "• `/medals` — achievements / medals info\n\n"
     "**Keyword tools:**\n"
@@ -30,7 +33,12 @@ BOT_DESC = (
     "**Stopwords tools:**\n"
     "• `/stopword list` — view stopwords\n"
     "• `/stopword add` / `/stopword remove` — manage stopwords\n"
+    "• `/stopword purges` — progress of background count purges for new stopwords\n"
     "• `/stopword seed` — seed common stopwords\n\n"
+    "**Admin tools:**\n"
+    "• `/backfill status` — history backfill progress\n"
+    "• `/admin rebuild-rollups` — recompute server/user word totals from raw counts\n"
+    "• `/admin maintenance` — background job status and run times\n\n"
     "Tip: Mentions in leaderboards are **clickable but won’t ping** anyone."
 )
 
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+
+import discord
+from discord.ext import commands
+
+from word_counter_dsc.config import INGEST_STATS_LOG_SECONDS
+from word_counter_dsc.ingest_queue import IngestQueue
+from word_counter_dsc.pipeline import get_pipeline
+
+
+class IngestCog(commands.Cog):
+    """Single on_message entry point.
+
+    The handler only queues the message; IngestQueue workers parse it once and run every
+    registered pipeline stage, so slow DB writes or replies never stall event dispatch.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.pipeline = get_pipeline(bot)
+        self.queue = IngestQueue(self.pipeline)
+        self._stats_task: asyncio.Task | None = None
+
+    async def cog_load(self):
+        self.queue.start()
+        if INGEST_STATS_LOG_SECONDS > 0:
+            self._stats_task = asyncio.create_task(self._log_stats(), name="ingest-stats")
+
+    async def cog_unload(self):
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            self._stats_task = None
+        # Drain before the stage-owning cogs (tracker buffer etc.) are unloaded.
+        await self.queue.close()
+
+    async def _log_stats(self):
+        last_dropped = last_shed = 0
+        while True:
+            await asyncio.sleep(INGEST_STATS_LOG_SECONDS)
+            q = self.queue.stats()
+            shedding = q["dropped"] != last_dropped or q["shed_emoji"] != last_shed
+            last_dropped, last_shed = q["dropped"], q["shed_emoji"]
+            level = "warning" if shedding else "info"
+            getattr(self.bot.logger, level)("Ingest queue: %s | stages: %s", q, self.pipeline.stats())
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or not message.guild or not self.bot.dbx:
+            return
+        await self.queue.submit(message)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(IngestCog(bot))
@@ -6,11 +6,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from word_counter_dsc.cogs.medals import KeywordSeed, add_medal_progress
+from word_counter_dsc.config_bus import SCOPE_ABBREVIATIONS, SCOPE_KEYWORDS, get_config_bus
 from word_counter_dsc.utils import split_csv_words
 from word_counter_dsc.utils import safe_allowed_mentions
 from word_counter_dsc.ui.theme import base_embed
 from word_counter_dsc.ui.pagination import Paginator
 from word_counter_dsc.stopwords_core import CORE_STOPWORDS
+from word_counter_dsc.write_buffer import purge_word_counts
 
 
 class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Manage tracked keywords"):
@@ -20,6 +23,10 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
         self.bot = bot
         super().__init__()
 
+    async def _config_changed(self, guild_id: int, scope: str) -> None:
+        # Bump the guild's config version so cached keyword/abbreviation sets revalidate.
+        await get_config_bus(self.bot).bump(guild_id, scope)
+
     # ---------------------------
     # /keyword list  (PUBLIC)
     # ---------------------------
@@ -74,6 +81,9 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
             await interaction.response.send_message("No keywords provided.", ephemeral=True)
             return
 
+        # Seeding medals reads the guild's vocabulary; don't hold up the interaction for it.
+        await interaction.response.defer(ephemeral=True)
+
         # Disallow stopwords as keywords (stopwords are invisible to the bot)
         sw_rows = await self.bot.dbx.fetchall("SELECT word FROM stopwords WHERE guild_id=?",(gid,))
         sw = set(CORE_STOPWORDS) | {str(r["word"]) for r in sw_rows}
@@ -82,17 +92,44 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
         skipped = [kw for kw in kws if kw in sw]
 
         now = int(time.time())
-        for kw in allowed:
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO keywords (guild_id, word, created_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(guild_id, word) DO NOTHING
-                """,
-                (gid, kw, now),
-            )
-
-        await interaction.response.send_message(
+        existing = {str(r["word"]) for r in await self.bot.dbx.fetchall("SELECT word FROM keywords WHERE guild_id=?", (gid,))}
+        seed = KeywordSeed(gid, existing, [kw for kw in allowed if kw not in existing])
+        if seed.new:
+            await seed.scan(self.bot.dbx)
+
+        async def insert(tx) -> None:
+            inserted = set()
+            for kw in allowed:
+                rows = await tx.fetchall(
+                    """
+                    INSERT INTO keywords (guild_id, word, created_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(guild_id, word) DO NOTHING
+                    RETURNING word
+                    """,
+                    (gid, kw, now),
+                )
+                inserted.update(str(r["word"]) for r in rows)
+            seed.new &= inserted
+            await seed.apply(tx, now)
+
+        # Medal totals for the new keywords are seeded from the word totals, in the same
+        # transaction as a flush of the buffered counts; live counting starts at the bump.
+        tracker = self.bot.get_cog("TrackerCog")
+        buffer = getattr(tracker, "buffer", None) if tracker is not None else None
+        if buffer is not None:
+            await buffer.flush(then=insert)
+        else:
+            async with self.bot.dbx.transaction() as tx:
+                await insert(tx)
+        # No await until the bump: what is still buffered was parsed without the new keywords.
+        late = seed.pending_deltas(buffer) if buffer is not None and seed.new else {}
+        await self._config_changed(gid, SCOPE_KEYWORDS)
+        if late:
+            async with self.bot.dbx.transaction() as tx:
+                await add_medal_progress(tx, late, now)
+
+        await interaction.followup.send(
             f"Added {len(allowed)} keyword(s): " + (", ".join(allowed) if allowed else "(none)" ) + ("\nSkipped (stopwords): " + ", ".join(skipped) if skipped else ""),
             ephemeral=True,
         )
@@ -111,28 +148,24 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
             return
 
         now = int(time.time())
-        for kw in kws:
-            await self.bot.dbx.execute(
-                "DELETE FROM keywords WHERE guild_id=? AND word=?",
-                (gid, kw),
-            )
-            await self.bot.dbx.execute(
-                "DELETE FROM word_counts WHERE guild_id=? AND word=?",
-                (gid, kw),
-            )
-            await self.bot.dbx.execute(
-                "DELETE FROM keyword_medals WHERE guild_id=? AND keyword=?",
-                (gid, kw),
-            )
+        pairs = [(gid, kw) for kw in kws]
+        async with self.bot.dbx.transaction() as tx:
+            await tx.executemany("DELETE FROM keywords WHERE guild_id=? AND word=?", pairs)
+            await purge_word_counts(tx, gid, kws)
+            await tx.executemany("DELETE FROM keyword_medals WHERE guild_id=? AND word=?", pairs)
             # record removal time for cleanup (medals cog)
-            await self.bot.dbx.execute(
+            await tx.executemany(
                 """
                 INSERT INTO keyword_removals (guild_id, word, removed_at)
                 VALUES (?, ?, ?)
                 ON CONFLICT(guild_id, word) DO UPDATE SET removed_at = excluded.removed_at
                 """,
-                (gid, kw, now),
+                [(gid, kw, now) for kw in kws],
             )
+        await self._config_changed(gid, SCOPE_KEYWORDS)
+        tracker = self.bot.get_cog("TrackerCog")
+        if tracker is not None and getattr(tracker, "buffer", None) is not None:
+            tracker.buffer.discard(gid, kws)
 
         await interaction.response.send_message(
             f"Removed {len(kws)} keyword(s): " + ", ".join(kws),
@@ -176,16 +209,16 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
             return
 
         now = int(time.time())
-        for abbr, exp in pairs:
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO abbreviations (guild_id, abbreviation, expansion, created_at)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(guild_id, abbreviation)
-                DO UPDATE SET expansion=excluded.expansion, created_at=excluded.created_at
-                """,
-                (gid, abbr, exp, now),
-            )
+        await self.bot.dbx.executemany(
+            """
+            INSERT INTO abbreviations (guild_id, abbreviation, expansion, created_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(guild_id, abbreviation)
+            DO UPDATE SET expansion=excluded.expansion, created_at=excluded.created_at
+            """,
+            [(gid, abbr, exp, now) for abbr, exp in pairs],
+        )
+        await self._config_changed(gid, SCOPE_ABBREVIATIONS)
 
         await interaction.response.send_message(
             f"Saved {len(pairs)} abbreviation rule(s).",
@@ -238,11 +271,11 @@ class KeywordCog(commands.GroupCog, group_name="keyword", group_description="Man
             await interaction.response.send_message("No abbreviations provided.", ephemeral=True)
             return
 
-        for a in items:
-            await self.bot.dbx.execute(
-                "DELETE FROM abbreviations WHERE guild_id=? AND abbreviation=?",
-                (gid, a),
-            )
+        await self.bot.dbx.executemany(
+            "DELETE FROM abbreviations WHERE guild_id=? AND abbreviation=?",
+            [(gid, a) for a in items],
+        )
+        await self._config_changed(gid, SCOPE_ABBREVIATIONS)
 
         await interaction.response.send_message(f"Removed: {', '.join(items)}", ephemeral=True)
 
@@ -1,32 +1,151 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import time
+from bisect import bisect_right
+from typing import Any, Iterable, Mapping, Sequence
 
 import discord
 from discord.ext import commands
 
+from word_counter_dsc.announcements import AnnouncementQueue
 from word_counter_dsc.config import (
+    KEYWORD_ALIASES,
+    MATCH_MODE,
     MEDAL_THRESHOLDS,
     MEDAL_EMOJIS,
     TITLE_TEMPLATES,
     KEYWORD_REMOVAL_GRACE_SECONDS,
+    MEDAL_CLEANUP_INTERVAL_SECONDS,
 )
-from word_counter_dsc.utils import keyword_display, progress_bar
+from word_counter_dsc.maintenance import get_scheduler
+from word_counter_dsc.pipeline import ParsedMessage, Stage, get_pipeline
+from word_counter_dsc.utils import KeywordMatcher, keyword_display, progress_bar
 
 
 def tier_for_count(n: int) -> int:
     """Return tier index based on MEDAL_THRESHOLDS. -1 means no tier yet."""
-    for i, thr in enumerate(MEDAL_THRESHOLDS):
-        if n < thr:
-            return i - 1
-    return len(MEDAL_THRESHOLDS) - 1
+    return bisect_right(MEDAL_THRESHOLDS, n) - 1
 
 
 def next_threshold(n: int) -> int | None:
-    for thr in MEDAL_THRESHOLDS:
-        if n < thr:
-            return thr
-    return None
+    i = bisect_right(MEDAL_THRESHOLDS, n)
+    return MEDAL_THRESHOLDS[i] if i < len(MEDAL_THRESHOLDS) else None
+
+
+def crossed_threshold(old_total: int, new_total: int) -> int | None:
+    """Highest threshold in (old_total, new_total], i.e. the one to announce (or None)."""
+    tier = tier_for_count(new_total)
+    return MEDAL_THRESHOLDS[tier] if tier > tier_for_count(old_total) else None
+
+
+def _tier_sql(total: str) -> str:
+    """SQL CASE giving tier_for_count(<total>)."""
+    whens = " ".join(f"WHEN {total} >= {int(thr)} THEN {i}" for i, thr in reversed(list(enumerate(MEDAL_THRESHOLDS))))
+    return f"(CASE {whens} ELSE -1 END)" if whens else "-1"
+
+
+# Rows per multi-row upsert (6 parameters each; well below SQLite's bound-parameter limit).
+_MEDAL_CHUNK = 500
+_NEW_TOTAL = "keyword_medals.total_count + excluded.total_count"
+_ADD_PROGRESS_SQL = f"""
+INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at)
+VALUES {{values}}
+ON CONFLICT(guild_id, user_id, word)
+DO UPDATE SET total_count = {_NEW_TOTAL},
+              tier = {_tier_sql(_NEW_TOTAL)},
+              awarded_at = CASE WHEN {_tier_sql(_NEW_TOTAL)} <> keyword_medals.tier
+                                THEN excluded.awarded_at ELSE keyword_medals.awarded_at END
+RETURNING guild_id, user_id, word, tier, total_count
+"""
+
+
+async def add_medal_progress(tx: Any, deltas: Mapping[tuple[int, int, str], int], now: int) -> list[Any]:
+    """Add keyword occurrences onto the running ``keyword_medals`` totals.
+
+    ``deltas`` maps (guild_id, user_id, keyword) -> occurrences. Each chunk is one multi-row
+    upsert that also moves the tier (and awarded_at when it changes) and returns the new
+    (guild_id, user_id, word, tier, total_count) rows; the previous total is the returned
+    one minus the delta. ``tx`` must be a transaction handle (RETURNING writes).
+    """
+    items = [(k, int(c)) for k, c in deltas.items() if int(c) > 0]
+    out: list[Any] = []
+    for i in range(0, len(items), _MEDAL_CHUNK):
+        chunk = items[i : i + _MEDAL_CHUNK]
+        params: list[Any] = []
+        for (gid, uid, word), c in chunk:
+            params += [int(gid), int(uid), str(word), tier_for_count(c), c, int(now)]
+        sql = _ADD_PROGRESS_SQL.format(values=", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk)))
+        out += await tx.fetchall(sql, tuple(params))
+    return out
+
+
+class KeywordSeed:
+    """Starts the running medal totals of keywords being added to a guild.
+
+    Stored words are matched the way live messages are: the guild's KeywordMatcher
+    (keywords, KEYWORD_ALIASES, MATCH_MODE) decides which words count towards each new
+    keyword, so e.g. "fucking" and "wtf" seed "fuck". Totals don't keep per-message counts,
+    so COUNT_MODE caps can't be applied. Seeded tiers are not announced.
+
+    Three steps, so the write lock is only held for indexed lookups:
+      1. ``scan(dbx)``, outside any transaction: match the guild's vocabulary.
+      2. ``apply(tx, now)``, in the transaction that inserts the keywords (and flushes the
+         buffered counts): match words first seen since the scan, seed from the user totals.
+      3. ``pending_deltas(buffer)``, with no await before the config bump: increments still
+         buffered were parsed without the new keywords, so they are added on top.
+    """
+
+    def __init__(self, guild_id: int, existing: Iterable[str], new: Iterable[str]):
+        self.guild_id = int(guild_id)
+        self.new = {str(w) for w in new}
+        self.matcher = KeywordMatcher({str(w) for w in existing} | self.new, KEYWORD_ALIASES, MATCH_MODE)
+        self._owner: dict[int, str] = {}
+        self._last_word_id = 0
+
+    def _match(self, rows: Iterable[Any]) -> None:
+        for r in rows:
+            kw = self.matcher.match_token(str(r["word"]))
+            if kw in self.new:
+                self._owner[int(r["word_id"])] = kw
+
+    async def scan(self, dbx: Any) -> None:
+        row = await dbx.fetchone("SELECT COALESCE(MAX(word_id), 0) AS m FROM words", ())
+        self._last_word_id = int(row["m"])
+        self._match(await dbx.fetchall(
+            "SELECT w.word_id, w.word FROM guild_word_totals g JOIN words w ON w.word_id = g.word_id "
+            "WHERE g.guild_id=? AND g.count > 0",
+            (self.guild_id,),
+        ))
+
+    async def apply(self, tx: Any, now: int) -> None:
+        """Seed from the totals committed with ``tx``; only for keywords inserted by it."""
+        self._match(await tx.fetchall("SELECT word_id, word FROM words WHERE word_id > ?", (self._last_word_id,)))
+        gid = self.guild_id
+        deltas: dict[tuple[int, int, str], int] = {}
+        ids = [wid for wid, kw in self._owner.items() if kw in self.new]
+        for i in range(0, len(ids), _MEDAL_CHUNK):
+            chunk = ids[i : i + _MEDAL_CHUNK]
+            rows = await tx.fetchall(
+                f"SELECT user_id, word_id, count FROM user_word_totals "
+                f"WHERE guild_id=? AND word_id IN ({', '.join('?' * len(chunk))}) AND count > 0",
+                (gid, *chunk),
+            )
+            for r in rows:
+                key = (gid, int(r["user_id"]), self._owner[int(r["word_id"])])
+                deltas[key] = deltas.get(key, 0) + int(r["count"])
+        await add_medal_progress(tx, deltas, now)
+
+    def pending_deltas(self, buffer: Any) -> dict[tuple[int, int, str], int]:
+        """Keyword hits in the buffer's uncommitted increments (add them with add_medal_progress)."""
+        deltas: dict[tuple[int, int, str], int] = {}
+        for uid, word, c in buffer.pending_words(self.guild_id):
+            kw = self.matcher.match_token(word)
+            if kw in self.new:
+                key = (self.guild_id, uid, kw)
+                deltas[key] = deltas.get(key, 0) + c
+        return deltas
 
 
 def title_for(keyword: str, tier: int) -> str:
@@ -52,159 +171,246 @@ def emoji_for(tier: int) -> str:
     return MEDAL_EMOJIS[idx]
 
 
-class MedalsCog(commands.Cog):
-    """Awards knight/royal themed titles based on keyword usage."""
+def thresholds_hash() -> str:
+    return hashlib.sha256(",".join(str(int(t)) for t in MEDAL_THRESHOLDS).encode("utf-8")).hexdigest()
 
-    def __init__(self, bot: commands.Bot):
-        self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        # Cleanup medal rows for keywords removed long ago
-        if not self.bot.dbx:
-            return
-        now = int(time.time())
-        cutoff = now - int(KEYWORD_REMOVAL_GRACE_SECONDS)
+async def recompute_tiers(dbx: Any, hash_value: str | None = None) -> int:
+    """Re-tier every keyword_medals row if MEDAL_THRESHOLDS changed since the last run.
 
-        try:
-            removals = await self.bot.dbx.fetchall(
-                "SELECT guild_id, word, removed_at FROM keyword_removals WHERE removed_at <= ?",
-                (cutoff,),
-            )
-            for r in removals:
-                gid = int(r["guild_id"])
-                w = str(r["word"])
-                removed_at = int(r["removed_at"])
-
-                # delete medals for that keyword
-                await self.bot.dbx.execute(
-                    "DELETE FROM keyword_medals WHERE guild_id=? AND word=?",
-                    (gid, w),
-                )
-                # delete just the expired removal entries
-                await self.bot.dbx.execute(
-                    "DELETE FROM keyword_removals WHERE guild_id=? AND word=? AND removed_at=?",
-                    (gid, w, removed_at),
+    The thresholds hash is kept in app_meta('medal_thresholds_hash'), like the core stopwords
+    hash. One UPDATE per guild (in its own transaction) rewrites only rows whose tier is
+    stale; the hash is stored once every guild is done, so an interrupted run starts over
+    on the next startup. Returns the number of rows re-tiered.
+    """
+    hash_value = hash_value or thresholds_hash()
+    row = await dbx.fetchone("SELECT value FROM app_meta WHERE key='medal_thresholds_hash'", ())
+    if row and str(row["value"]) == hash_value:
+        return 0
+
+    stale = f"tier <> {_tier_sql('total_count')}"
+    changed = 0
+    now = int(time.time())
+    for g in await dbx.fetchall("SELECT DISTINCT guild_id FROM keyword_medals", ()):
+        gid = int(g["guild_id"])
+        async with dbx.transaction() as tx:
+            n = await tx.fetchone(f"SELECT COUNT(*) AS n FROM keyword_medals WHERE guild_id=? AND {stale}", (gid,))
+            if n and int(n["n"]):
+                await tx.execute(
+                    f"""
+                    UPDATE keyword_medals
+                    SET tier = {_tier_sql('total_count')}, awarded_at = ?
+                    WHERE guild_id=? AND {stale}
+                    """,
+                    (now, gid),
                 )
-        except Exception:
-            self.bot.logger.exception("Medals cleanup failed")
+                changed += int(n["n"])
+    await dbx.execute(
+        """
+        INSERT INTO app_meta(key,value) VALUES ('medal_thresholds_hash', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (hash_value,),
+    )
+    return changed
 
-    async def update_user_keyword(self, guild_id: int, user_id: int, word: str):
-        """Recompute total count and upsert medal tier if changed.
 
-        Returns:
-            crossed_thr: The highest threshold crossed on this update (or None)
-            new_total:   New total count
-            new_tier:    New tier
-        """
-        assert self.bot.dbx is not None
+async def cleanup_removed_keywords(dbx: Any, cutoff: int) -> int:
+    """Drop medal rows of keywords removed at or before ``cutoff`` and forget those removals.
 
-        row = await self.bot.dbx.fetchone(
-            "SELECT COALESCE(SUM(count), 0) AS total FROM word_counts WHERE guild_id=? AND user_id=? AND word=?",
-            (guild_id, user_id, word),
+    Two set-based statements in one transaction, however many removals are due. Keywords
+    that were added back since are left alone. Returns the number of medal rows deleted.
+    """
+    due = """
+        FROM keyword_removals r
+        WHERE r.guild_id = keyword_medals.guild_id AND r.word = keyword_medals.word AND r.removed_at <= ?
+    """
+    async with dbx.transaction() as tx:
+        row = await tx.fetchone(
+            f"""
+            SELECT COUNT(*) AS n FROM keyword_medals
+            WHERE EXISTS (SELECT 1 {due})
+              AND NOT EXISTS (SELECT 1 FROM keywords k WHERE k.guild_id = keyword_medals.guild_id AND k.word = keyword_medals.word)
+            """,
+            (int(cutoff),),
         )
-        total = int(row["total"] if row else 0)
-        tier = tier_for_count(total)
-
-        existing = await self.bot.dbx.fetchone(
-            "SELECT tier, total_count FROM keyword_medals WHERE guild_id=? AND user_id=? AND word=?",
-            (guild_id, user_id, word),
+        await tx.execute(
+            f"""
+            DELETE FROM keyword_medals
+            WHERE EXISTS (SELECT 1 {due})
+              AND NOT EXISTS (SELECT 1 FROM keywords k WHERE k.guild_id = keyword_medals.guild_id AND k.word = keyword_medals.word)
+            """,
+            (int(cutoff),),
         )
-        old_tier = int(existing["tier"]) if existing else -1
-        if existing is None:
-            old_total = 0
-        else:
+        await tx.execute("DELETE FROM keyword_removals WHERE removed_at <= ?", (int(cutoff),))
+    return int(row["n"]) if row else 0
+
+
+class MedalStage(Stage):
+    """Pipeline stage: medal updates + congratulations for live keyword hits."""
+
+    name = "medals"
+    order = 30
+
+    def __init__(self, cog: "MedalsCog"):
+        self.cog = cog
+        # Avoid duplicate medal triggers per message (msg_id -> ts)
+        self._seen: dict[int, float] = {}
+
+    async def process(self, batch: Sequence[ParsedMessage]) -> None:
+        ts_now = time.time()
+        # prune old entries (keep ~15 minutes)
+        for mid, ts in list(self._seen.items()):
+            if ts_now - ts > 900:
+                del self._seen[mid]
+
+        # One running-total update per (guild, user, keyword) per batch, announcing the latest
+        # live message. Like a single message with several occurrences, only the highest
+        # threshold crossed is announced.
+        deltas: dict[tuple[int, int, str], int] = {}
+        latest: dict[tuple[int, int, str], ParsedMessage] = {}
+        for p in batch:
+            if not p.keyword_hits or p.message_id in self._seen:
+                continue
+            self._seen[p.message_id] = ts_now
+            for kw, c in p.keyword_hits.items():
+                key = (p.guild_id, p.user_id, kw)
+                deltas[key] = deltas.get(key, 0) + int(c)
+                # History/replayed messages count but never trigger replies.
+                if p.live:
+                    latest[key] = p
+        if not deltas or not self.cog.bot.dbx:
+            return
+
+        async with self.cog.bot.dbx.transaction() as tx:
+            rows = await add_medal_progress(tx, deltas, int(ts_now))
+
+        for r in rows:
+            key = (int(r["guild_id"]), int(r["user_id"]), str(r["word"]))
+            p = latest.get(key)
+            if p is None:
+                continue
+            total = int(r["total_count"])
+            crossed = crossed_threshold(total - deltas[key], total)
+            if crossed is None:
+                continue
+            self.cog.congratulate(p.message, key[2], crossed, int(r["tier"]))
+
+    async def write(self, tx: Any, batch: Sequence[ParsedMessage], prepared: Any) -> None:
+        # History: add to the running totals, never announce.
+        deltas: dict[tuple[int, int, str], int] = {}
+        for p in batch:
+            for kw, c in p.keyword_hits.items():
+                key = (p.guild_id, p.user_id, kw)
+                deltas[key] = deltas.get(key, 0) + int(c)
+        if deltas:
+            await add_medal_progress(tx, deltas, int(time.time()))
+
+
+class MedalsCog(commands.Cog):
+    """Awards knight/royal themed titles based on keyword usage."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._retier_task: asyncio.Task | None = None
+        # Congrats are sent from here, so Discord latency and rate limits never stall ingestion.
+        self.announcements = AnnouncementQueue(self._send_announcement)
+
+    async def cog_load(self):
+        get_pipeline(self.bot).add_stage(MedalStage(self))
+        get_scheduler(self.bot).add_job("medal-cleanup", self._cleanup_removed_keywords, MEDAL_CLEANUP_INTERVAL_SECONDS)
+        if getattr(self.bot, "dbx", None) is not None:
+            # In the background: a large keyword_medals table must not hold up startup.
+            self._retier_task = asyncio.create_task(self._recompute_tiers(), name="medal-retier")
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stage(MedalStage.name)
+        await get_scheduler(self.bot).remove_job("medal-cleanup")
+        if self._retier_task is not None:
+            self._retier_task.cancel()
             try:
-                old_total = int(existing["total_count"] or 0)
-            except Exception:
-                old_total = 0
-
-        # Did we cross a threshold? (handles multi-occurrence messages)
-        crossed_thr = None
-        for thr in MEDAL_THRESHOLDS:
-            if old_total < thr <= total:
-                crossed_thr = thr
-
-        # Also update stored total_count periodically even if tier doesn't change
-        if tier == old_tier:
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, user_id, word)
-                DO UPDATE SET total_count=excluded.total_count
-                """,
-                (guild_id, user_id, word, tier, total, int(time.time())),
-            )
-            return crossed_thr, total, tier
+                await self._retier_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._retier_task = None
+        await self.announcements.close()
+
+    async def _recompute_tiers(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            changed = await recompute_tiers(self.bot.dbx)
+        except Exception:
+            self.bot.logger.exception("Medal tier recompute failed; will retry on next startup")
+            return
+        if changed:
+            self.bot.logger.info("Medal tiers recomputed: %d row(s) (%.2fs)", changed, time.perf_counter() - t0)
 
-        await self.bot.dbx.execute(
-            """
-            INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(guild_id, user_id, word)
-            DO UPDATE SET tier=excluded.tier,
-                          total_count=excluded.total_count,
-                          awarded_at=excluded.awarded_at
-            """,
-            (guild_id, user_id, word, tier, total, int(time.time())),
-        )
+    async def _cleanup_removed_keywords(self) -> int:
+        """Maintenance job: expire medals of keywords removed more than the grace period ago."""
+        deleted = await cleanup_removed_keywords(self.bot.dbx, int(time.time()) - int(KEYWORD_REMOVAL_GRACE_SECONDS))
+        if deleted:
+            self.bot.logger.info("Medals cleanup: %d medal row(s) of removed keywords deleted", deleted)
+        return deleted
 
-        return crossed_thr, total, tier
+    def congratulate(self, message: discord.Message, word: str, crossed_thr: int, tier: int) -> None:
+        """Queue the congrats for a threshold the message's author just crossed.
 
+        Sending happens in the announcement queue; a later unlock of the same keyword by the
+        same user in the channel replaces this one if it was not sent yet.
+        """
+        self.announcements.submit(message.channel.id, (message.author.id, word), (message, word, crossed_thr, tier))
+
+    @staticmethod
+    def _announcement_chunks(items: Sequence[tuple]) -> list[str]:
+        """Render queued (message, word, threshold, tier) unlocks as messages under Discord's 2000 chars."""
+        if len(items) == 1:
+            message, word, crossed_thr, tier = items[0]
+            return [
+                f"✨🏅 **MEDAL UNLOCKED!** 🏅✨\n"
+                f"{message.author.mention} you used **{keyword_display(word)}** **{crossed_thr}** times.\n"
+                f"You're now **{title_for(word, tier)}** {emoji_for(tier)}✨"
+            ]
+
+        chunks, current = [], "✨🏅 **MEDALS UNLOCKED!** 🏅✨"
+        for message, word, crossed_thr, tier in items:
+            line = (
+                f"{message.author.mention} used **{keyword_display(word)}** **{crossed_thr}** times: "
+                f"**{title_for(word, tier)}** {emoji_for(tier)}"
+            )
+            if len(current) + 1 + len(line) > 2000:
+                chunks.append(current)
+                current = line
+            else:
+                current += "\n" + line
+        chunks.append(current)
+        return chunks
 
-    async def maybe_congratulate(self, message: discord.Message, guild_id: int, user_id: int, word: str):
-        """Update medal state for (user, word) and send congrats reply if a threshold is crossed.
+    async def _send_announcement(self, channel_id: int, items: list) -> None:
+        """AnnouncementQueue sender: one reply (to the latest unlocking message) per batch.
 
         Notes for threads:
         - If the bot lacks "Send Messages in Threads" permission, replying inside the thread will fail.
           In that case, we fall back to posting in the parent channel with a link to the thread/message.
         """
-        crossed_thr, total, tier = await self.update_user_keyword(guild_id, user_id, word)
-        if crossed_thr is None:
-            return
-
-        medal_emoji = emoji_for(tier)
-        title = title_for(word, tier)
-        kdisp = keyword_display(word)
-
-        content = (
-            f"✨🏅 **MEDAL UNLOCKED!** 🏅✨\n"
-            f"{message.author.mention} you used **{kdisp}** **{crossed_thr}** times.\n"
-            f"You're now **{title}** {medal_emoji}✨"
-        )
+        message = items[-1][0]
+        chunks = self._announcement_chunks(items)
+        mentions = discord.AllowedMentions(users=True, replied_user=True, roles=False, everyone=False)
+        target = message.channel
 
         try:
             # Reply in-place (works in normal channels and threads, assuming permissions allow).
-            await message.reply(
-                content,
-                mention_author=True,
-                allowed_mentions=discord.AllowedMentions(
-                    users=True, replied_user=True, roles=False, everyone=False
-                ),
-            )
+            await message.reply(chunks[0], mention_author=True, allowed_mentions=mentions)
+        except discord.NotFound:
+            # The message was deleted while the announcement was queued.
+            await target.send(chunks[0], allowed_mentions=mentions)
         except discord.Forbidden:
             # Common in threads if the bot doesn't have "Send Messages in Threads".
             # Fallback: post in the parent channel (or current channel) with a jump link.
             jump = getattr(message, "jump_url", None)
-            fallback = content
-            if jump:
-                fallback += f"\n↪️ {jump}"
-
-            chan = message.channel
-            parent = getattr(chan, "parent", None)
-            target = parent or chan
-            try:
-                await target.send(
-                    fallback,
-                    allowed_mentions=discord.AllowedMentions(
-                        users=True, roles=False, everyone=False
-                    ),
-                )
-            except Exception:
-                self.bot.logger.exception("Failed to send medal congrats fallback message")
-        except Exception:
-            self.bot.logger.exception("Failed to send medal congrats message")
+            target = getattr(target, "parent", None) or target
+            await target.send(chunks[0] + (f"\n↪️ {jump}" if jump else ""), allowed_mentions=mentions)
+        for extra in chunks[1:]:
+            await target.send(extra, allowed_mentions=mentions)
 
     async def top_medals_for_user(self, guild_id: int, user_id: int, limit: int = 3):
         assert self.bot.dbx is not None
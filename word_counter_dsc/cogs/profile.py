@@ -4,6 +4,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from word_counter_dsc.purges import not_purged
 from word_counter_dsc.utils import safe_allowed_mentions, user_mention, progress_bar
 from word_counter_dsc.ui.pagination import Paginator
 from word_counter_dsc.ui.theme import base_embed
@@ -24,16 +25,16 @@ class ProfileCog(commands.Cog):
 
         # keyword totals for this user
         rows = await self.bot.dbx.fetchall(
-            """
-            SELECT wc.word AS keyword, SUM(wc.count) AS total
-            FROM word_counts wc
-            JOIN keywords k
-              ON k.guild_id = wc.guild_id AND k.word = wc.word
-            WHERE wc.guild_id=? AND wc.user_id=?
-            GROUP BY wc.word
+            f"""
+            SELECT k.word AS keyword, t.count AS total
+            FROM keywords k
+            JOIN words w ON w.word = k.word
+            JOIN user_word_totals t
+              ON t.guild_id = k.guild_id AND t.user_id=? AND t.word_id = w.word_id
+            WHERE k.guild_id=? AND {not_purged("t.word_id")}
             ORDER BY total DESC
             """,
-            (guild_id, uid),
+            (uid, guild_id, guild_id),
         )
         kw_totals = [(r["keyword"], int(r["total"])) for r in rows if int(r["total"]) > 0 and str(r["keyword"]) not in CORE_STOPWORDS]
         distinct_kw = len(kw_totals)
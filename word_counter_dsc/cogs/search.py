@@ -5,6 +5,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from word_counter_dsc.config import DEFAULT_TOP_N
+from word_counter_dsc.leaderboards import WINDOW_CHOICES, WINDOW_LABELS, top_users_for_word, top_words, word_total
 from word_counter_dsc.stopwords_core import CORE_STOPWORDS
 from word_counter_dsc.ui.theme import base_embed
 from word_counter_dsc.ui.pagination import Paginator
@@ -28,10 +29,22 @@ class SearchCog(commands.Cog):
         return set(CORE_STOPWORDS) | {str(r["word"]) for r in rows}
 
     @app_commands.command(name="rank", description="Top users for a keyword in this server.")
-    @app_commands.describe(keyword="Keyword (must be in /keyword list)", top_n="How many users to show (max 25)")
-    async def rank(self, interaction: discord.Interaction, keyword: str, top_n: int | None = None):
+    @app_commands.describe(
+        keyword="Keyword (must be in /keyword list)",
+        top_n="How many users to show (max 25)",
+        window="Time range (default: all time)",
+    )
+    @app_commands.choices(window=WINDOW_CHOICES)
+    async def rank(
+        self,
+        interaction: discord.Interaction,
+        keyword: str,
+        top_n: int | None = None,
+        window: app_commands.Choice[str] | None = None,
+    ):
         assert self.bot.dbx is not None
         gid = int(interaction.guild_id or 0)
+        win = window.value if window else "all"
         kw = normalize_word(keyword)
         n = int(top_n or DEFAULT_TOP_N)
         n = max(1, min(n, 25))
@@ -51,21 +64,12 @@ class SearchCog(commands.Cog):
             )
             return
 
-        rows = await self.bot.dbx.fetchall(
-            """
-            SELECT user_id, SUM(count) AS total
-            FROM word_counts
-            WHERE guild_id=? AND word=?
-            GROUP BY user_id
-            ORDER BY total DESC
-            LIMIT ?
-            """,
-            (gid, kw, n),
-        )
+        rows = await top_users_for_word(self.bot.dbx, gid, kw, n, win)
 
         title = f"Top {len(rows)} for '{kw}'"
+        subtitle = f"Keyword leaderboard (server-wide, {WINDOW_LABELS[win]})."
         if not rows:
-            emb = base_embed(title, "Keyword leaderboard (server-wide).")
+            emb = base_embed(title, subtitle)
             emb.description = "_No counts yet._"
             await interaction.response.send_message(embed=emb, allowed_mentions=safe_allowed_mentions())
             return
@@ -79,7 +83,7 @@ class SearchCog(commands.Cog):
         embeds: list[discord.Embed] = []
         chunks = _chunk(lines, 15)
         for pi, chunk in enumerate(chunks, start=1):
-            emb = base_embed(title, "Keyword leaderboard (server-wide).")
+            emb = base_embed(title, subtitle)
             emb.add_field(
                 name=f"Leaderboard — Page {pi}/{len(chunks)}",
                 value="\n".join(chunk),
@@ -95,10 +99,22 @@ class SearchCog(commands.Cog):
         )
 
     @app_commands.command(name="search", description="See who used a tracked word the most in this server.")
-    @app_commands.describe(word="Any tracked word", top_n="How many users to show (max 25)")
-    async def search_word(self, interaction: discord.Interaction, word: str, top_n: int | None = None):
+    @app_commands.describe(
+        word="Any tracked word",
+        top_n="How many users to show (max 25)",
+        window="Time range (default: all time)",
+    )
+    @app_commands.choices(window=WINDOW_CHOICES)
+    async def search_word(
+        self,
+        interaction: discord.Interaction,
+        word: str,
+        top_n: int | None = None,
+        window: app_commands.Choice[str] | None = None,
+    ):
         assert self.bot.dbx is not None
         gid = int(interaction.guild_id or 0)
+        win = window.value if window else "all"
         w = normalize_word(word)
         n = max(1, min(int(top_n or DEFAULT_TOP_N), 25))
 
@@ -111,25 +127,11 @@ class SearchCog(commands.Cog):
             await interaction.response.send_message(f"`{w}` is a stopword and is not tracked.", ephemeral=True)
             return
 
-        rows = await self.bot.dbx.fetchall(
-            """
-            SELECT user_id, SUM(count) AS total
-            FROM word_counts
-            WHERE guild_id=? AND word=?
-            GROUP BY user_id
-            ORDER BY total DESC
-            LIMIT ?
-            """,
-            (gid, w, n),
-        )
-        total_row = await self.bot.dbx.fetchone(
-            "SELECT SUM(count) AS total FROM word_counts WHERE guild_id=? AND word=?",
-            (gid, w),
-        )
-        total = int(total_row["total"] or 0) if total_row else 0
+        rows = await top_users_for_word(self.bot.dbx, gid, w, n, win)
+        total = await word_total(self.bot.dbx, gid, w, win)
 
         title = f"Search: '{w}'"
-        subtitle = f"Total in this server: **{total}**"
+        subtitle = f"Total in this server ({WINDOW_LABELS[win]}): **{total}**"
         if not rows:
             emb = base_embed(title, subtitle)
             emb.description = "_No counts yet._"
@@ -157,41 +159,35 @@ class SearchCog(commands.Cog):
         )
 
     @app_commands.command(name="top", description="Top tracked words (stopwords ignored).")
-    @app_commands.describe(user="Optional: show top words for a specific user", top_n="How many words to show (max 25)")
-    async def top_words(self, interaction: discord.Interaction, user: discord.Member | None = None, top_n: int | None = None):
+    @app_commands.describe(
+        user="Optional: show top words for a specific user",
+        top_n="How many words to show (max 25)",
+        window="Time range (default: all time)",
+    )
+    @app_commands.choices(window=WINDOW_CHOICES)
+    async def top_words(
+        self,
+        interaction: discord.Interaction,
+        user: discord.Member | None = None,
+        top_n: int | None = None,
+        window: app_commands.Choice[str] | None = None,
+    ):
         assert self.bot.dbx is not None
         gid = int(interaction.guild_id or 0)
         uid = int(user.id) if user else None
         n = max(1, min(int(top_n or DEFAULT_TOP_N), 25))
+        win = window.value if window else "all"
 
         sw = await self._guild_stopwords(gid)
 
+        # fetch extra then filter stopwords
+        rows = await top_words(self.bot.dbx, gid, n * 3, win, user_id=uid)
         if uid is None:
-            rows = await self.bot.dbx.fetchall(
-                """
-                SELECT word, SUM(count) AS total
-                FROM word_counts
-                WHERE guild_id=?
-                GROUP BY word
-                ORDER BY total DESC
-                LIMIT ?
-                """,
-                (gid, n * 3),  # fetch extra then filter stopwords
-            )
             title = f"Top tracked words (server) — showing {n}"
         else:
-            rows = await self.bot.dbx.fetchall(
-                """
-                SELECT word, SUM(count) AS total
-                FROM word_counts
-                WHERE guild_id=? AND user_id=?
-                GROUP BY word
-                ORDER BY total DESC
-                LIMIT ?
-                """,
-                (gid, uid, n * 3),
-            )
             title = f"Top tracked words for {user.display_name} — showing {n}"
+        if win != "all":
+            title += f" ({WINDOW_LABELS[win]})"
 
         # Filter stopwords + trim
         clean = []
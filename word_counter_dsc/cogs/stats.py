@@ -1,31 +1,36 @@
-from discord.ext import commands
+from __future__ import annotations
+
 import discord
+from discord import app_commands
+from discord.ext import commands
+
+from word_counter_dsc.leaderboards import WINDOW_CHOICES, WINDOW_LABELS, top_words
+from word_counter_dsc.ui.theme import base_embed
+from word_counter_dsc.utils import safe_allowed_mentions
+
 
-class Stats(commands.Cog):
-    def __init__(self, bot):
+class StatsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @discord.app_commands.command(name="leaderboard", description="Top words")
-    async def leaderboard(self, interaction: discord.Interaction):
-        async with self.bot.db_lock:
-            cursor = await self.bot.db.execute("""
-            SELECT word, SUM(count) as total
-            FROM word_counts
-            WHERE guild_id=?
-            GROUP BY word
-            ORDER BY total DESC
-            LIMIT 10
-            """, (interaction.guild.id,))
-            rows = await cursor.fetchall()
+    @app_commands.command(name="leaderboard", description="Top 10 words in this server.")
+    @app_commands.describe(window="Time range (default: all time)")
+    @app_commands.choices(window=WINDOW_CHOICES)
+    async def leaderboard(self, interaction: discord.Interaction, window: app_commands.Choice[str] | None = None):
+        assert self.bot.dbx is not None
+        gid = int(interaction.guild_id or 0)
+        win = window.value if window else "all"
 
+        rows = await top_words(self.bot.dbx, gid, 10, win)
         if not rows:
-            return await interaction.response.send_message("No data.", ephemeral=True)
+            await interaction.response.send_message("No data.", ephemeral=True)
+            return
 
-        embed = discord.Embed(title="📊 Top Words", color=0x00ffcc)
-        for i, (word, total) in enumerate(rows):
-            embed.add_field(name=f"{i+1}. {word}", value=str(total), inline=False)
+        emb = base_embed("📊 Top Words", f"Server-wide, {WINDOW_LABELS[win]}.")
+        for i, r in enumerate(rows, start=1):
+            emb.add_field(name=f"{i}. {r['word']}", value=f"{int(r['total']):,}", inline=False)
+        await interaction.response.send_message(embed=emb, allowed_mentions=safe_allowed_mentions())
 
-        await interaction.response.send_message(embed=embed)
 
-async def setup(bot):
-    await bot.add_cog(Stats(bot))
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCog(bot))
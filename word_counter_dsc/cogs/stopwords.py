@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import time
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from word_counter_dsc.config import PURGE_INTERVAL_SECONDS
+from word_counter_dsc.config_bus import SCOPE_STOPWORDS, get_config_bus
+from word_counter_dsc.maintenance import get_scheduler
+from word_counter_dsc.purges import (
+    PURGE_JOB,
+    cancel_word_purges,
+    purge_progress,
+    queue_word_purges,
+    run_word_purges,
+)
 from word_counter_dsc.utils import split_csv_words, safe_allowed_mentions
 from word_counter_dsc.stopwords_core import CORE_STOPWORDS
 
@@ -20,8 +31,45 @@ EXTRA_STOPWORDS: set[str] = set()
 class StopwordsCog(commands.GroupCog, group_name="stopword", group_description="Manage stopwords (words ignored for fun stats)"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._purge_kick: asyncio.Task | None = None
         super().__init__()
 
+    async def cog_load(self):
+        # Deletes the counts of new stopwords (server and core) in the background.
+        get_scheduler(self.bot).add_job(PURGE_JOB, self._run_purges, PURGE_INTERVAL_SECONDS)
+
+    async def cog_unload(self):
+        await get_scheduler(self.bot).remove_job(PURGE_JOB)
+        if self._purge_kick is not None:
+            self._purge_kick.cancel()
+            self._purge_kick = None
+
+    async def _run_purges(self) -> dict[str, int]:
+        stats = await run_word_purges(self.bot.dbx)
+        if stats["words"]:
+            self.bot.logger.info("Word purge: %d word(s) done, %d row(s) deleted", stats["words"], stats["rows"])
+        return stats
+
+    def _start_purge(self) -> None:
+        """Run the purge job now rather than at its next interval (no-op if it is already running).
+
+        With the job disabled (PURGE_INTERVAL_SECONDS <= 0) the queue is worked through directly,
+        so queued words never stay hidden with their counts left in place.
+        """
+        if self._purge_kick is not None and not self._purge_kick.done():
+            return
+        scheduler = get_scheduler(self.bot)
+        if PURGE_JOB in scheduler.jobs:
+            run = scheduler.run_job(PURGE_JOB, force=True)
+        else:
+            run = self._run_purges()
+        self._purge_kick = asyncio.create_task(run, name="word-purge-kick")
+        self._purge_kick.add_done_callback(self._purge_done)
+
+    def _purge_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.bot.logger.error("Word purge failed", exc_info=task.exception())
+
     @app_commands.command(name="list", description="Show stopwords for this server.")
     async def list_sw(self, interaction: discord.Interaction):
         assert self.bot.dbx is not None
@@ -94,27 +142,50 @@ class StopwordsCog(commands.GroupCog, group_name="stopword", group_description="
             return
 
         now = int(time.time())
-        for w in items:
-            await self.bot.dbx.execute(
+        async with self.bot.dbx.transaction() as tx:
+            await tx.executemany(
                 """
                 INSERT INTO stopwords (guild_id, word, created_at)
                 VALUES (?, ?, ?)
                 ON CONFLICT(guild_id, word) DO NOTHING
                 """,
-                (gid, w, now),
+                [(gid, w, now) for w in items],
             )
 
-        # Purge any existing counts for these stopwords to save DB space (server extras + core are never counted going forward)
-        if getattr(self.bot.dbx, "dialect", "") == "postgres":
-            await self.bot.dbx.execute(
-                "DELETE FROM word_counts WHERE guild_id=? AND word = ANY(?)",
-                (gid, items),
-            )
-        else:
-            q = "DELETE FROM word_counts WHERE guild_id=? AND word IN (" + ",".join(["?"] * len(items)) + ")"
-            await self.bot.dbx.execute(q, (gid, *items))
+            # Existing counts are hidden from now on and deleted in the background (they can be large).
+            await queue_word_purges(tx, gid, items, now)
+        # New stopwords stop being counted right away (not after a cache TTL).
+        await get_config_bus(self.bot).bump(gid, SCOPE_STOPWORDS)
+        tracker = self.bot.get_cog("TrackerCog")
+        if tracker is not None and getattr(tracker, "buffer", None) is not None:
+            tracker.buffer.discard(gid, items)
+        self._start_purge()
 
-        await interaction.response.send_message(f"Added {len(items)} stopword(s).", ephemeral=True)
+        await interaction.response.send_message(
+            f"Added {len(items)} stopword(s). Their existing counts are hidden now and deleted in the "
+            "background (see /stopword purges).",
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="purges", description="Show stopword count purges still in progress.")
+    async def purges(self, interaction: discord.Interaction):
+        assert self.bot.dbx is not None
+        gid = int(interaction.guild_id or 0)
+        rows = await purge_progress(self.bot.dbx, gid)
+        emb = base_embed("Stopwords — Purges", "Counts of new stopwords are hidden at once and deleted in the background.")
+        if not rows:
+            emb.description = "_No purges in progress._"
+        else:
+            lines = [
+                f"• **{r['word']}** — {int(r['deleted']):,} row(s) deleted"
+                + (" (core stopword, all servers)" if r["all_guilds"] else "")
+                + f", queued <t:{int(r['created_at'])}:R>"
+                for r in rows[:10]
+            ]
+            if len(rows) > 10:
+                lines.append(f"…and {len(rows) - 10} more")
+            emb.add_field(name=f"In progress ({len(rows)})", value="\n".join(lines), inline=False)
+        await interaction.response.send_message(embed=emb, ephemeral=True, allowed_mentions=safe_allowed_mentions())
 
     @app_commands.command(name="remove", description="Remove one or more stopwords (comma/space separated).")
     async def remove_sw(self, interaction: discord.Interaction, words: str):
@@ -124,11 +195,14 @@ class StopwordsCog(commands.GroupCog, group_name="stopword", group_description="
         if not items:
             await interaction.response.send_message("No stopwords provided.", ephemeral=True)
             return
-        for w in items:
-            await self.bot.dbx.execute(
+        async with self.bot.dbx.transaction() as tx:
+            await tx.executemany(
                 "DELETE FROM stopwords WHERE guild_id=? AND word=?",
-                (gid, w),
+                [(gid, w) for w in items],
             )
+            # Counts not purged yet are visible again and kept (new ones are counted from now on).
+            await cancel_word_purges(tx, gid, items)
+        await get_config_bus(self.bot).bump(gid, SCOPE_STOPWORDS)
         await interaction.response.send_message(f"Removed {len(items)} stopword(s).", ephemeral=True)
 
     @app_commands.command(name="seed", description="Seed a good default stopword list (Ephemeral).")
@@ -136,15 +210,15 @@ class StopwordsCog(commands.GroupCog, group_name="stopword", group_description="
         assert self.bot.dbx is not None
         gid = int(interaction.guild_id or 0)
         now = int(time.time())
-        for w in sorted(EXTRA_STOPWORDS):
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO stopwords (guild_id, word, created_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(guild_id, word) DO NOTHING
-                """,
-                (gid, w, now),
-            )
+        await self.bot.dbx.executemany(
+            """
+            INSERT INTO stopwords (guild_id, word, created_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id, word) DO NOTHING
+            """,
+            [(gid, w, now) for w in sorted(EXTRA_STOPWORDS)],
+        )
+        await get_config_bus(self.bot).bump(gid, SCOPE_STOPWORDS)
         await interaction.response.send_message("Core stopwords are built-in. (No server defaults to seed.)", ephemeral=True)
 
 
@@ -1,13 +1,75 @@
 from __future__ import annotations
 
-import time
 from collections import Counter
+from typing import Any, Sequence
 
-import discord
 from discord.ext import commands
 
+from word_counter_dsc.buckets import compact_buckets, day_start, upsert_word_buckets
+from word_counter_dsc.config import (
+    BUCKET_COMPACT_INTERVAL_SECONDS,
+    COUNT_CAP,
+    COUNT_MODE,
+    KEYWORD_ALIASES,
+    MATCH_MODE,
+    ROLLUP_REBUILD_INTERVAL_SECONDS,
+)
+from word_counter_dsc.config_bus import (
+    SCOPE_ABBREVIATIONS,
+    SCOPE_KEYWORDS,
+    SCOPE_STOPWORDS,
+    ConfigVersion,
+    get_config_bus,
+)
+from word_counter_dsc.maintenance import get_scheduler
+from word_counter_dsc.pipeline import ParsedMessage, Stage, get_pipeline
 from word_counter_dsc.stopwords_core import CORE_STOPWORDS
-from word_counter_dsc.utils import tokenize
+from word_counter_dsc.utils import (
+    AbbrevTable,
+    KeywordMatcher,
+    apply_count_mode,
+    compile_abbreviations,
+    tokenize_expanded,
+)
+from word_counter_dsc.write_buffer import WordCountBuffer, resolve_word_ids, upsert_word_counts
+
+
+class WordCountStage(Stage):
+    """Pipeline stage: buffer tracked-word counts (flushed as bulk upserts, see write_buffer)."""
+
+    name = "word_counts"
+    order = 10
+
+    def __init__(self, buffer: WordCountBuffer):
+        self.buffer = buffer
+
+    async def process(self, batch: Sequence[ParsedMessage]) -> None:
+        # This table stores *all* tracked words; profile page 2 later filters to keywords.
+        for p in batch:
+            if p.words:
+                self.buffer.add(p.guild_id, p.channel_id, p.user_id, p.words, p.created_at)
+
+    async def prepare(self, batch: Sequence[ParsedMessage]) -> Any:
+        # Aggregated like the buffer does; word ids are resolved before the transaction.
+        rows: dict[tuple[int, int, int, str], list[int]] = {}
+        buckets: Counter = Counter()
+        for p in batch:
+            day = day_start(p.created_at)
+            for w, c in p.words.items():
+                slot = rows.setdefault((p.guild_id, p.channel_id, p.user_id, w), [0, p.created_at])
+                slot[0] += int(c)
+                slot[1] = max(slot[1], p.created_at)
+                buckets[(p.guild_id, p.user_id, w, day)] += int(c)
+        return await resolve_word_ids(
+            self.buffer.dbx,
+            [(gid, cid, uid, w, c, ts) for (gid, cid, uid, w), (c, ts) in rows.items()],
+            [(gid, uid, w, day, c) for (gid, uid, w, day), c in buckets.items()],
+        )
+
+    async def write(self, tx: Any, batch: Sequence[ParsedMessage], prepared: Any) -> None:
+        rows, bucket_rows = prepared
+        await upsert_word_counts(tx, rows)
+        await upsert_word_buckets(tx, bucket_rows)
 
 
 class TrackerCog(commands.Cog):
@@ -19,14 +81,58 @@ class TrackerCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._stop_cache: dict[int, tuple[float, set[str]]] = {}
-        self._abbr_cache: dict[int, tuple[float, dict[str, str]]] = {}
-        self._ttl_sec = 60.0
+        # Per-guild caches, revalidated against the config bus version (no timer-based reloads)
+        self.bus = get_config_bus(bot)
+        self._stop_cache: dict[int, tuple[ConfigVersion, set[str]]] = {}
+        self._abbr_cache: dict[int, tuple[ConfigVersion, AbbrevTable]] = {}
+        self._kw_cache: dict[int, tuple[ConfigVersion, KeywordMatcher]] = {}
+        # Write-behind buffer for word_counts (created once the DB is available)
+        self.buffer: WordCountBuffer | None = None
+
+    async def cog_load(self):
+        dbx = getattr(self.bot, "dbx", None)
+        if dbx is not None:
+            self.buffer = WordCountBuffer(dbx)
+            self.buffer.start()
+            get_pipeline(self.bot).add_stage(WordCountStage(self.buffer))
+            scheduler = get_scheduler(self.bot)
+            scheduler.add_job("bucket-compaction", self._compact_buckets, BUCKET_COMPACT_INTERVAL_SECONDS)
+            scheduler.add_job("rollup-rebuild", self._rebuild_rollups, ROLLUP_REBUILD_INTERVAL_SECONDS)
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stage(WordCountStage.name)
+        scheduler = get_scheduler(self.bot)
+        await scheduler.remove_job("bucket-compaction")
+        await scheduler.remove_job("rollup-rebuild")
+        # Flush buffered counts before the cog (or the bot) goes away.
+        if self.buffer is not None:
+            try:
+                await self.buffer.close()
+            except Exception:
+                self.bot.logger.exception("Final word count flush failed")
+
+    async def _compact_buckets(self) -> dict[str, int]:
+        """Maintenance job: day -> week -> month compaction of the word/emoji time buckets."""
+        stats = await compact_buckets(self.bot.dbx, [g.id for g in self.bot.guilds])
+        if stats["weeks"] or stats["months"] or stats["dropped"]:
+            self.bot.logger.info(
+                "Buckets compacted: guilds=%d weeks=%d months=%d dropped=%d",
+                stats["guilds"], stats["weeks"], stats["months"], stats["dropped"],
+            )
+        return stats
+
+    async def _rebuild_rollups(self) -> dict[str, int]:
+        """Maintenance job: regenerate user/guild totals, one guild per transaction."""
+        rows = 0
+        guilds = [g.id for g in self.bot.guilds]
+        for gid in guilds:
+            rows += await self.bot.dbx.rebuild_rollups(gid)
+        return {"guilds": len(guilds), "rows": rows}
 
     async def _get_stopwords(self, guild_id: int) -> set[str]:
-        now = time.time()
+        version = self.bus.version(guild_id, SCOPE_STOPWORDS)
         cached = self._stop_cache.get(guild_id)
-        if cached and (now - cached[0]) < self._ttl_sec:
+        if cached and cached[0] == version:
             return cached[1]
 
         assert self.bot.dbx is not None
@@ -35,13 +141,13 @@ class TrackerCog(commands.Cog):
             (guild_id,),
         )
         sw = set(CORE_STOPWORDS) | {str(r["word"]) for r in rows}
-        self._stop_cache[guild_id] = (now, sw)
+        self._stop_cache[guild_id] = (version, sw)
         return sw
 
-    async def _get_abbreviations(self, guild_id: int) -> dict[str, str]:
-        now = time.time()
+    async def _get_abbreviations(self, guild_id: int) -> AbbrevTable:
+        version = self.bus.version(guild_id, SCOPE_ABBREVIATIONS)
         cached = self._abbr_cache.get(guild_id)
-        if cached and (now - cached[0]) < self._ttl_sec:
+        if cached and cached[0] == version:
             return cached[1]
 
         assert self.bot.dbx is not None
@@ -49,91 +155,54 @@ class TrackerCog(commands.Cog):
             "SELECT abbreviation, expansion FROM abbreviations WHERE guild_id=?",
             (guild_id,),
         )
-        ab = {str(r["abbreviation"]): str(r["expansion"]) for r in rows}
-        self._abbr_cache[guild_id] = (now, ab)
+        # Expansions are tokenized once here, not on every message.
+        ab = compile_abbreviations({str(r["abbreviation"]): str(r["expansion"]) for r in rows})
+        self._abbr_cache[guild_id] = (version, ab)
         return ab
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild or not self.bot.dbx:
-            return
+    async def _get_keyword_matcher(self, guild_id: int) -> KeywordMatcher:
+        version = self.bus.version(guild_id, SCOPE_KEYWORDS)
+        cached = self._kw_cache.get(guild_id)
+        if cached and cached[0] == version:
+            return cached[1]
 
-        text = (message.content or "").strip()
-        if not text:
-            return
+        assert self.bot.dbx is not None
+        rows = await self.bot.dbx.fetchall(
+            "SELECT word FROM keywords WHERE guild_id=?",
+            (guild_id,),
+        )
+        # Rebuilt only when the guild's keywords change.
+        matcher = KeywordMatcher((str(r["word"]) for r in rows), KEYWORD_ALIASES, MATCH_MODE)
+        self._kw_cache[guild_id] = (version, matcher)
+        return matcher
+
+    async def count_message(self, guild_id: int, text: str) -> tuple[Counter, Counter]:
+        """Word parsing for one message: (tracked-word counts, keyword hits).
 
-        gid = int(message.guild.id)
-        cid = int(message.channel.id)
-        uid = int(message.author.id)
+        Called by the ingest pipeline's parse step for live and history messages alike.
+        """
+        text = (text or "").strip()
+        if not text:
+            return Counter(), Counter()
 
         # Expand abbreviations into their expansions (helps catch intended keywords)
-        abbr_map = await self._get_abbreviations(gid)
-        tokens0 = tokenize(text)
-        if abbr_map:
-            expansions = []
-            for t in tokens0:
-                exp = abbr_map.get(t)
-                if exp:
-                    expansions.append(exp)
-            if expansions:
-                text = text + " " + " ".join(expansions)
-
-        tokens = tokenize(text)
+        abbr_table = await self._get_abbreviations(guild_id)
+        tokens = tokenize_expanded(text, abbr_table, unique=COUNT_MODE == "UNIQUE")
         if not tokens:
-            return
+            return Counter(), Counter()
 
-        stopwords = await self._get_stopwords(gid)
+        stopwords = await self._get_stopwords(guild_id)
 
         # Count tracked words (already tokenized + normalized), excluding stopwords
         counts = Counter(t for t in tokens if t and t not in stopwords)
+        counts = apply_count_mode(counts, COUNT_MODE, COUNT_CAP)
         if not counts:
-            return
+            return counts, Counter()
 
-        now = int(time.time())
-
-        # ---- persist tracked-word counts ----
-        # This table stores *all* tracked words; profile page 2 later filters to keywords.
-        for w, c in counts.items():
-            await self.bot.dbx.execute(
-                """
-                INSERT INTO word_counts (guild_id, channel_id, user_id, word, count, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(guild_id, channel_id, user_id, word)
-                DO UPDATE SET count = word_counts.count + excluded.count,
-                              updated_at = excluded.updated_at
-                """,
-                (gid, cid, uid, str(w), int(c), now),
-            )
-
-        # Pull server keywords from DB (used for keyword stats + medals)
-        kw_rows = await self.bot.dbx.fetchall(
-            "SELECT word FROM keywords WHERE guild_id=?",
-            (gid,),
-        )
-        keywords = {str(r["word"]) for r in kw_rows}
-
-        # Avoid duplicate medal triggers per message (discord.Message is slot-based; no setattr)
-        if not hasattr(self, "_medal_seen"):
-            self._medal_seen = {}  # msg_id -> ts
-        seen = self._medal_seen
-        ts_now = time.time()
-        # prune old entries (keep ~15 minutes)
-        for mid, ts in list(seen.items()):
-            if ts_now - ts > 900:
-                del seen[mid]
-        if message.id in seen:
-            return
-        seen[message.id] = ts_now
-
-        # Trigger medal update + congratulatory reply for any keywords that appeared
-        medals_cog = self.bot.get_cog("MedalsCog")
-        if medals_cog and hasattr(medals_cog, "maybe_congratulate"):
-            for kw in keywords:
-                if kw in counts:
-                    try:
-                        await medals_cog.maybe_congratulate(message, gid, uid, kw)
-                    except Exception:
-                        self.bot.logger.exception("Medal congrats failed")
+        # Keyword hits (keywords + aliases, per MATCH_MODE) in one pass over the counted tokens.
+        # Several tokens can hit one keyword (fuck, fucking, wtf), so the count mode applies again.
+        matcher = await self._get_keyword_matcher(guild_id)
+        return counts, apply_count_mode(matcher.find(counts), COUNT_MODE, COUNT_CAP)
 
 
 async def setup(bot: commands.Bot):
@@ -25,6 +25,122 @@ REQUIRE_MESSAGE_CONTENT_INTENT = os.getenv("REQUIRE_MESSAGE_CONTENT_INTENT", "1"
 # Default pagination / leaderboard sizes
 DEFAULT_TOP_N = int(os.getenv("DEFAULT_TOP_N", "10"))
 
+# How often a word/emoji counts within ONE message:
+#   ALL    = every occurrence ("lol lol lol" counts 3)
+#   UNIQUE = once per message ("lol lol lol" counts 1)
+#   CAPPED = at most COUNT_CAP per message
+COUNT_MODE = os.getenv("COUNT_MODE", "ALL").strip().upper()
+COUNT_CAP = int(os.getenv("COUNT_CAP", "3"))
+
+# =========================
+# Write-behind buffering
+# =========================
+# Word count increments are aggregated in memory and flushed as one bulk upsert.
+# A flush happens every WRITE_BUFFER_FLUSH_SECONDS, or sooner once the buffer holds
+# WRITE_BUFFER_MAX_KEYS distinct (guild, channel, user, word) keys.
+WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", "5"))
+WRITE_BUFFER_MAX_KEYS = int(os.getenv("WRITE_BUFFER_MAX_KEYS", "5000"))
+# Count tables store integer word ids (see the ``words`` table); this many
+# word -> id mappings are kept in memory (least recently used are evicted).
+WORD_ID_CACHE_SIZE = int(os.getenv("WORD_ID_CACHE_SIZE", "100000"))
+
+# =========================
+# Time buckets (windowed stats)
+# =========================
+# Counts are also kept per UTC day (by message timestamp). Days older than
+# BUCKET_DAILY_RETENTION_DAYS are compacted into weekly buckets, weeks older than
+# BUCKET_WEEKLY_RETENTION_WEEKS into monthly ones, and months older than
+# BUCKET_MONTHLY_RETENTION_MONTHS are dropped (0 = keep forever). Daily retention is at
+# least 31 days so 30-day windows can always be answered from daily buckets.
+BUCKET_DAILY_RETENTION_DAYS = max(31, int(os.getenv("BUCKET_DAILY_RETENTION_DAYS", "35")))
+BUCKET_WEEKLY_RETENTION_WEEKS = max(1, int(os.getenv("BUCKET_WEEKLY_RETENTION_WEEKS", "26")))
+BUCKET_MONTHLY_RETENTION_MONTHS = max(0, int(os.getenv("BUCKET_MONTHLY_RETENTION_MONTHS", "0")))
+BUCKET_COMPACT_INTERVAL_SECONDS = float(os.getenv("BUCKET_COMPACT_INTERVAL_SECONDS", "3600"))
+
+# =========================
+# SQLite (local / single-node deployments)
+# =========================
+# WAL lets readers run alongside the single writer. Read-only connections
+# (SQLITE_READ_POOL_SIZE, 0 = read on the writer) serve slash-command aggregations.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").strip().upper()
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+# Negative = KiB (SQLite convention), positive = pages.
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY").strip().upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "3"))
+# Rows sampled per index when refreshing planner statistics (0 = full ANALYZE).
+SQLITE_ANALYSIS_LIMIT = int(os.getenv("SQLITE_ANALYSIS_LIMIT", "1000"))
+
+# =========================
+# Maintenance jobs
+# =========================
+# Background jobs share one scheduler (maintenance.py). Intervals are spread by
+# +/- MAINTENANCE_JITTER (fraction) and the first run waits up to
+# MAINTENANCE_STARTUP_DELAY_SECONDS. With a shared database one process runs each job per
+# interval. An interval of 0 disables that job.
+MAINTENANCE_JITTER = float(os.getenv("MAINTENANCE_JITTER", "0.1"))
+MAINTENANCE_STARTUP_DELAY_SECONDS = float(os.getenv("MAINTENANCE_STARTUP_DELAY_SECONDS", "120"))
+# Drop medals of keywords removed more than KEYWORD_REMOVAL_GRACE_SECONDS ago.
+MEDAL_CLEANUP_INTERVAL_SECONDS = float(os.getenv("MEDAL_CLEANUP_INTERVAL_SECONDS", "3600"))
+# Regenerate user/guild word totals from word_counts (a safety net; they are kept in step on every write).
+ROLLUP_REBUILD_INTERVAL_SECONDS = float(os.getenv("ROLLUP_REBUILD_INTERVAL_SECONDS", str(7 * 86400)))
+# SQLite: PRAGMA optimize + WAL checkpoint, and a full VACUUM once at least
+# VACUUM_MIN_FREE_RATIO of the file is free pages. Postgres relies on autovacuum.
+VACUUM_INTERVAL_SECONDS = float(os.getenv("VACUUM_INTERVAL_SECONDS", "86400"))
+VACUUM_MIN_FREE_RATIO = float(os.getenv("VACUUM_MIN_FREE_RATIO", "0.25"))
+
+# =========================
+# Background purges
+# =========================
+# Counts of new stopwords (server or core) are hidden from reads at once and deleted by
+# a background job, PURGE_CHUNK_ROWS rows per transaction with PURGE_CHUNK_PAUSE_SECONDS
+# between chunks so live writes keep flowing. The queue is also checked every
+# PURGE_INTERVAL_SECONDS (e.g. for purges another process queued).
+PURGE_CHUNK_ROWS = max(1, int(os.getenv("PURGE_CHUNK_ROWS", "2000")))
+PURGE_CHUNK_PAUSE_SECONDS = float(os.getenv("PURGE_CHUNK_PAUSE_SECONDS", "0.05"))
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", "60"))
+
+# =========================
+# Ingest queue
+# =========================
+# on_message only queues the message; INGEST_WORKERS tasks run the pipeline. Guilds are
+# served round-robin, up to INGEST_BATCH_MAX messages per turn, with at most
+# INGEST_GUILD_INFLIGHT batches of one guild running at once (1 = in-order per guild).
+# INGEST_OVERFLOW_POLICY decides what happens when a guild's queue
+# (INGEST_GUILD_QUEUE_SIZE) or the whole queue (INGEST_QUEUE_SIZE) fills up:
+#   block      = wait for space
+#   shed_emoji = above INGEST_SHED_AT of capacity, skip emoji stats; wait when full
+#   sample     = when full, keep only every INGEST_SAMPLE_EVERY-th message
+# Waiting is bounded: at most INGEST_MAX_WAITERS handlers wait at once, each for up to
+# INGEST_WAIT_SECONDS (0 = no limit); past either, the message is dropped and counted.
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+INGEST_GUILD_QUEUE_SIZE = int(os.getenv("INGEST_GUILD_QUEUE_SIZE", "2000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_GUILD_INFLIGHT = int(os.getenv("INGEST_GUILD_INFLIGHT", "1"))
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "200"))
+INGEST_OVERFLOW_POLICY = os.getenv("INGEST_OVERFLOW_POLICY", "shed_emoji").strip().lower()
+INGEST_SHED_AT = float(os.getenv("INGEST_SHED_AT", "0.75"))
+INGEST_SAMPLE_EVERY = int(os.getenv("INGEST_SAMPLE_EVERY", "10"))
+INGEST_MAX_WAITERS = int(os.getenv("INGEST_MAX_WAITERS", "100"))
+INGEST_WAIT_SECONDS = float(os.getenv("INGEST_WAIT_SECONDS", "5"))
+# Queue/pipeline metrics are logged this often (seconds); 0 disables.
+INGEST_STATS_LOG_SECONDS = float(os.getenv("INGEST_STATS_LOG_SECONDS", "300"))
+
+# =========================
+# History backfill
+# =========================
+# When enabled, guilds with no stats yet (e.g. just joined) get their channel history
+# counted in the background. Progress is stored per channel, so restarts resume.
+AUTO_BACKFILL_ENABLED = os.getenv("AUTO_BACKFILL_ENABLED", "0").strip() not in ("0", "false", "False", "")
+# Channels walked at the same time (across all guilds).
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "3"))
+# Messages counted per DB commit.
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "500"))
+# Pause between history pages (100 messages each) per channel, on top of discord.py's rate limit handling.
+BACKFILL_PAGE_DELAY_SECONDS = float(os.getenv("BACKFILL_PAGE_DELAY_SECONDS", "0.25"))
+
 # =========================
 # Keyword matching rules
 # =========================
@@ -69,5 +185,19 @@ TITLE_TEMPLATES: List[str] = [
     "Mythic Sovereign of {K}",
 ]
 
+# =========================
+# Medal announcements
+# =========================
+# Congrats replies are queued and sent by a background task, never from the ingest path.
+# Unlocks in one channel within ANNOUNCE_COALESCE_SECONDS are merged into one message, and a
+# channel gets at most one announcement every ANNOUNCE_CHANNEL_INTERVAL_SECONDS (Discord
+# allows ~5 messages per 5s per channel). Beyond ANNOUNCE_MAX_PENDING queued unlocks, new
+# ones are dropped (their medals are still stored).
+ANNOUNCE_COALESCE_SECONDS = float(os.getenv("ANNOUNCE_COALESCE_SECONDS", "1.5"))
+ANNOUNCE_CHANNEL_INTERVAL_SECONDS = float(os.getenv("ANNOUNCE_CHANNEL_INTERVAL_SECONDS", "5"))
+ANNOUNCE_MAX_PENDING = int(os.getenv("ANNOUNCE_MAX_PENDING", "1000"))
+# Channels sending at the same time.
+ANNOUNCE_CONCURRENCY = int(os.getenv("ANNOUNCE_CONCURRENCY", "4"))
+
 def get_bot_token() -> str:
     return BOT_TOKEN
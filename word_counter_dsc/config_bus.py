@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Optional
+
+logger = logging.getLogger("word_counter_dsc.config_bus")
+
+# Scopes bumped by the config-editing cogs.
+SCOPE_KEYWORDS = "keywords"
+SCOPE_STOPWORDS = "stopwords"
+SCOPE_ABBREVIATIONS = "abbreviations"
+
+# Postgres LISTEN/NOTIFY channel used to fan bumps out to other bot processes.
+NOTIFY_CHANNEL = "wc_config"
+
+ConfigVersion = tuple[int, int]
+
+
+class ConfigBus:
+    """Per-guild config versions used to revalidate in-memory caches.
+
+    Writers call ``bump(guild_id, scope)`` after changing keywords, stopwords or
+    abbreviations. Readers remember ``version(guild_id, scope)`` next to their cached
+    value and reload only when it changes, so nothing is refetched on a timer.
+
+    On Postgres every bump is also sent with NOTIFY, and other processes bump their
+    local version when they receive it. If the listener connection drops, the epoch is
+    advanced so every cache revalidates once (a missed notification can't go stale).
+    """
+
+    def __init__(self) -> None:
+        self._versions: dict[tuple[int, str], int] = {}
+        self._epoch = 0
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._dbx: Any = None
+        self._listening = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def version(self, guild_id: int, scope: str) -> ConfigVersion:
+        return (self._epoch, self._versions.get((int(guild_id), scope), 0))
+
+    def _bump_local(self, guild_id: int, scope: str) -> None:
+        key = (int(guild_id), scope)
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    async def bump(self, guild_id: int, scope: str) -> None:
+        """Mark (guild, scope) as changed here and, on Postgres, in other processes."""
+        self._bump_local(guild_id, scope)
+        if self._dbx is not None and self._listening:
+            try:
+                await self._dbx.notify(NOTIFY_CHANNEL, f"{self._origin}:{int(guild_id)}:{scope}")
+            except Exception:
+                logger.exception("Config bump notify failed (guild=%s scope=%s)", guild_id, scope)
+
+    def _on_notify(self, payload: str) -> None:
+        try:
+            origin, gid, scope = payload.split(":", 2)
+            if origin == self._origin:
+                return
+            self._bump_local(int(gid), scope)
+        except Exception:
+            logger.warning("Ignoring malformed config notification: %r", payload)
+
+    def _on_listener_lost(self) -> None:
+        if self._closed:
+            return
+        self._listening = False
+        self._epoch += 1  # anything cached may have missed notifications
+        logger.warning("Config listener connection lost; caches will revalidate")
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while not self._closed and not self._listening:
+            await asyncio.sleep(delay)
+            try:
+                self._listening = await self._dbx.listen(NOTIFY_CHANNEL, self._on_notify, self._on_listener_lost)
+                self._epoch += 1
+            except Exception:
+                logger.exception("Config listener reconnect failed")
+                delay = min(delay * 2, 60.0)
+
+    async def start(self, dbx: Any) -> None:
+        """Attach to the DB. Cross-process propagation is enabled when the backend supports it."""
+        self._dbx = dbx
+        try:
+            self._listening = bool(await dbx.listen(NOTIFY_CHANNEL, self._on_notify, self._on_listener_lost))
+        except Exception:
+            logger.exception("Config listener setup failed; versions stay process-local")
+            self._listening = False
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+
+
+def get_config_bus(bot: Any) -> ConfigBus:
+    """Return the bot's ConfigBus, attaching a process-local one if setup_hook didn't."""
+    bus = getattr(bot, "config_bus", None)
+    if bus is None:
+        bus = ConfigBus()
+        bot.config_bus = bus
+    return bus
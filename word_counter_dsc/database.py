@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import sqlite3
+import time
 from collections.abc import Iterable as IterABC
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Any, Iterable, Optional
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Optional
 
 import aiosqlite
 
@@ -12,7 +17,21 @@ try:
 except Exception:  # pragma: no cover
     asyncpg = None  # type: ignore
 
-
+from word_counter_dsc.config import (
+    SQLITE_ANALYSIS_LIMIT,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_READ_POOL_SIZE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_TEMP_STORE,
+    VACUUM_MIN_FREE_RATIO,
+)
+
+
+# Base schema. MIGRATIONS (below) evolve it from here: word_counts and its rollups
+# end up keyed by an integer word_id from the ``words`` dictionary (version 3).
 SCHEMA_SQLITE = """
 CREATE TABLE IF NOT EXISTS word_counts (
     guild_id INTEGER NOT NULL,
@@ -24,6 +43,25 @@ CREATE TABLE IF NOT EXISTS word_counts (
     PRIMARY KEY (guild_id, channel_id, user_id, word)
 );
 
+-- Rollups of word_counts (summed over channels), updated in the same transaction
+-- as word_counts itself; see write_buffer.upsert_word_counts.
+CREATE TABLE IF NOT EXISTS user_word_totals (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id, word)
+);
+
+CREATE TABLE IF NOT EXISTS guild_word_totals (
+    guild_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, word)
+);
+
 CREATE TABLE IF NOT EXISTS keywords (
     guild_id INTEGER NOT NULL,
     word TEXT NOT NULL,
@@ -86,6 +124,19 @@ CREATE TABLE IF NOT EXISTS unicode_emoji_counts (
     PRIMARY KEY (guild_id, user_id, emoji)
 );
 
+-- History backfill: messages in (last_message_id, cutoff_id) are counted by the backfill,
+-- newer ones by the live listener. last_message_id is committed with each batch's counts.
+CREATE TABLE IF NOT EXISTS backfill_state (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL DEFAULT 0,
+    cutoff_id INTEGER NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+);
+
 """
 
 SCHEMA_POSTGRES = """
@@ -99,6 +150,25 @@ CREATE TABLE IF NOT EXISTS word_counts (
     PRIMARY KEY (guild_id, channel_id, user_id, word)
 );
 
+-- Rollups of word_counts (summed over channels), updated in the same transaction
+-- as word_counts itself; see write_buffer.upsert_word_counts.
+CREATE TABLE IF NOT EXISTS user_word_totals (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    word TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    updated_at BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, user_id, word)
+);
+
+CREATE TABLE IF NOT EXISTS guild_word_totals (
+    guild_id BIGINT NOT NULL,
+    word TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    updated_at BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, word)
+);
+
 CREATE TABLE IF NOT EXISTS keywords (
     guild_id BIGINT NOT NULL,
     word TEXT NOT NULL,
@@ -160,11 +230,314 @@ CREATE TABLE IF NOT EXISTS unicode_emoji_counts (
     updated_at BIGINT NOT NULL,
     PRIMARY KEY (guild_id, user_id, emoji)
 );
+
+CREATE TABLE IF NOT EXISTS backfill_state (
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    last_message_id BIGINT NOT NULL DEFAULT 0,
+    cutoff_id BIGINT NOT NULL,
+    messages BIGINT NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+);
 """
 
 
+# ---------------------------
+# Versioned migrations
+# ---------------------------
+# Applied in order on startup, after the base schema; the highest applied version is
+# stored in app_meta('schema_version'). Each entry is
+#   (version, description, {dialect: [statements]})
+# Append new entries; never edit or renumber one that has shipped.
+# --- version 1 / 2 (text ``word`` columns; kept verbatim for databases still below them) ---
+_V1_WORD_COUNT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_guild_word ON word_counts (guild_id, word, user_id, count)",
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_guild_user ON word_counts (guild_id, user_id, word, count)",
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_word ON word_counts (word)",
+    "ANALYZE word_counts",
+]
+_V2_ROLLUPS = [
+    "DELETE FROM user_word_totals",
+    "DELETE FROM guild_word_totals",
+    """
+    INSERT INTO user_word_totals (guild_id, user_id, word, count, updated_at)
+    SELECT guild_id, user_id, word, SUM(count), MAX(updated_at)
+    FROM word_counts
+    GROUP BY guild_id, user_id, word
+    """,
+    """
+    INSERT INTO guild_word_totals (guild_id, word, count, updated_at)
+    SELECT guild_id, word, SUM(count), MAX(updated_at)
+    FROM word_counts
+    GROUP BY guild_id, word
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_word_totals_guild_word ON user_word_totals (guild_id, word, count)",
+    "CREATE INDEX IF NOT EXISTS idx_guild_word_totals_guild_count ON guild_word_totals (guild_id, count)",
+    "ANALYZE user_word_totals",
+    "ANALYZE guild_word_totals",
+]
+
+# --- current shape: count tables keyed by integer word_id (version 3+) ---
+_WORD_COUNT_INDEXES = [
+    # /rank, /search, medal totals: WHERE guild_id=? AND word_id=? [AND user_id=?] (covering).
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_guild_word ON word_counts (guild_id, word_id, user_id, count)",
+    # Per-user reads and purges: WHERE guild_id=? AND user_id=? (covering as well).
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_guild_user ON word_counts (guild_id, user_id, word_id, count)",
+    # Core stopword purges: DELETE ... WHERE word_id IN (...) across all guilds.
+    "CREATE INDEX IF NOT EXISTS idx_word_counts_word ON word_counts (word_id)",
+]
+_ROLLUP_INDEXES = [
+    # /rank, /search: top users for one word, read in count order.
+    "CREATE INDEX IF NOT EXISTS idx_user_word_totals_guild_word ON user_word_totals (guild_id, word_id, count)",
+    # /top (server): top words of a guild, read in count order.
+    "CREATE INDEX IF NOT EXISTS idx_guild_word_totals_guild_count ON guild_word_totals (guild_id, count)",
+]
+# Rollup (re)population from the base table; ``{where}`` is "" or a guild filter.
+_ROLLUP_DELETE = [
+    "DELETE FROM user_word_totals {where}",
+    "DELETE FROM guild_word_totals {where}",
+]
+_ROLLUP_FILL = [
+    """
+    INSERT INTO user_word_totals (guild_id, user_id, word_id, count, updated_at)
+    SELECT guild_id, user_id, word_id, SUM(count), MAX(updated_at)
+    FROM word_counts {where}
+    GROUP BY guild_id, user_id, word_id
+    """,
+    """
+    INSERT INTO guild_word_totals (guild_id, word_id, count, updated_at)
+    SELECT guild_id, word_id, SUM(count), MAX(updated_at)
+    FROM word_counts {where}
+    GROUP BY guild_id, word_id
+    """,
+]
+
+
+def _v3_word_ids(dialect: str) -> list[str]:
+    """Intern words: fill ``words`` from word_counts, then rebuild the count tables on word_id."""
+    if dialect == "sqlite":
+        big, wid = "INTEGER", "INTEGER"
+        words_ddl = "CREATE TABLE IF NOT EXISTS words (word_id INTEGER PRIMARY KEY, word TEXT NOT NULL UNIQUE)"
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint.
+        fill_words = "INSERT INTO words (word) SELECT DISTINCT word FROM word_counts WHERE true ON CONFLICT(word) DO NOTHING"
+        # Clustered on the primary key: no hidden rowid, no separate PK index.
+        suffix, pk = " WITHOUT ROWID", "PRIMARY KEY"
+    else:
+        big, wid = "BIGINT", "INTEGER"
+        words_ddl = (
+            "CREATE TABLE IF NOT EXISTS words ("
+            "word_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, word TEXT NOT NULL UNIQUE)"
+        )
+        fill_words = "INSERT INTO words (word) SELECT DISTINCT word FROM word_counts ON CONFLICT (word) DO NOTHING"
+        suffix, pk = "", "CONSTRAINT word_counts_v3_pkey PRIMARY KEY"
+
+    stmts = [
+        words_ddl,
+        fill_words,
+        f"""
+        CREATE TABLE word_counts_v3 (
+            guild_id {big} NOT NULL,
+            channel_id {big} NOT NULL,
+            user_id {big} NOT NULL,
+            word_id {wid} NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            updated_at {big} NOT NULL,
+            {pk} (guild_id, channel_id, user_id, word_id)
+        ){suffix}
+        """,
+        """
+        INSERT INTO word_counts_v3 (guild_id, channel_id, user_id, word_id, count, updated_at)
+        SELECT wc.guild_id, wc.channel_id, wc.user_id, w.word_id, wc.count, wc.updated_at
+        FROM word_counts wc JOIN words w ON w.word = wc.word
+        """,
+        "DROP TABLE word_counts",
+        "ALTER TABLE word_counts_v3 RENAME TO word_counts",
+    ]
+    if dialect != "sqlite":
+        stmts.append("ALTER TABLE word_counts RENAME CONSTRAINT word_counts_v3_pkey TO word_counts_pkey")
+    stmts += [
+        "DROP TABLE user_word_totals",
+        "DROP TABLE guild_word_totals",
+        f"""
+        CREATE TABLE user_word_totals (
+            guild_id {big} NOT NULL,
+            user_id {big} NOT NULL,
+            word_id {wid} NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            updated_at {big} NOT NULL,
+            PRIMARY KEY (guild_id, user_id, word_id)
+        ){suffix}
+        """,
+        f"""
+        CREATE TABLE guild_word_totals (
+            guild_id {big} NOT NULL,
+            word_id {wid} NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            updated_at {big} NOT NULL,
+            PRIMARY KEY (guild_id, word_id)
+        ){suffix}
+        """,
+    ]
+    stmts += [q.format(where="") for q in _ROLLUP_FILL]
+    stmts += _WORD_COUNT_INDEXES + _ROLLUP_INDEXES
+    stmts += ["ANALYZE words", "ANALYZE word_counts", "ANALYZE user_word_totals", "ANALYZE guild_word_totals"]
+    return stmts
+
+
+def _v4_time_buckets(dialect: str) -> list[str]:
+    """Per-period counts for windowed stats (see buckets.py): words and emojis, by day/week/month."""
+    if dialect == "sqlite":
+        big, small, suffix = "INTEGER", "INTEGER", " WITHOUT ROWID"
+    else:
+        big, small, suffix = "BIGINT", "SMALLINT", ""
+    return [
+        # grain: 0 day, 1 week, 2 month; bucket: UTC start of the period (epoch seconds).
+        f"""
+        CREATE TABLE IF NOT EXISTS word_buckets (
+            guild_id {big} NOT NULL,
+            grain {small} NOT NULL,
+            bucket {big} NOT NULL,
+            word_id INTEGER NOT NULL,
+            user_id {big} NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, grain, bucket, word_id, user_id)
+        ){suffix}
+        """,
+        # Per-word reads over a window and per-guild purges: WHERE guild_id=? AND word_id=? ...
+        "CREATE INDEX IF NOT EXISTS idx_word_buckets_guild_word ON word_buckets (guild_id, word_id, grain, bucket)",
+        # custom: 1 = server emoji (by name, as in emoji_counts), 0 = unicode emoji.
+        f"""
+        CREATE TABLE IF NOT EXISTS emoji_buckets (
+            guild_id {big} NOT NULL,
+            grain {small} NOT NULL,
+            bucket {big} NOT NULL,
+            custom {small} NOT NULL,
+            emoji TEXT NOT NULL,
+            user_id {big} NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, grain, bucket, custom, emoji, user_id)
+        ){suffix}
+        """,
+    ]
+
+
+def _v5_window_reads(dialect: str) -> list[str]:
+    """Guild-level daily rollup and covering indexes so windowed reads touch only the rows they sum."""
+    if dialect == "sqlite":
+        big, small, suffix = "INTEGER", "INTEGER", " WITHOUT ROWID"
+    else:
+        big, small, suffix = "BIGINT", "SMALLINT", ""
+    return [
+        # word_buckets summed over users; /top over a window reads one row per word per period.
+        f"""
+        CREATE TABLE IF NOT EXISTS guild_word_buckets (
+            guild_id {big} NOT NULL,
+            grain {small} NOT NULL,
+            bucket {big} NOT NULL,
+            word_id INTEGER NOT NULL,
+            count {big} NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, grain, bucket, word_id)
+        ){suffix}
+        """,
+        """
+        INSERT INTO guild_word_buckets (guild_id, grain, bucket, word_id, count)
+        SELECT guild_id, grain, bucket, word_id, SUM(count)
+        FROM word_buckets
+        GROUP BY guild_id, grain, bucket, word_id
+        """,
+        # /rank, /search over a window: top users for one word (covering).
+        "DROP INDEX IF EXISTS idx_word_buckets_guild_word",
+        "CREATE INDEX IF NOT EXISTS idx_word_buckets_guild_word "
+        "ON word_buckets (guild_id, word_id, grain, bucket, user_id, count)",
+        # /top <user>, /userstats over a window: one user's words (covering).
+        "CREATE INDEX IF NOT EXISTS idx_word_buckets_guild_user "
+        "ON word_buckets (guild_id, user_id, grain, bucket, word_id, count)",
+        "ANALYZE word_buckets",
+        "ANALYZE guild_word_buckets",
+    ]
+
+
+def _v6_word_purges(dialect: str) -> list[str]:
+    """Queue of (guild, word) counts awaiting a background purge (see purges.py); guild 0 = every guild."""
+    big, suffix = ("INTEGER", " WITHOUT ROWID") if dialect == "sqlite" else ("BIGINT", "")
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS word_purges (
+            guild_id {big} NOT NULL,
+            word_id {big} NOT NULL,
+            created_at {big} NOT NULL,
+            deleted {big} NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, word_id)
+        ){suffix}
+        """,
+    ]
+
+
+def _v7_guild_emojis(dialect: str) -> list[str]:
+    """Last seen name of each custom emoji, so renames made while the bot was offline are found."""
+    big, suffix = ("INTEGER", " WITHOUT ROWID") if dialect == "sqlite" else ("BIGINT", "")
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS guild_emojis (
+            guild_id {big} NOT NULL,
+            emoji_id {big} NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (guild_id, emoji_id)
+        ){suffix}
+        """,
+    ]
+
+
+MIGRATIONS: list[tuple[int, str, dict[str, list[str]]]] = [
+    (
+        1,
+        "word_counts indexes for guild/word, guild/user and word lookups",
+        {"sqlite": _V1_WORD_COUNT_INDEXES, "postgres": _V1_WORD_COUNT_INDEXES},
+    ),
+    (
+        2,
+        "user_word_totals / guild_word_totals rollups populated from word_counts",
+        {"sqlite": _V2_ROLLUPS, "postgres": _V2_ROLLUPS},
+    ),
+    (
+        3,
+        "words dictionary; word_counts and rollups keyed by integer word_id",
+        {"sqlite": _v3_word_ids("sqlite"), "postgres": _v3_word_ids("postgres")},
+    ),
+    (
+        4,
+        "word_buckets / emoji_buckets: daily, weekly and monthly counts",
+        {"sqlite": _v4_time_buckets("sqlite"), "postgres": _v4_time_buckets("postgres")},
+    ),
+    (
+        5,
+        "guild_word_buckets rollup; covering word/user indexes on word_buckets",
+        {"sqlite": _v5_window_reads("sqlite"), "postgres": _v5_window_reads("postgres")},
+    ),
+    (
+        6,
+        "word_purges: chunked background purges, hidden from reads until done",
+        {"sqlite": _v6_word_purges("sqlite"), "postgres": _v6_word_purges("postgres")},
+    ),
+    (
+        7,
+        "guild_emojis: custom emoji id -> name, to carry counts over offline renames",
+        {"sqlite": _v7_guild_emojis("sqlite"), "postgres": _v7_guild_emojis("postgres")},
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Tables holding per-word counts (current schema); purging a word must touch all of them.
+WORD_COUNT_TABLES = ("word_counts", "user_word_totals", "guild_word_totals", "word_buckets", "guild_word_buckets")
+
+
 class DBX:
     dialect: str
+    # word_ids.WordIds cache for this database (attached by get_word_ids on first use)
+    word_ids: Any = None
 
     @staticmethod
     def _norm_params(params: Any | None) -> list[Any]:
@@ -197,28 +570,254 @@ class DBX:
     async def fetchall(self, sql: str, params: Any = None) -> list[Any]:
         raise NotImplementedError
 
+    async def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> None:
+        """Run one statement for every params entry in a single round trip / commit."""
+        raise NotImplementedError
+
+    def transaction(self) -> Any:
+        """Async context manager yielding a handle with execute/executemany/fetchone/fetchall.
+
+        Everything run through the handle commits together on exit (rolled back on error):
+
+            async with dbx.transaction() as tx:
+                await tx.executemany("DELETE FROM keywords WHERE guild_id=? AND word=?", rows)
+                await tx.execute("DELETE FROM ...", (...))
+
+        Don't call the parent DBX from inside the block; use the handle.
+        """
+        raise NotImplementedError
+
+    async def listen(self, channel: str, callback: Any, on_lost: Any = None) -> bool:
+        """Subscribe callback(payload) to cross-process notifications.
+
+        Returns False when the backend has no such channel (single-process SQLite).
+        """
+        return False
+
+    async def notify(self, channel: str, payload: str) -> None:
+        return None
+
     async def close(self) -> None:
         raise NotImplementedError
 
+    async def _ensure_app_meta(self) -> None:
+        await self.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)", ())
+
+    async def schema_version(self) -> int:
+        row = await self.fetchone("SELECT value FROM app_meta WHERE key='schema_version'", ())
+        try:
+            return int(row["value"]) if row else 0
+        except (TypeError, ValueError):
+            return 0
+
+    async def run_migrations(self) -> list[int]:
+        """Apply every MIGRATIONS entry newer than the stored schema_version. Returns the versions applied.
+
+        Each migration commits together with its version bump (DDL included), so an
+        interrupted startup re-runs only the migration that didn't commit.
+        """
+        await self._ensure_app_meta()
+        current = await self.schema_version()
+        applied: list[int] = []
+        for version, _desc, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            async with self.transaction() as tx:
+                if self.dialect == "postgres":
+                    # Several instances may start together; the first one migrates, the rest wait.
+                    await tx.execute("SELECT pg_advisory_xact_lock(hashtext('wc_bot_migrations'))", ())
+                row = await tx.fetchone("SELECT value FROM app_meta WHERE key='schema_version'", ())
+                if row and int(row["value"]) >= version:
+                    continue
+                for stmt in statements.get(self.dialect, []):
+                    await tx.execute(stmt, ())
+                await tx.execute(
+                    """
+                    INSERT INTO app_meta(key,value) VALUES ('schema_version', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    """,
+                    (str(version),),
+                )
+            applied.append(version)
+        return applied
+
+    async def refresh_stats(self, tables: Iterable[str]) -> None:
+        """Refresh planner statistics for tables that grow after their migration's ANALYZE.
+
+        Postgres keeps them current through autovacuum; SQLite only has what ANALYZE left
+        behind, which for a table created empty is nothing at all.
+        """
+        return None
+
+    async def vacuum(self, min_free_ratio: float = VACUUM_MIN_FREE_RATIO) -> dict[str, Any]:
+        """Periodic housekeeping of the database file. Postgres leaves this to autovacuum."""
+        return {}
+
+    async def rebuild_rollups(self, guild_id: Optional[int] = None) -> int:
+        """Regenerate user_word_totals / guild_word_totals from word_counts (one guild or all).
+
+        Runs in one transaction, so readers see either the old or the rebuilt totals.
+        Returns the number of user_word_totals rows written.
+        """
+        where, params = ("WHERE guild_id=?", (int(guild_id),)) if guild_id is not None else ("", ())
+        async with self.transaction() as tx:
+            if self.dialect == "postgres":
+                # Hold off buffer flushes (they write word_counts first) until the totals are back.
+                await tx.execute("LOCK TABLE word_counts IN SHARE MODE", ())
+            for q in _ROLLUP_DELETE + _ROLLUP_FILL:
+                await tx.execute(q.format(where=where), params)
+            row = await tx.fetchone(f"SELECT COUNT(*) AS n FROM user_word_totals {where}", params)
+        return int(row["n"]) if row else 0
+
+
+class _SQLiteTx(DBX):
+    """Statements on the shared SQLite connection without a commit per call."""
+
+    dialect = "sqlite"
+
+    def __init__(self, conn: aiosqlite.Connection, q: Any):
+        self._conn = conn
+        self._q = q  # type: ignore[assignment]
+
+    async def execute(self, sql: str, params: Any = None) -> Any:
+        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
+        return cur.rowcount
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> None:
+        rows = [tuple(self._norm_params(p)) for p in seq_of_params]
+        if rows:
+            await self._conn.executemany(self._q(sql), rows)
+
+    async def fetchone(self, sql: str, params: Any = None) -> Optional[Any]:
+        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
+        return await cur.fetchone()
+
+    async def fetchall(self, sql: str, params: Any = None) -> list[Any]:
+        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
+        return await cur.fetchall()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["_SQLiteTx"]:
+        # Already inside a transaction: flatten into it.
+        yield self
+
+
+class _PostgresTx(DBX):
+    """Statements bound to one pooled connection inside an open transaction."""
+
+    dialect = "postgres"
+
+    def __init__(self, conn: Any, q: Any):
+        self._conn = conn
+        self._q = q  # type: ignore[assignment]
+
+    async def execute(self, sql: str, params: Any = None) -> Any:
+        return await self._conn.execute(self._q(sql), *self._norm_params(params))
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> None:
+        rows = [self._norm_params(p) for p in seq_of_params]
+        if rows:
+            await self._conn.executemany(self._q(sql), rows)
+
+    async def fetchone(self, sql: str, params: Any = None) -> Optional[Any]:
+        return await self._conn.fetchrow(self._q(sql), *self._norm_params(params))
+
+    async def fetchall(self, sql: str, params: Any = None) -> list[Any]:
+        return await self._conn.fetch(self._q(sql), *self._norm_params(params))
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["_PostgresTx"]:
+        async with self._conn.transaction():  # savepoint
+            yield self
+
+
+# RETURNING (medal progress, purge chunks, maintenance claims) needs SQLite 3.35+; the
+# conditional upserts need 3.24+. This is the library Python's sqlite3 is linked against.
+SQLITE_MIN_VERSION = (3, 35, 0)
+
+
+def check_sqlite_version(version: tuple[int, ...] = sqlite3.sqlite_version_info) -> None:
+    if tuple(version) < SQLITE_MIN_VERSION:
+        have = ".".join(map(str, version))
+        need = ".".join(map(str, SQLITE_MIN_VERSION))
+        raise RuntimeError(
+            f"SQLite {have} is too old: word_counter_dsc needs SQLite {need} or newer "
+            "(use a Python build linked against a newer SQLite, or set DATABASE_URL to use Postgres)"
+        )
+
 
 @dataclass
 class SQLiteDBX(DBX):
     sqlite_path: str
     dialect: str = "sqlite"
+    read_pool_size: int = SQLITE_READ_POOL_SIZE
     _conn: Optional[aiosqlite.Connection] = None
+    # Serializes writers so a commit from one task can't land in the middle of another's transaction.
+    _write_lock: Optional[asyncio.Lock] = None
+    # Idle read-only connections (WAL readers); empty pool = reads use the writer connection.
+    _readers: Optional[asyncio.Queue] = None
+    _reader_conns: Any = None
 
     async def init(self) -> "SQLiteDBX":
+        check_sqlite_version()
+        self._write_lock = asyncio.Lock()
         self._conn = await aiosqlite.connect(self.sqlite_path)
         # Return rows as dict-like objects (so code can do row["col"]) like asyncpg.
         self._conn.row_factory = aiosqlite.Row
+        await self._apply_pragmas(self._conn, writer=True)
         await self._conn.executescript(SCHEMA_SQLITE)
         await self._conn.commit()
         await self._migrate_keyword_removals()
+        await self.run_migrations()
+        await self._open_readers()
         return self
 
-
-    async def _ensure_app_meta(self) -> None:
-        await self.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)", ())
+    @property
+    def _in_memory(self) -> bool:
+        return self.sqlite_path == ":memory:" or self.sqlite_path.startswith("file::memory:")
+
+    async def _apply_pragmas(self, conn: aiosqlite.Connection, writer: bool) -> None:
+        # Values come from env; only allow known keywords so nothing odd is interpolated.
+        sync = SQLITE_SYNCHRONOUS if SQLITE_SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA") else "NORMAL"
+        temp = SQLITE_TEMP_STORE if SQLITE_TEMP_STORE in ("DEFAULT", "FILE", "MEMORY") else "MEMORY"
+        journal = SQLITE_JOURNAL_MODE if SQLITE_JOURNAL_MODE in ("WAL", "DELETE", "TRUNCATE", "PERSIST") else "WAL"
+        await conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+        await conn.execute(f"PRAGMA cache_size={int(SQLITE_CACHE_SIZE)}")
+        await conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+        await conn.execute(f"PRAGMA temp_store={temp}")
+        if writer:
+            if not self._in_memory:
+                await conn.execute(f"PRAGMA journal_mode={journal}")
+            await conn.execute(f"PRAGMA synchronous={sync}")
+        else:
+            await conn.execute("PRAGMA query_only=ON")
+
+    async def _open_readers(self) -> None:
+        # Readers only help with WAL on a real file (":memory:" is private to one connection).
+        self._readers = asyncio.Queue()
+        self._reader_conns = []
+        row = await self.fetchone("PRAGMA journal_mode")
+        if self._in_memory or int(self.read_pool_size) <= 0 or str(row[0]).lower() != "wal":
+            return
+        for _ in range(int(self.read_pool_size)):
+            uri = Path(self.sqlite_path).resolve().as_uri() + "?mode=ro"
+            conn = await aiosqlite.connect(uri, uri=True)
+            conn.row_factory = aiosqlite.Row
+            await self._apply_pragmas(conn, writer=False)
+            self._reader_conns.append(conn)
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def _read_conn(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self._reader_conns:
+            assert self._conn is not None
+            yield self._conn
+            return
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
 
     async def _migrate_keyword_removals(self) -> None:
         # If legacy schema had PRIMARY KEY(guild_id, word, removed_at), migrate to PRIMARY KEY(guild_id, word)
@@ -243,44 +842,105 @@ class SQLiteDBX(DBX):
             await self.execute("DROP TABLE keyword_removals", ())
             await self.execute("ALTER TABLE keyword_removals_new RENAME TO keyword_removals", ())
 
+    async def refresh_stats(self, tables: Iterable[str]) -> None:
+        # Sampled ANALYZE: a few hundred rows per index is enough to pick between indexes.
+        async with self.transaction() as tx:
+            await tx.execute(f"PRAGMA analysis_limit={int(SQLITE_ANALYSIS_LIMIT)}", ())
+            for table in tables:
+                await tx.execute(f"ANALYZE {table}", ())
+
+    async def vacuum(self, min_free_ratio: float = VACUUM_MIN_FREE_RATIO) -> dict[str, Any]:
+        # PRAGMA optimize refreshes stale planner stats; a full VACUUM rewrites the whole file
+        # under the write lock, so it only runs once enough of the file is free pages.
+        assert self._conn is not None and self._write_lock is not None
+        async with self._write_lock:
+            pages = int((await (await self._conn.execute("PRAGMA page_count")).fetchone())[0])
+            free = int((await (await self._conn.execute("PRAGMA freelist_count")).fetchone())[0])
+            vacuumed = pages > 0 and free / pages >= float(min_free_ratio)
+            await self._conn.execute("PRAGMA optimize")
+            if vacuumed:
+                await self._conn.execute("VACUUM")
+            await self._conn.commit()
+            if not self._in_memory:
+                await self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"pages": pages, "free_pages": free, "vacuumed": vacuumed}
+
     async def apply_core_stopwords(self, core_words: list[str], hash_value: str) -> None:
         # Purge any legacy counted stopwords and keep a hash in app_meta so we only do it when the core list changes.
         await self._ensure_app_meta()
         row = await self.fetchone("SELECT value FROM app_meta WHERE key='core_stopwords_hash'", ())
         if not row or str(row["value"]) != hash_value:
-            # purge
-            if core_words:
-                q = "DELETE FROM word_counts WHERE word IN (" + ",".join(["?"] * len(core_words)) + ")"
-                await self.execute(q, tuple(core_words))
-                q2 = "DELETE FROM keywords WHERE word IN (" + ",".join(["?"] * len(core_words)) + ")"
-                await self.execute(q2, tuple(core_words))
-                q3 = "DELETE FROM stopwords WHERE word IN (" + ",".join(["?"] * len(core_words)) + ")"
-                await self.execute(q3, tuple(core_words))
-            await self.execute(
-                "INSERT OR REPLACE INTO app_meta(key,value) VALUES ('core_stopwords_hash', ?)",
-                (hash_value,),
-            )
+            async with self.transaction() as tx:
+                # Counts are hidden now and deleted by the background purge job (purges.py).
+                if core_words:
+                    marks = ",".join(["?"] * len(core_words))
+                    await tx.execute(
+                        f"""
+                        INSERT INTO word_purges (guild_id, word_id, created_at)
+                        SELECT 0, word_id, ? FROM words WHERE word IN ({marks})
+                        ON CONFLICT(guild_id, word_id) DO NOTHING
+                        """,
+                        (int(time.time()), *core_words),
+                    )
+                    q2 = "DELETE FROM keywords WHERE word IN (" + ",".join(["?"] * len(core_words)) + ")"
+                    await tx.execute(q2, tuple(core_words))
+                    q3 = "DELETE FROM stopwords WHERE word IN (" + ",".join(["?"] * len(core_words)) + ")"
+                    await tx.execute(q3, tuple(core_words))
+                await tx.execute(
+                    "INSERT OR REPLACE INTO app_meta(key,value) VALUES ('core_stopwords_hash', ?)",
+                    (hash_value,),
+                )
 
     def _q(self, sql: str) -> str:
         return sql
 
     async def execute(self, sql: str, params: Any = None) -> Any:
-        assert self._conn is not None
-        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
-        await self._conn.commit()
-        return cur.rowcount
+        assert self._conn is not None and self._write_lock is not None
+        async with self._write_lock:
+            cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
+            await self._conn.commit()
+            return cur.rowcount
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> None:
+        assert self._conn is not None and self._write_lock is not None
+        rows = [tuple(self._norm_params(p)) for p in seq_of_params]
+        if not rows:
+            return
+        async with self._write_lock:
+            await self._conn.executemany(self._q(sql), rows)
+            await self._conn.commit()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[_SQLiteTx]:
+        assert self._conn is not None and self._write_lock is not None
+        async with self._write_lock:
+            # Explicit BEGIN: sqlite3 only opens one implicitly before DML, so DDL (migrations)
+            # would otherwise autocommit statement by statement. IMMEDIATE takes the write lock
+            # up front instead of upgrading a read lock later (SQLITE_BUSY under WAL readers).
+            if not self._conn.in_transaction:
+                await self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield _SQLiteTx(self._conn, self._q)
+            except BaseException:
+                await self._conn.rollback()
+                raise
+            await self._conn.commit()
 
     async def fetchone(self, sql: str, params: Any = None) -> Optional[Any]:
-        assert self._conn is not None
-        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
-        return await cur.fetchone()
+        # Reads see committed data only; read inside transaction() to see its own writes.
+        async with self._read_conn() as conn:
+            cur = await conn.execute(self._q(sql), tuple(self._norm_params(params)))
+            return await cur.fetchone()
 
     async def fetchall(self, sql: str, params: Any = None) -> list[Any]:
-        assert self._conn is not None
-        cur = await self._conn.execute(self._q(sql), tuple(self._norm_params(params)))
-        return await cur.fetchall()
+        async with self._read_conn() as conn:
+            cur = await conn.execute(self._q(sql), tuple(self._norm_params(params)))
+            return await cur.fetchall()
 
     async def close(self) -> None:
+        for conn in self._reader_conns or []:
+            await conn.close()
+        self._reader_conns = []
         if self._conn is not None:
             await self._conn.close()
             self._conn = None
@@ -291,6 +951,8 @@ class PostgresDBX(DBX):
     url: str
     dialect: str = "postgres"
     _pool: Any = None
+    # Dedicated LISTEN connections (kept out of the pool)
+    _listeners: Any = None
 
     async def init(self) -> "PostgresDBX":
         if asyncpg is None:
@@ -347,12 +1009,9 @@ class PostgresDBX(DBX):
                 if not await has_col(table, col):
                     await conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}" {typ} NOT NULL DEFAULT 0;')
 
+        await self.run_migrations()
         return self
 
-
-    async def _ensure_app_meta(self) -> None:
-        await self.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)", ())
-
     async def _migrate_keyword_removals(self) -> None:
         # Ensure PRIMARY KEY(guild_id, word) on keyword_removals for ON CONFLICT to work reliably.
         # If a legacy constraint exists, rebuild the table.
@@ -397,17 +1056,26 @@ class PostgresDBX(DBX):
         await self._ensure_app_meta()
         row = await self.fetchone("SELECT value FROM app_meta WHERE key='core_stopwords_hash'", ())
         if not row or str(row["value"]) != hash_value:
-            if core_words:
-                await self.execute("DELETE FROM word_counts WHERE word = ANY(?)", (core_words,))
-                await self.execute("DELETE FROM keywords WHERE word = ANY(?)", (core_words,))
-                await self.execute("DELETE FROM stopwords WHERE word = ANY(?)", (core_words,))
-            await self.execute(
-                """
-                INSERT INTO app_meta(key,value) VALUES ('core_stopwords_hash', ?)
-                ON CONFLICT(key) DO UPDATE SET value = EXCLUDED.value
-                """,
-                (hash_value,),
-            )
+            async with self.transaction() as tx:
+                if core_words:
+                    # Counts are hidden now and deleted by the background purge job (purges.py).
+                    await tx.execute(
+                        """
+                        INSERT INTO word_purges (guild_id, word_id, created_at)
+                        SELECT 0, word_id, CAST(? AS BIGINT) FROM words WHERE word = ANY(?)
+                        ON CONFLICT(guild_id, word_id) DO NOTHING
+                        """,
+                        (int(time.time()), core_words),
+                    )
+                    await tx.execute("DELETE FROM keywords WHERE word = ANY(?)", (core_words,))
+                    await tx.execute("DELETE FROM stopwords WHERE word = ANY(?)", (core_words,))
+                await tx.execute(
+                    """
+                    INSERT INTO app_meta(key,value) VALUES ('core_stopwords_hash', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = EXCLUDED.value
+                    """,
+                    (hash_value,),
+                )
 
     def _q(self, sql: str) -> str:
         # Replace ? -> $1, $2...
@@ -436,7 +1104,45 @@ class PostgresDBX(DBX):
         async with self._pool.acquire() as conn:
             return await conn.fetch(self._q(sql), *self._norm_params(params))
 
+    async def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> None:
+        assert self._pool is not None
+        rows = [self._norm_params(p) for p in seq_of_params]
+        if not rows:
+            return
+        async with self._pool.acquire() as conn:
+            # asyncpg pipelines the batch and applies it atomically.
+            await conn.executemany(self._q(sql), rows)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[_PostgresTx]:
+        assert self._pool is not None
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                yield _PostgresTx(conn, self._q)
+
+    async def listen(self, channel: str, callback: Any, on_lost: Any = None) -> bool:
+        assert asyncpg is not None
+        conn = await asyncpg.connect(self.url)
+
+        def _handler(_conn: Any, _pid: int, _channel: str, payload: str) -> None:
+            callback(payload)
+
+        await conn.add_listener(channel, _handler)
+        if on_lost is not None:
+            conn.add_termination_listener(lambda _conn: on_lost())
+        self._listeners = [c for c in (self._listeners or []) if not c.is_closed()] + [conn]
+        return True
+
+    async def notify(self, channel: str, payload: str) -> None:
+        await self.execute("SELECT pg_notify(?, ?)", (channel, payload))
+
     async def close(self) -> None:
+        for conn in self._listeners or []:
+            try:
+                await conn.close()
+            except Exception:
+                pass
+        self._listeners = None
         if self._pool is not None:
             await self._pool.close()
             self._pool = None
@@ -0,0 +1,136 @@
+"""Unicode emoji tables and the compiled emoji-sequence matcher.
+
+The pictograph ranges below are the ``Extended_Pictographic`` property from the
+Unicode emoji data file (emoji-data.txt, Emoji 15.0); that property deliberately
+covers reserved code points in emoji blocks, so newer emoji match without a table
+update. To refresh the table from a newer file:
+
+    python -m word_counter_dsc.emoji_data path/to/emoji-data.txt
+
+One ``EMOJI_RE.findall(text)`` scan returns every emoji sequence in a message:
+flags (regional-indicator pairs), subdivision flags (tag sequences), keycaps,
+skin-tone modified emoji and ZWJ sequences are each returned as a single item.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from typing import List, Sequence, Tuple
+
+# (first, last) code point ranges with Extended_Pictographic=Yes.
+EXTENDED_PICTOGRAPHIC: Tuple[Tuple[int, int], ...] = (
+    (0x00A9, 0x00A9), (0x00AE, 0x00AE), (0x203C, 0x203C), (0x2049, 0x2049),
+    (0x2122, 0x2122), (0x2139, 0x2139), (0x2194, 0x2199), (0x21A9, 0x21AA),
+    (0x231A, 0x231B), (0x2328, 0x2328), (0x2388, 0x2388), (0x23CF, 0x23CF),
+    (0x23E9, 0x23F3), (0x23F8, 0x23FA), (0x24C2, 0x24C2), (0x25AA, 0x25AB),
+    (0x25B6, 0x25B6), (0x25C0, 0x25C0), (0x25FB, 0x25FE), (0x2600, 0x2605),
+    (0x2607, 0x2612), (0x2614, 0x2685), (0x2690, 0x2705), (0x2708, 0x2712),
+    (0x2714, 0x2714), (0x2716, 0x2716), (0x271D, 0x271D), (0x2721, 0x2721),
+    (0x2728, 0x2728), (0x2733, 0x2734), (0x2744, 0x2744), (0x2747, 0x2747),
+    (0x274C, 0x274C), (0x274E, 0x274E), (0x2753, 0x2755), (0x2757, 0x2757),
+    (0x2763, 0x2767), (0x2795, 0x2797), (0x27A1, 0x27A1), (0x27B0, 0x27B0),
+    (0x27BF, 0x27BF), (0x2934, 0x2935), (0x2B05, 0x2B07), (0x2B1B, 0x2B1C),
+    (0x2B50, 0x2B50), (0x2B55, 0x2B55), (0x3030, 0x3030), (0x303D, 0x303D),
+    (0x3297, 0x3297), (0x3299, 0x3299), (0x1F000, 0x1F0FF), (0x1F10D, 0x1F10F),
+    (0x1F12F, 0x1F12F), (0x1F16C, 0x1F171), (0x1F17E, 0x1F17F), (0x1F18E, 0x1F18E),
+    (0x1F191, 0x1F19A), (0x1F1AD, 0x1F1E5), (0x1F201, 0x1F20F), (0x1F21A, 0x1F21A),
+    (0x1F22F, 0x1F22F), (0x1F232, 0x1F23A), (0x1F23C, 0x1F23F), (0x1F249, 0x1F3FA),
+    (0x1F400, 0x1F53D), (0x1F546, 0x1F64F), (0x1F680, 0x1F6FF), (0x1F774, 0x1F77F),
+    (0x1F7D5, 0x1F7FF), (0x1F80C, 0x1F80F), (0x1F848, 0x1F84F), (0x1F85A, 0x1F85F),
+    (0x1F888, 0x1F88F), (0x1F8AE, 0x1F8FF), (0x1F90C, 0x1F93A), (0x1F93C, 0x1F945),
+    (0x1F947, 0x1FAFF), (0x1FC00, 0x1FFFD),
+)
+
+# Pictographs below U+2600 that render as emoji without VS16 (Emoji_Presentation=Yes).
+# Every other pictograph below U+2600 (©, ™, ↔, ▶ ...) is ordinary text unless it is
+# followed by U+FE0F, so it only counts in that form.
+PRESENTATION_BELOW_2600: Tuple[Tuple[int, int], ...] = (
+    (0x231A, 0x231B), (0x23E9, 0x23EC), (0x23F0, 0x23F0), (0x23F3, 0x23F3), (0x25FD, 0x25FE),
+)
+
+SKIN_TONES = (0x1F3FB, 0x1F3FF)
+REGIONAL_INDICATORS = (0x1F1E6, 0x1F1FF)
+VS16 = "\uFE0F"
+ZWJ = "\u200D"
+KEYCAP = "\u20E3"
+
+
+def _subtract(ranges: Sequence[Tuple[int, int]], holes: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    out: List[Tuple[int, int]] = []
+    for lo, hi in ranges:
+        cur = lo
+        for hlo, hhi in holes:
+            if hhi < cur or hlo > hi:
+                continue
+            if hlo > cur:
+                out.append((cur, hlo - 1))
+            cur = max(cur, hhi + 1)
+        if cur <= hi:
+            out.append((cur, hi))
+    return out
+
+
+def _char_class(ranges: Sequence[Tuple[int, int]]) -> str:
+    parts = []
+    for lo, hi in ranges:
+        parts.append(re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}")
+    return "[" + "".join(parts) + "]"
+
+
+def build_emoji_pattern() -> str:
+    """Regex source for one emoji sequence (see module docstring)."""
+    low = [r for r in EXTENDED_PICTOGRAPHIC if r[1] < 0x2600]
+    high = [r for r in EXTENDED_PICTOGRAPHIC if r[0] >= 0x2600]
+    bare = list(PRESENTATION_BELOW_2600) + high + [SKIN_TONES]
+    text_only = _subtract(low, PRESENTATION_BELOW_2600)
+
+    tone = _char_class([SKIN_TONES])
+    # One pictograph: emoji-presentation base (optionally VS16 / skin tone) or text-default + VS16.
+    element = f"(?:{_char_class(bare)}(?:{VS16}|{tone})?|{_char_class(text_only)}{VS16})"
+    ri = _char_class([REGIONAL_INDICATORS])
+    flag = f"{ri}{ri}"
+    tag_flag = "\U0001F3F4[\U000E0020-\U000E007E]+\U000E007F"
+    keycap = f"[0-9#*]{VS16}?{KEYCAP}"
+    zwj_seq = f"{element}(?:{ZWJ}{element})*"
+    return f"{flag}|{tag_flag}|{keycap}|{zwj_seq}"
+
+
+EMOJI_RE = re.compile(build_emoji_pattern())
+
+
+def extract_emojis(text: str) -> List[str]:
+    """Every emoji sequence in ``text``, in order (repeats included)."""
+    if not text or text.isascii():
+        # Every emoji sequence contains a non-ASCII code point.
+        return []
+    return EMOJI_RE.findall(text)
+
+
+def parse_emoji_data(lines: Sequence[str]) -> List[Tuple[int, int]]:
+    """Extended_Pictographic ranges from the lines of an emoji-data.txt file."""
+    out: List[Tuple[int, int]] = []
+    for line in lines:
+        data = line.split("#", 1)[0].strip()
+        if not data:
+            continue
+        cps, prop = (p.strip() for p in data.split(";", 1))
+        if prop != "Extended_Pictographic":
+            continue
+        lo, _, hi = cps.partition("..")
+        rng = (int(lo, 16), int(hi or lo, 16))
+        if out and out[-1][1] + 1 == rng[0]:
+            out[-1] = (out[-1][0], rng[1])
+        else:
+            out.append(rng)
+    return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m word_counter_dsc.emoji_data path/to/emoji-data.txt")
+    with open(sys.argv[1], encoding="utf-8") as fh:
+        ranges = parse_emoji_data(fh.readlines())
+    print("EXTENDED_PICTOGRAPHIC: Tuple[Tuple[int, int], ...] = (")
+    for i in range(0, len(ranges), 4):
+        print("    " + " ".join(f"(0x{lo:04X}, 0x{hi:04X})," for lo, hi in ranges[i : i + 4]))
+    print(")")
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from itertools import groupby
+from typing import Any, Optional
+
+from word_counter_dsc.config import (
+    INGEST_BATCH_MAX,
+    INGEST_GUILD_INFLIGHT,
+    INGEST_GUILD_QUEUE_SIZE,
+    INGEST_MAX_WAITERS,
+    INGEST_OVERFLOW_POLICY,
+    INGEST_QUEUE_SIZE,
+    INGEST_SAMPLE_EVERY,
+    INGEST_SHED_AT,
+    INGEST_WAIT_SECONDS,
+    INGEST_WORKERS,
+)
+
+logger = logging.getLogger("word_counter_dsc.ingest_queue")
+
+POLICY_BLOCK = "block"
+POLICY_SHED_EMOJI = "shed_emoji"
+POLICY_SAMPLE = "sample"
+POLICIES = (POLICY_BLOCK, POLICY_SHED_EMOJI, POLICY_SAMPLE)
+
+
+def _guild_id(message: Any) -> int:
+    guild = getattr(message, "guild", None)
+    return int(getattr(guild, "id", 0) or 0)
+
+
+class IngestQueue:
+    """Bounded, per-guild fair queue between the gateway handler and the ingest pipeline.
+
+    ``submit()`` is all on_message does; worker tasks drain the queue in batches and
+    run the pipeline (DB writes, medal replies) off the event-dispatch path.
+
+    Each guild has its own FIFO. Workers serve guilds round-robin, taking at most
+    ``batch_max`` messages per turn, and never run more than ``guild_inflight`` batches
+    of one guild at once (1 keeps a guild's messages in order). A spamming guild
+    therefore waits behind itself while quiet guilds keep being served promptly.
+
+    When a guild's queue (``guild_maxsize``) or the whole queue (``maxsize``) is full,
+    the overflow policy decides what gives, and it only affects guilds that are full:
+
+    - block:      the handler waits for space
+    - shed_emoji: above ``shed_at`` of the guild's capacity, messages are queued without
+                  emoji stats; when completely full, the handler waits
+    - sample:     when full, only every ``sample_every``-th message is kept (and waits
+                  for space); the rest are dropped and counted
+
+    Waiting handlers are bounded so they cannot pile up during a long overload: at most
+    ``max_waiters`` wait at once, each for at most ``wait_timeout`` seconds (None or 0 for
+    no limit). A message that finds the waiters full or times out is dropped and counted.
+    """
+
+    def __init__(
+        self,
+        pipeline: Any,
+        maxsize: int = INGEST_QUEUE_SIZE,
+        workers: int = INGEST_WORKERS,
+        policy: str = INGEST_OVERFLOW_POLICY,
+        batch_max: int = INGEST_BATCH_MAX,
+        shed_at: float = INGEST_SHED_AT,
+        sample_every: int = INGEST_SAMPLE_EVERY,
+        guild_maxsize: int = INGEST_GUILD_QUEUE_SIZE,
+        guild_inflight: int = INGEST_GUILD_INFLIGHT,
+        max_waiters: int = INGEST_MAX_WAITERS,
+        wait_timeout: Optional[float] = INGEST_WAIT_SECONDS,
+    ):
+        self.pipeline = pipeline
+        self.maxsize = max(1, int(maxsize))
+        self.guild_maxsize = max(1, min(int(guild_maxsize), self.maxsize))
+        self.workers = max(1, int(workers))
+        self.guild_inflight = max(1, int(guild_inflight))
+        self.policy = policy if policy in POLICIES else POLICY_BLOCK
+        self.batch_max = max(1, int(batch_max))
+        self.shed_threshold = max(1, int(self.guild_maxsize * min(max(float(shed_at), 0.0), 1.0)))
+        self.sample_every = max(1, int(sample_every))
+        self.max_waiters = max(0, int(max_waiters))
+        self.wait_timeout = float(wait_timeout) if wait_timeout and wait_timeout > 0 else None
+
+        # guild_id -> deque of (message, with_emojis)
+        self._queues: dict[int, deque] = {}
+        # Round-robin ring of guilds that have messages and a free in-flight slot
+        self._ready: deque[int] = deque()
+        self._ready_set: set[int] = set()
+        self._inflight: dict[int, int] = {}
+        self._depth = 0
+        self._busy = 0  # messages taken by workers but not finished
+        self._cond = asyncio.Condition()
+        self._tasks: list[asyncio.Task] = []
+        self._closing = False
+        self._sample_tick: dict[int, int] = {}
+        self._waiting = 0  # handlers blocked in submit()
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.shed_emoji = 0
+        self.blocked = 0
+        self.timed_out = 0
+        self.max_depth = 0
+        self.failures = 0
+
+    # ---------------------------
+    # Producer side
+    # ---------------------------
+    def _full(self, gid: int) -> bool:
+        q = self._queues.get(gid)
+        return self._depth >= self.maxsize or (q is not None and len(q) >= self.guild_maxsize)
+
+    def _mark_ready(self, gid: int) -> None:
+        if (
+            gid not in self._ready_set
+            and self._queues.get(gid)
+            and self._inflight.get(gid, 0) < self.guild_inflight
+        ):
+            self._ready.append(gid)
+            self._ready_set.add(gid)
+
+    async def submit(self, message: Any) -> bool:
+        """Queue a message for ingestion. Returns False if it was dropped."""
+        if self._closing:
+            self.dropped += 1
+            return False
+
+        gid = _guild_id(message)
+        async with self._cond:
+            with_emojis = True
+            q = self._queues.get(gid)
+            if self.policy == POLICY_SHED_EMOJI and q is not None and len(q) >= self.shed_threshold:
+                with_emojis = False
+                self.shed_emoji += 1
+
+            if self._full(gid):
+                if self.policy == POLICY_SAMPLE:
+                    tick = self._sample_tick.get(gid, 0) + 1
+                    self._sample_tick[gid] = tick
+                    if tick % self.sample_every:
+                        self.dropped += 1
+                        return False
+                if self._waiting >= self.max_waiters:
+                    self.dropped += 1
+                    return False
+                self.blocked += 1
+                self._waiting += 1
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait_for(lambda: not self._full(gid) or self._closing),
+                        timeout=self.wait_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                finally:
+                    self._waiting -= 1
+                if self._full(gid):
+                    # Timed out, or closing while still full: nobody will make room any more.
+                    self.dropped += 1
+                    return False
+
+            self._queues.setdefault(gid, deque()).append((message, with_emojis))
+            self._depth += 1
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._depth)
+            self._mark_ready(gid)
+            self._cond.notify_all()
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> dict[str, Any]:
+        hot = sorted(((len(q), gid) for gid, q in self._queues.items()), reverse=True)[:3]
+        return {
+            "depth": self._depth,
+            "maxsize": self.maxsize,
+            "max_depth": self.max_depth,
+            "policy": self.policy,
+            "guilds_queued": len(self._queues),
+            "hot_guilds": [(gid, n) for n, gid in hot],
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "shed_emoji": self.shed_emoji,
+            "blocked": self.blocked,
+            "waiting": self._waiting,
+            "timed_out": self.timed_out,
+            "failures": self.failures,
+        }
+
+    # ---------------------------
+    # Workers
+    # ---------------------------
+    def start(self) -> None:
+        self._closing = False
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"ingest-worker-{len(self._tasks)}"))
+
+    def _take_turn(self) -> tuple[int, list[tuple]]:
+        """Pop the next guild in the ring and up to batch_max of its messages (lock held)."""
+        gid = self._ready.popleft()
+        self._ready_set.discard(gid)
+        q = self._queues[gid]
+        batch = [q.popleft() for _ in range(min(self.batch_max, len(q)))]
+        if not q:
+            del self._queues[gid]
+            self._sample_tick.pop(gid, None)
+        self._depth -= len(batch)
+        self._busy += len(batch)
+        self._inflight[gid] = self._inflight.get(gid, 0) + 1
+        # Back of the ring if it still has work and another slot free.
+        self._mark_ready(gid)
+        self._cond.notify_all()  # space freed for blocked producers
+        return gid, batch
+
+    async def _finish_turn(self, gid: int, n: int) -> None:
+        async with self._cond:
+            left = self._inflight.get(gid, 0) - 1
+            if left > 0:
+                self._inflight[gid] = left
+            else:
+                self._inflight.pop(gid, None)
+            self._busy -= n
+            self._mark_ready(gid)
+            self._cond.notify_all()
+
+    async def _process(self, batch: list[tuple]) -> None:
+        try:
+            # Contiguous runs keep arrival order across shed / non-shed messages.
+            for with_emojis, run in groupby(batch, key=lambda item: item[1]):
+                await self.pipeline.ingest([m for m, _ in run], emojis=with_emojis)
+        except Exception:
+            self.failures += 1
+            logger.exception("Ingest batch of %d message(s) failed", len(batch))
+        finally:
+            self.processed += len(batch)
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: bool(self._ready))
+                gid, batch = self._take_turn()
+            try:
+                await self._process(batch)
+            finally:
+                await self._finish_turn(gid, len(batch))
+
+    async def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop accepting messages, drain what is queued, then stop the workers."""
+        self._closing = True
+        t0 = time.monotonic()
+        if not any(not t.done() for t in self._tasks):
+            # Workers never started (or died): drain inline.
+            while self._ready:
+                async with self._cond:
+                    gid, batch = self._take_turn()
+                await self._process(batch)
+                await self._finish_turn(gid, len(batch))
+        try:
+            async with self._cond:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._depth == 0 and self._busy == 0), timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning("Ingest queue close timed out with %d message(s) left", self._depth)
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        logger.debug("Ingest queue closed in %.1f ms", (time.monotonic() - t0) * 1000.0)
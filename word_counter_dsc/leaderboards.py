@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+from discord import app_commands
+
+from word_counter_dsc.buckets import DAY, GRAIN_DAY, day_start
+from word_counter_dsc.purges import not_purged
+
+# Slash-command ``window`` values -> days covered (None = all time, read from the totals).
+# Windows are whole UTC days (see window_start), so "24h" is today plus all of yesterday
+# and is labelled as such; the value is kept so existing command options stay valid.
+WINDOWS: dict[str, Optional[int]] = {"24h": 1, "7d": 7, "30d": 30, "all": None}
+WINDOW_LABELS = {"24h": "today and yesterday (UTC)", "7d": "last 7 days", "30d": "last 30 days", "all": "all time"}
+WINDOW_CHOICES = [app_commands.Choice(name=WINDOW_LABELS[w], value=w) for w in WINDOWS]
+
+_WID = "(SELECT word_id FROM words WHERE word=?)"
+# Words queued for a background purge (new stopwords) are hidden from every read below.
+_VISIBLE = not_purged()
+
+
+def window_start(window: Optional[str], now: Optional[int] = None) -> Optional[int]:
+    """First daily bucket inside ``window``, or None for all time.
+
+    Buckets are whole UTC days, so a window covers the last N days rounded out to the
+    start of the day N*24h ago (the partial day at the far end is included).
+    """
+    days = WINDOWS.get(window or "all")
+    if days is None:
+        return None
+    now = int(time.time()) if now is None else int(now)
+    return day_start(now - days * DAY)
+
+
+# Every windowed query below reads daily buckets through an index whose prefix is fixed by the
+# WHERE clause (guild, word or user, grain) plus a bucket range, so the rows read are bounded by
+# the window length times the matching keys per day, not by the size of the history.
+async def top_users_for_word(dbx: Any, guild_id: int, word: str, n: int, window: Optional[str] = None) -> list[Any]:
+    """Rows of (user_id, total) for a word, highest first."""
+    since = window_start(window)
+    if since is None:
+        return await dbx.fetchall(
+            f"""
+            SELECT user_id, count AS total
+            FROM user_word_totals
+            WHERE guild_id=? AND word_id={_WID} AND count > 0 AND {_VISIBLE}
+            ORDER BY count DESC
+            LIMIT ?
+            """,
+            (guild_id, word, guild_id, n),
+        )
+    return await dbx.fetchall(
+        f"""
+        SELECT user_id, SUM(count) AS total
+        FROM word_buckets
+        WHERE guild_id=? AND word_id={_WID} AND grain=? AND bucket >= ? AND {_VISIBLE}
+        GROUP BY user_id
+        ORDER BY total DESC
+        LIMIT ?
+        """,
+        (guild_id, word, GRAIN_DAY, since, guild_id, n),
+    )
+
+
+async def word_total(dbx: Any, guild_id: int, word: str, window: Optional[str] = None) -> int:
+    """How often a word was used in the guild."""
+    since = window_start(window)
+    if since is None:
+        row = await dbx.fetchone(
+            f"SELECT count AS total FROM guild_word_totals WHERE guild_id=? AND word_id={_WID} AND {_VISIBLE}",
+            (guild_id, word, guild_id),
+        )
+    else:
+        row = await dbx.fetchone(
+            f"""
+            SELECT SUM(count) AS total FROM word_buckets
+            WHERE guild_id=? AND word_id={_WID} AND grain=? AND bucket >= ? AND {_VISIBLE}
+            """,
+            (guild_id, word, GRAIN_DAY, since, guild_id),
+        )
+    return int(row["total"] or 0) if row else 0
+
+
+async def top_words(
+    dbx: Any, guild_id: int, n: int, window: Optional[str] = None, user_id: Optional[int] = None
+) -> list[Any]:
+    """Rows of (word, total) for the guild, or one user in it, highest first."""
+    since = window_start(window)
+    if since is None:
+        table, where, params = "guild_word_totals", "t.guild_id=?", (guild_id,)
+        if user_id is not None:
+            table, where, params = "user_word_totals", "t.guild_id=? AND t.user_id=?", (guild_id, user_id)
+        return await dbx.fetchall(
+            f"""
+            SELECT w.word, t.count AS total
+            FROM {table} t
+            JOIN words w ON w.word_id = t.word_id
+            WHERE {where} AND {not_purged("t.word_id")}
+            ORDER BY t.count DESC
+            LIMIT ?
+            """,
+            (*params, guild_id, n),
+        )
+
+    table, where, params = "guild_word_buckets", "guild_id=?", (guild_id,)
+    if user_id is not None:
+        table, where, params = "word_buckets", "guild_id=? AND user_id=?", (guild_id, user_id)
+    return await dbx.fetchall(
+        f"""
+        SELECT w.word, t.total
+        FROM (
+            SELECT word_id, SUM(count) AS total
+            FROM {table}
+            WHERE {where} AND grain=? AND bucket >= ? AND {_VISIBLE}
+            GROUP BY word_id
+            ORDER BY total DESC
+            LIMIT ?
+        ) t
+        JOIN words w ON w.word_id = t.word_id
+        ORDER BY t.total DESC
+        """,
+        (*params, GRAIN_DAY, since, guild_id, n),
+    )
+
+
+async def user_summary(dbx: Any, guild_id: int, user_id: int, window: Optional[str] = None) -> tuple[int, int]:
+    """(words counted, distinct words) for one user."""
+    since = window_start(window)
+    if since is None:
+        row = await dbx.fetchone(
+            "SELECT COALESCE(SUM(count), 0) AS total, COUNT(*) AS distinct_words "
+            f"FROM user_word_totals WHERE guild_id=? AND user_id=? AND count > 0 AND {_VISIBLE}",
+            (guild_id, user_id, guild_id),
+        )
+    else:
+        row = await dbx.fetchone(
+            f"""
+            SELECT COALESCE(SUM(count), 0) AS total, COUNT(DISTINCT word_id) AS distinct_words
+            FROM word_buckets
+            WHERE guild_id=? AND user_id=? AND grain=? AND bucket >= ? AND {_VISIBLE}
+            """,
+            (guild_id, user_id, GRAIN_DAY, since, guild_id),
+        )
+    return (int(row["total"]), int(row["distinct_words"])) if row else (0, 0)
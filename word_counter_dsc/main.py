@@ -3,23 +3,31 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import signal
 
 import discord
 from discord.ext import commands
 
-from word_counter_dsc.config import REQUIRE_MESSAGE_CONTENT_INTENT, get_bot_token
+from word_counter_dsc.config import REQUIRE_MESSAGE_CONTENT_INTENT, VACUUM_INTERVAL_SECONDS, get_bot_token
+from word_counter_dsc.config_bus import ConfigBus
 from word_counter_dsc.database import init_db
+from word_counter_dsc.maintenance import MaintenanceScheduler
 from word_counter_dsc.stopwords_core import CORE_STOPWORDS
 
 EXTENSIONS = [
+    "word_counter_dsc.cogs.ingest",
     "word_counter_dsc.cogs.tracker",
     "word_counter_dsc.cogs.emoji_stats",
     "word_counter_dsc.cogs.search",
+    "word_counter_dsc.cogs.stats",
+    "word_counter_dsc.cogs.analytics",
     "word_counter_dsc.cogs.keyword",
     "word_counter_dsc.cogs.stopwords",
     "word_counter_dsc.cogs.help_cmd",
     "word_counter_dsc.cogs.medals",
     "word_counter_dsc.cogs.profile",
+    "word_counter_dsc.cogs.backfill",
+    "word_counter_dsc.cogs.admin",
 ]
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -44,14 +52,21 @@ class WCBot(commands.Bot):
 
         self.logger = logger
         self.dbx = None  # set in setup_hook
+        # Per-guild config versions for cache invalidation (see config_bus.py)
+        self.config_bus = ConfigBus()
+        # Background maintenance jobs (cogs add theirs on load; see maintenance.py)
+        self.maintenance = MaintenanceScheduler()
 
     async def setup_hook(self):
         # init_db expects an optional DATABASE_URL string (or env DATABASE_URL),
         # not a logger instance.
         self.dbx = await init_db()
         logger.info("DB initialized: %s", type(self.dbx).__name__)
+        await self.config_bus.start(self.dbx)
+        self.maintenance.add_job("vacuum", self.dbx.vacuum, VACUUM_INTERVAL_SECONDS)
+        await self.maintenance.start(self.dbx)
 
-        # Apply core stopwords maintenance (purges legacy data if core list changed)
+        # Apply core stopwords maintenance (queues purges of their counts if the core list changed)
         try:
             import hashlib
 
@@ -79,6 +94,18 @@ class WCBot(commands.Bot):
         else:
             logger.info("Message counting is disabled (REQUIRE_MESSAGE_CONTENT_INTENT=0).")
 
+    async def close(self):
+        # Cogs are unloaded first (TrackerCog flushes its write buffer there), then the DB is closed.
+        await super().close()
+        await self.config_bus.close()
+        await self.maintenance.close()
+        if self.dbx is not None:
+            try:
+                await self.dbx.close()
+            except Exception:
+                logger.exception("Closing DB failed")
+            self.dbx = None
+
 
 async def main():
     token = get_bot_token().strip()
@@ -86,6 +113,14 @@ async def main():
         raise RuntimeError("DISCORD_TOKEN (or BOT_TOKEN) env var not set.")
 
     bot = WCBot()
+
+    # Render stops workers with SIGTERM; close gracefully so buffered counts are flushed.
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except (NotImplementedError, RuntimeError):
+        pass  # e.g. Windows event loops
+
     await bot.start(token)
 
 
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from word_counter_dsc.config import MAINTENANCE_JITTER, MAINTENANCE_STARTUP_DELAY_SECONDS
+
+logger = logging.getLogger("word_counter_dsc.maintenance")
+
+JobFn = Callable[[], Awaitable[Any]]
+
+# app_meta key prefix holding each job's next due time (epoch seconds).
+_DUE_KEY = "maintenance_due:"
+
+_CLAIM_SQL = """
+INSERT INTO app_meta(key, value) VALUES (?, ?)
+ON CONFLICT(key) DO UPDATE SET value = excluded.value
+WHERE CAST(app_meta.value AS BIGINT) <= ?
+RETURNING key
+"""
+
+
+@dataclass
+class Job:
+    name: str
+    fn: JobFn
+    interval: float
+
+    # Metrics
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_started: float = 0.0
+    last_ms: float = 0.0
+    max_ms: float = 0.0
+    total_ms: float = 0.0
+    last_result: Any = None
+
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.lock.locked()
+
+
+class MaintenanceScheduler:
+    """Interval jobs (compaction, cleanups, rebuilds, vacuum) run off the event handlers.
+
+    Cogs register their jobs in cog_load and remove them in cog_unload, like pipeline stages;
+    the bot starts the scheduler once the DB is up and closes it before the DB. Each job has
+    its own loop: a random first delay (up to ``startup_delay``), then ``interval`` with
+    +/- ``jitter`` spread, so jobs and processes don't all fire together.
+
+    A job never overlaps itself. Before running, it claims its next due time in app_meta
+    with one conditional upsert, so with a shared database one process runs it per interval,
+    and restarts or gateway reconnects don't run it again early.
+    """
+
+    def __init__(self, jitter: float = MAINTENANCE_JITTER, startup_delay: float = MAINTENANCE_STARTUP_DELAY_SECONDS):
+        self.jitter = min(max(float(jitter), 0.0), 0.5)
+        self.startup_delay = max(0.0, float(startup_delay))
+        self._jobs: dict[str, Job] = {}
+        self._dbx: Any = None
+        self._started = False
+
+    @property
+    def jobs(self) -> dict[str, Job]:
+        return dict(self._jobs)
+
+    def add_job(self, name: str, fn: JobFn, interval: float) -> Optional[Job]:
+        """Register (or replace) a job. ``interval`` <= 0 disables it."""
+        old = self._jobs.pop(name, None)
+        if old is not None and old.task is not None:
+            old.task.cancel()
+        if float(interval) <= 0:
+            logger.info("Maintenance job %s disabled", name)
+            return None
+        job = Job(name=name, fn=fn, interval=float(interval))
+        self._jobs[name] = job
+        if self._started:
+            self._spawn(job)
+        return job
+
+    async def remove_job(self, name: str) -> None:
+        job = self._jobs.pop(name, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+            try:
+                await job.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def start(self, dbx: Any) -> None:
+        self._dbx = dbx
+        self._started = True
+        for job in self._jobs.values():
+            if job.task is None or job.task.done():
+                self._spawn(job)
+
+    def _spawn(self, job: Job) -> None:
+        job.task = asyncio.create_task(self._loop(job), name=f"maintenance-{job.name}")
+
+    def _next_delay(self, interval: float) -> float:
+        return interval * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+    async def _loop(self, job: Job) -> None:
+        await asyncio.sleep(random.uniform(0.0, min(self.startup_delay, job.interval)))
+        while True:
+            await self.run_job(job.name)
+            await asyncio.sleep(self._next_delay(job.interval))
+
+    async def _claim(self, job: Job) -> bool:
+        """Take this interval's run of ``job`` (False if it ran recently, here or elsewhere)."""
+        if self._dbx is None:
+            return True
+        now = int(time.time())
+        # The earliest a jittered loop can wake again, so the next turn finds the job due.
+        due = now + int(job.interval * (1.0 - self.jitter))
+        async with self._dbx.transaction() as tx:
+            rows = await tx.fetchall(_CLAIM_SQL, (_DUE_KEY + job.name, str(due), now))
+        return bool(rows)
+
+    async def run_job(self, name: str, force: bool = False) -> bool:
+        """Run a job now unless it is already running or not due (``force`` skips the due check).
+
+        Returns True if the job ran (even if it failed).
+        """
+        job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        if job.lock.locked():
+            job.skipped += 1
+            return False
+        async with job.lock:
+            try:
+                claimed = force or await self._claim(job)
+            except Exception:
+                job.failures += 1
+                logger.exception("Maintenance job %s could not claim its run", name)
+                return False
+            if not claimed:
+                job.skipped += 1
+                return False
+
+            job.last_started = time.time()
+            t0 = time.perf_counter()
+            try:
+                job.last_result = await job.fn()
+                job.runs += 1
+            except Exception:
+                job.failures += 1
+                logger.exception("Maintenance job %s failed", name)
+            finally:
+                ms = (time.perf_counter() - t0) * 1000.0
+                job.last_ms = ms
+                job.max_ms = max(job.max_ms, ms)
+                job.total_ms += ms
+            logger.debug("Maintenance job %s took %.0f ms: %s", name, job.last_ms, job.last_result)
+        return True
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        out = {}
+        for name, job in self._jobs.items():
+            done = job.runs + job.failures
+            out[name] = {
+                "interval": job.interval,
+                "running": job.running,
+                "runs": job.runs,
+                "failures": job.failures,
+                "skipped": job.skipped,
+                "last_started": int(job.last_started),
+                "last_ms": round(job.last_ms, 1),
+                "avg_ms": round(job.total_ms / done, 1) if done else 0.0,
+                "max_ms": round(job.max_ms, 1),
+                "last_result": job.last_result,
+            }
+        return out
+
+    async def close(self) -> None:
+        for name in list(self._jobs):
+            await self.remove_job(name)
+        self._started = False
+
+
+def get_scheduler(bot: Any) -> MaintenanceScheduler:
+    """Return the bot's MaintenanceScheduler, attaching an unstarted one if the bot has none."""
+    scheduler = getattr(bot, "maintenance", None)
+    if scheduler is None:
+        scheduler = MaintenanceScheduler()
+        bot.maintenance = scheduler
+    return scheduler
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence
+
+logger = logging.getLogger("word_counter_dsc.pipeline")
+
+# Discord snowflakes count milliseconds since 2015-01-01T00:00:00Z in their top 42 bits.
+_DISCORD_EPOCH_MS = 1420070400000
+
+
+def snowflake_seconds(snowflake: int) -> int:
+    """Unix time (seconds) encoded in a Discord snowflake id."""
+    return ((int(snowflake) >> 22) + _DISCORD_EPOCH_MS) // 1000
+
+
+@dataclass
+class ParsedMessage:
+    """Everything the stages need from one message, produced by a single parse."""
+
+    guild_id: int
+    channel_id: int
+    user_id: int
+    message_id: int
+    created_at: int
+    # Tracked-word counts (stopwords removed, COUNT_MODE applied)
+    words: Counter = field(default_factory=Counter)
+    # Keyword -> occurrences among ``words`` (keywords + aliases, per MATCH_MODE)
+    keyword_hits: Counter = field(default_factory=Counter)
+    # Custom emoji (current name) / unicode emoji sequence -> occurrences
+    custom_emojis: Counter = field(default_factory=Counter)
+    unicode_emojis: Counter = field(default_factory=Counter)
+    # The source discord.Message for live traffic; None for replayed/history input
+    message: Any = None
+
+    @property
+    def live(self) -> bool:
+        return self.message is not None
+
+    def __bool__(self) -> bool:
+        return bool(self.words or self.custom_emojis or self.unicode_emojis)
+
+
+class Stage:
+    """One consumer of parsed messages. Subclasses set ``name``/``order`` and implement process()."""
+
+    name: str = "stage"
+    # Stages run in ascending order (word counts before medals, which read them).
+    order: int = 100
+
+    async def process(self, batch: Sequence[ParsedMessage]) -> None:
+        raise NotImplementedError
+
+    async def prepare(self, batch: Sequence[ParsedMessage]) -> Any:
+        """Work for write() that must happen before the transaction opens (e.g. word ids)."""
+        return None
+
+    async def write(self, tx: Any, batch: Sequence[ParsedMessage], prepared: Any) -> None:
+        """Store the batch's rows in the caller's transaction (history backfill, see
+        IngestPipeline.commit). Stages that only react to live traffic keep this no-op."""
+        return None
+
+
+@dataclass
+class StageTiming:
+    calls: int = 0
+    messages: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+
+    def record(self, n: int, elapsed_ms: float) -> None:
+        self.calls += 1
+        self.messages += n
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "messages": self.messages,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "errors": self.errors,
+        }
+
+
+class IngestPipeline:
+    """Parses each message once and hands the result to the registered stages.
+
+    Parsing uses TrackerCog (tokens, stopwords, abbreviations, keyword matcher) and
+    EmojiStatsCog (custom emoji index, unicode emoji table) when they are loaded.
+    Cogs register their stages in cog_load and remove them in cog_unload. A failing
+    stage is logged and does not stop the others.
+    """
+
+    PARSE = "parse"
+
+    def __init__(self, bot: Any):
+        self.bot = bot
+        self._stages: list[Stage] = []
+        self.timings: dict[str, StageTiming] = {self.PARSE: StageTiming()}
+
+    # ---------------------------
+    # Stage registry
+    # ---------------------------
+    def add_stage(self, stage: Stage) -> None:
+        self.remove_stage(stage.name)
+        self._stages.append(stage)
+        self._stages.sort(key=lambda s: s.order)
+        self.timings.setdefault(stage.name, StageTiming())
+
+    def remove_stage(self, name: str) -> None:
+        self._stages = [s for s in self._stages if s.name != name]
+
+    @property
+    def stages(self) -> list[str]:
+        return [s.name for s in self._stages]
+
+    # ---------------------------
+    # Parsing
+    # ---------------------------
+    async def parse(self, message: Any, live: bool = True, emojis: bool = True) -> Optional[ParsedMessage]:
+        """Parse a discord.Message (or anything shaped like one). None if it isn't counted.
+
+        ``emojis=False`` skips emoji parsing (load shedding); emoji stages then see nothing.
+        """
+        author = getattr(message, "author", None)
+        guild = getattr(message, "guild", None)
+        if author is None or getattr(author, "bot", False) or guild is None:
+            return None
+        text = (getattr(message, "content", None) or "").strip()
+        if not text:
+            return None
+
+        gid = int(guild.id)
+        # discord.py derives created_at from the snowflake; without it, read the id directly.
+        # Time buckets depend on this being the send time, not the time we saw the message.
+        created = getattr(message, "created_at", None)
+        parsed = ParsedMessage(
+            guild_id=gid,
+            channel_id=int(message.channel.id),
+            user_id=int(author.id),
+            message_id=int(message.id),
+            created_at=int(created.timestamp()) if created is not None else snowflake_seconds(int(message.id)),
+            message=message if live else None,
+        )
+
+        tracker = self.bot.get_cog("TrackerCog")
+        if tracker is not None:
+            parsed.words, parsed.keyword_hits = await tracker.count_message(gid, text)
+        emoji = self.bot.get_cog("EmojiStatsCog") if emojis else None
+        if emoji is not None:
+            parsed.custom_emojis, parsed.unicode_emojis = emoji.count_emojis(guild, gid, text)
+        return parsed
+
+    async def parse_batch(self, messages: Iterable[Any], live: bool = False, emojis: bool = True) -> list[ParsedMessage]:
+        """Parse many messages (history backfill / replay); uncounted ones are skipped."""
+        t0 = time.perf_counter()
+        out: list[ParsedMessage] = []
+        n = 0
+        for m in messages:
+            n += 1
+            parsed = await self.parse(m, live=live, emojis=emojis)
+            if parsed:
+                out.append(parsed)
+        self.timings[self.PARSE].record(n, (time.perf_counter() - t0) * 1000.0)
+        return out
+
+    # ---------------------------
+    # Running stages
+    # ---------------------------
+    async def run(self, batch: Sequence[ParsedMessage], stages: Optional[Iterable[str]] = None) -> None:
+        """Feed parsed messages to every stage (or only the named ones), in stage order."""
+        if not batch:
+            return
+        only = set(stages) if stages is not None else None
+        for stage in list(self._stages):
+            if only is not None and stage.name not in only:
+                continue
+            timing = self.timings.setdefault(stage.name, StageTiming())
+            t0 = time.perf_counter()
+            try:
+                await stage.process(batch)
+            except Exception:
+                timing.errors += 1
+                logger.exception("Pipeline stage %r failed for %d message(s)", stage.name, len(batch))
+            timing.record(len(batch), (time.perf_counter() - t0) * 1000.0)
+
+    async def ingest(
+        self,
+        messages: Sequence[Any],
+        live: bool = True,
+        stages: Optional[Iterable[str]] = None,
+        emojis: bool = True,
+    ) -> int:
+        """Parse + run stages for a batch of messages. Returns how many were counted."""
+        parsed = await self.parse_batch(messages, live=live, emojis=emojis)
+        await self.run(parsed, stages)
+        return len(parsed)
+
+    async def commit(
+        self,
+        batch: Sequence[ParsedMessage],
+        then: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> None:
+        """Write a batch through every stage's write() in one transaction, then run ``then(tx)``.
+
+        Unlike run(), a failing stage rolls the whole transaction back and raises, so the
+        caller's own statements in ``then`` (the backfill watermark) commit only together
+        with every stage's rows.
+        """
+        stages = list(self._stages) if batch else []
+        prepared = [await stage.prepare(batch) for stage in stages]
+        async with self.bot.dbx.transaction() as tx:
+            for stage, prep in zip(stages, prepared):
+                timing = self.timings.setdefault(stage.name, StageTiming())
+                t0 = time.perf_counter()
+                try:
+                    await stage.write(tx, batch, prep)
+                except Exception:
+                    timing.errors += 1
+                    raise
+                timing.record(len(batch), (time.perf_counter() - t0) * 1000.0)
+            if then is not None:
+                await then(tx)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: t.as_dict() for name, t in self.timings.items()}
+
+
+def get_pipeline(bot: Any) -> IngestPipeline:
+    """Return the bot's IngestPipeline, attaching one on first use."""
+    pipeline = getattr(bot, "pipeline", None)
+    if pipeline is None:
+        pipeline = IngestPipeline(bot)
+        bot.pipeline = pipeline
+    return pipeline
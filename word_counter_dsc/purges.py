@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Iterable, Optional
+
+from word_counter_dsc.config import PURGE_CHUNK_PAUSE_SECONDS, PURGE_CHUNK_ROWS
+from word_counter_dsc.database import WORD_COUNT_TABLES
+
+# Maintenance job name (registered by the stopwords cog).
+PURGE_JOB = "word-purge"
+
+# Primary key of each per-word count table; chunks are deleted by key.
+_TABLE_KEYS = {
+    "word_counts": ("guild_id", "channel_id", "user_id", "word_id"),
+    "user_word_totals": ("guild_id", "user_id", "word_id"),
+    "guild_word_totals": ("guild_id", "word_id"),
+    "word_buckets": ("guild_id", "grain", "bucket", "word_id", "user_id"),
+    "guild_word_buckets": ("guild_id", "grain", "bucket", "word_id"),
+}
+
+
+def not_purged(column: str = "word_id") -> str:
+    """SQL condition hiding words queued for purging; takes the guild id as its one parameter.
+
+    The subquery is uncorrelated, so it is evaluated once per query, not per row.
+    """
+    return f"{column} NOT IN (SELECT word_id FROM word_purges WHERE guild_id IN (0, ?))"
+
+
+async def queue_word_purges(tx: Any, guild_id: int, words: Iterable[str], now: Optional[int] = None) -> None:
+    """Queue a guild's counts for ``words`` for deletion; they are hidden from reads from the commit on.
+
+    Words that were never counted have no id and nothing to purge.
+    """
+    now = int(time.time()) if now is None else int(now)
+    await tx.executemany(
+        """
+        INSERT INTO word_purges (guild_id, word_id, created_at)
+        SELECT CAST(? AS BIGINT), word_id, CAST(? AS BIGINT) FROM words WHERE word=?
+        ON CONFLICT(guild_id, word_id) DO NOTHING
+        """,
+        [(int(guild_id), now, str(w)) for w in words],
+    )
+
+
+async def cancel_word_purges(tx: Any, guild_id: int, words: Iterable[str]) -> None:
+    """Drop a guild's queued purges for ``words``; their counts become visible again and are kept.
+
+    A run that is part-way through such a purge stops at its next chunk.
+    """
+    await tx.executemany(
+        "DELETE FROM word_purges WHERE guild_id=? AND word_id=(SELECT word_id FROM words WHERE word=?)",
+        [(int(guild_id), str(w)) for w in words],
+    )
+
+
+async def _expand_global(dbx: Any, word_id: int) -> None:
+    """Split an every-guild purge (core stopwords) into one purge per guild that has the word."""
+    async with dbx.transaction() as tx:
+        row = await tx.fetchone("SELECT created_at FROM word_purges WHERE guild_id=0 AND word_id=?", (word_id,))
+        if row is None:
+            return
+        # word_counts has an index on word_id; every other table is keyed by guild first.
+        await tx.execute(
+            """
+            INSERT INTO word_purges (guild_id, word_id, created_at)
+            SELECT DISTINCT guild_id, word_id, CAST(? AS BIGINT) FROM word_counts WHERE word_id=?
+            ON CONFLICT(guild_id, word_id) DO NOTHING
+            """,
+            (int(row["created_at"]), word_id),
+        )
+        await tx.execute("DELETE FROM word_purges WHERE guild_id=0 AND word_id=?", (word_id,))
+
+
+async def _purge_chunk(dbx: Any, table: str, guild_id: int, word_id: int, chunk_rows: int) -> Optional[int]:
+    """Delete one chunk; None if the purge was cancelled in the meantime."""
+    keys = ", ".join(_TABLE_KEYS[table])
+    async with dbx.transaction() as tx:
+        queued = await tx.fetchone("SELECT 1 FROM word_purges WHERE guild_id=? AND word_id=?", (guild_id, word_id))
+        if queued is None:
+            return None
+        rows = await tx.fetchall(
+            f"""
+            DELETE FROM {table}
+            WHERE ({keys}) IN (SELECT {keys} FROM {table} WHERE guild_id=? AND word_id=? LIMIT ?)
+            RETURNING guild_id
+            """,
+            (guild_id, word_id, chunk_rows),
+        )
+        if rows:
+            await tx.execute(
+                "UPDATE word_purges SET deleted = deleted + ? WHERE guild_id=? AND word_id=?",
+                (len(rows), guild_id, word_id),
+            )
+    return len(rows)
+
+
+async def run_word_purges(
+    dbx: Any,
+    chunk_rows: int = PURGE_CHUNK_ROWS,
+    pause: float = PURGE_CHUNK_PAUSE_SECONDS,
+) -> dict[str, int]:
+    """Work through the purge queue until it is empty.
+
+    Each chunk deletes at most ``chunk_rows`` rows of one table in its own transaction (and
+    adds them to the purge's progress), so the write lock is never held for long and an
+    interrupted run resumes where it stopped. A (guild, word) leaves the queue, and so
+    becomes visible again, only once none of its rows are left.
+    """
+    stats = {"words": 0, "rows": 0}
+    while True:
+        queued = await dbx.fetchall("SELECT guild_id, word_id FROM word_purges ORDER BY created_at, guild_id LIMIT 100", ())
+        if not queued:
+            return stats
+        for q in queued:
+            gid, wid = int(q["guild_id"]), int(q["word_id"])
+            if gid == 0:
+                await _expand_global(dbx, wid)
+                continue
+            cancelled = False
+            for table in WORD_COUNT_TABLES:
+                while True:
+                    n = await _purge_chunk(dbx, table, gid, wid, int(chunk_rows))
+                    if n is None:
+                        cancelled = True
+                        break
+                    stats["rows"] += n
+                    if n < chunk_rows:
+                        break
+                    await asyncio.sleep(pause)
+                if cancelled:
+                    break
+            if cancelled:
+                continue
+            await dbx.execute("DELETE FROM word_purges WHERE guild_id=? AND word_id=?", (gid, wid))
+            stats["words"] += 1
+
+
+async def purge_progress(dbx: Any, guild_id: int) -> list[Any]:
+    """Rows of (word, deleted, created_at, all_guilds) for purges still affecting ``guild_id``."""
+    return await dbx.fetchall(
+        """
+        SELECT w.word, p.deleted, p.created_at, p.guild_id = 0 AS all_guilds
+        FROM word_purges p
+        JOIN words w ON w.word_id = p.word_id
+        WHERE p.guild_id IN (0, ?)
+        ORDER BY p.created_at, w.word
+        """,
+        (int(guild_id),),
+    )
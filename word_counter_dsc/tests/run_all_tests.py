@@ -38,6 +38,19 @@ def main():
     from test_bot_load import run_bot_tests
     from test_concurrency import run_concurrency_tests
     from test_main_smoke import run_main_smoke_tests
+    from test_write_buffer import run_rollup_tests, run_write_buffer_tests
+    from test_transactions import run_migration_tests, run_sqlite_wal_tests, run_transaction_tests
+    from test_tokenizer import run_tokenizer_tests
+    from test_tracker import run_tracker_tests
+    from test_config_bus import run_config_bus_tests
+    from test_backfill import run_backfill_tests
+    from test_buckets import run_bucket_tests, run_window_tests
+    from test_medals import run_medal_tests
+    from test_announcements import run_announcement_tests
+    from test_maintenance import run_maintenance_tests
+    from test_purges import run_purge_tests
+    from test_emoji import run_emoji_tests
+    from test_ingest_queue import run_ingest_queue_tests
 
     run_test("Structure", run_structure_tests)
     run_test("Database", run_database_tests)
@@ -45,6 +58,23 @@ def main():
     run_test("Bot Load", run_bot_tests)
     run_test("Concurrency", run_concurrency_tests)
     run_test("Main Smoke", run_main_smoke_tests)
+    run_test("Write Buffer", run_write_buffer_tests)
+    run_test("Rollups", run_rollup_tests)
+    run_test("Transactions", run_transaction_tests)
+    run_test("SQLite WAL", run_sqlite_wal_tests)
+    run_test("Migrations", run_migration_tests)
+    run_test("Time Buckets", run_bucket_tests)
+    run_test("Windows", run_window_tests)
+    run_test("Medals", run_medal_tests)
+    run_test("Announcements", run_announcement_tests)
+    run_test("Maintenance", run_maintenance_tests)
+    run_test("Purges", run_purge_tests)
+    run_test("Tokenizer", run_tokenizer_tests)
+    run_test("Tracker", run_tracker_tests)
+    run_test("Config Bus", run_config_bus_tests)
+    run_test("Backfill", run_backfill_tests)
+    run_test("Emoji", run_emoji_tests)
+    run_test("Ingest Queue", run_ingest_queue_tests)
 
     print("\n=== TESTING COMPLETE ===\n")
 
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+
+def run_announcement_tests():
+    from word_counter_dsc.announcements import AnnouncementQueue
+
+    class RateLimited(Exception):
+        retry_after = 0.05
+
+    class FakeSender:
+        def __init__(self):
+            self.sent = []  # (channel_id, items, monotonic time)
+            self.gate = asyncio.Event()
+            self.gate.set()
+            self.rate_limit_once = False
+
+        async def __call__(self, channel_id, items):
+            await self.gate.wait()
+            if self.rate_limit_once:
+                self.rate_limit_once = False
+                raise RateLimited()
+            self.sent.append((channel_id, items, time.monotonic()))
+
+    async def _run():
+        # A burst in one channel becomes one batch; a repeated key keeps only the newest item
+        send = FakeSender()
+        q = AnnouncementQueue(send, coalesce=0.05, interval=0.2, max_pending=100)
+        q.submit(1, ("u1", "pizza"), "u1 pizza 25")
+        q.submit(1, ("u2", "pizza"), "u2 pizza 25")
+        q.submit(1, ("u1", "pizza"), "u1 pizza 50")
+        q.submit(2, ("u1", "taco"), "u1 taco 25")
+        if q.depth != 3 or q.coalesced != 1:
+            raise Exception(f"Unexpected queue state: {q.stats()}")
+        await asyncio.sleep(0.15)
+        got = sorted((c, items) for c, items, _ in send.sent)
+        if got != [(1, ["u2 pizza 25", "u1 pizza 50"]), (2, ["u1 taco 25"])]:
+            raise Exception(f"Unexpected batches: {got}")
+
+        # The next send in a channel waits for the per-channel interval
+        q.submit(1, ("u3", "pizza"), "u3 pizza 25")
+        await asyncio.sleep(0.3)
+        first, last = [t for c, _, t in send.sent if c == 1]
+        if last - first < 0.19:
+            raise Exception(f"Channel interval not respected: {last - first:.3f}s")
+
+        # Rate-limited sends are retried after retry_after instead of being lost
+        send.rate_limit_once = True
+        q.submit(3, "k", "retry me")
+        await asyncio.sleep(0.2)
+        if q.rate_limited != 1 or [items for c, items, _ in send.sent if c == 3] != [["retry me"]]:
+            raise Exception(f"Rate-limited batch not retried: {q.stats()}")
+
+        # Full queue drops new items; close() sends what is left without waiting out the timers
+        send.gate.clear()
+        q = AnnouncementQueue(send, coalesce=60, interval=60, max_pending=2)
+        results = [q.submit(4, i, i) for i in range(3)]
+        if results != [True, True, False] or q.dropped != 1:
+            raise Exception(f"max_pending not enforced: {q.stats()}")
+        send.gate.set()
+        t0 = time.monotonic()
+        await q.close(timeout=1)
+        if time.monotonic() - t0 > 0.5 or [items for c, items, _ in send.sent if c == 4] != [[0, 1]]:
+            raise Exception(f"close() did not flush the queue: {q.stats()}")
+        if q.submit(4, 9, 9):
+            raise Exception("Closed queue accepted an item")
+
+    asyncio.run(_run())
+
+    # Merged medal congrats list every unlock and stay under Discord's message limit
+    import types
+
+    from word_counter_dsc.cogs.medals import MedalsCog
+
+    msg = types.SimpleNamespace(author=types.SimpleNamespace(mention="<@5>"))
+    chunks = MedalsCog._announcement_chunks([(msg, f"word{i}", 25, 0) for i in range(60)])
+    if len(chunks) < 2 or max(map(len, chunks)) > 2000 or sum(c.count("<@5>") for c in chunks) != 60:
+        raise Exception(f"Unexpected merged announcement chunks: {[len(c) for c in chunks]}")
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import types
+
+try:
+    import aiosqlite  # type: ignore
+    import discord  # type: ignore
+    from discord.ext import commands  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+def run_backfill_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.cogs.backfill import BackfillCog
+    from word_counter_dsc.cogs.emoji_stats import EmojiStatsCog
+    from word_counter_dsc.cogs.medals import MedalsCog
+    from word_counter_dsc.cogs.tracker import TrackerCog
+
+    base_id = 1_000_000_000_000_000_000
+
+    class FakeChannel:
+        """Serves a fixed history; optionally fails after `fail_after` messages."""
+
+        def __init__(self, cid, messages):
+            self.id = cid
+            self.messages = messages
+            self.fail_after = None
+
+        async def history(self, limit=None, after=None, before=None, oldest_first=True):
+            served = 0
+            for m in self.messages:
+                if after is not None and m.id <= after.id:
+                    continue
+                if before is not None and m.id >= before.id:
+                    continue
+                if self.fail_after is not None and served >= self.fail_after:
+                    raise RuntimeError("connection lost")
+                served += 1
+                yield m
+
+    guild = types.SimpleNamespace(id=1, emojis=[])
+    channel_ref = types.SimpleNamespace(id=10)
+
+    def msg(i, uid, content, bot=False):
+        return types.SimpleNamespace(
+            id=base_id + i, content=content, author=types.SimpleNamespace(id=uid, bot=bot),
+            guild=guild, channel=channel_ref, created_at=None,
+        )
+
+    history = [msg(i, 100 + i % 3, f"pizza hello {i} 🔥") for i in range(1, 251)]
+    history.append(msg(251, 999, "pizza from a bot", bot=True))
+    history.append(msg(300, 100, "pizza after cutoff"))
+    chan = FakeChannel(10, history)
+    guild.get_channel = lambda cid: chan if cid == 10 else None
+
+    async def _run():
+        bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        bot.logger = logging.getLogger("test_backfill")
+        bot.logger.setLevel(logging.CRITICAL)  # the interrupted run logs its failure
+        bot.dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        await bot.add_cog(TrackerCog(bot))
+        await bot.add_cog(EmojiStatsCog(bot))
+        await bot.add_cog(MedalsCog(bot))
+        cog = BackfillCog(bot)
+        await bot.add_cog(cog)
+        await bot.dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'pizza', 0)")
+
+        await bot.dbx.execute(
+            "INSERT INTO backfill_state (guild_id, channel_id, last_message_id, cutoff_id, messages, done, updated_at) "
+            "VALUES (1, 10, 0, ?, 0, 0, 0)",
+            (base_id + 300,),
+        )
+
+        async def state():
+            return await bot.dbx.fetchone("SELECT * FROM backfill_state WHERE guild_id=1 AND channel_id=10")
+
+        async def pizza_total():
+            row = await bot.dbx.fetchone("SELECT COALESCE(SUM(count), 0) AS n FROM word_counts JOIN words USING (word_id) WHERE guild_id=1 AND word='pizza'")
+            return int(row["n"])
+
+        async def medal_total():
+            row = await bot.dbx.fetchone("SELECT COALESCE(SUM(total_count), 0) AS n FROM keyword_medals WHERE guild_id=1 AND word='pizza'")
+            return int(row["n"])
+
+        import word_counter_dsc.cogs.backfill as backfill_mod
+        backfill_mod.BACKFILL_BATCH_SIZE = 100
+        backfill_mod.BACKFILL_PAGE_DELAY_SECONDS = 0
+
+        # A failing stage rolls the whole batch back, watermark included.
+        from word_counter_dsc.cogs.emoji_stats import EmojiCountStage
+
+        async def broken(self, tx, batch, prepared):
+            raise RuntimeError("emoji write failed")
+
+        real_write, EmojiCountStage.write = EmojiCountStage.write, broken
+        try:
+            await cog._commit_batch(1, 10, history[:5], base_id + 5, 5, done=False)
+        except RuntimeError:
+            pass
+        else:
+            raise Exception("A failing stage should fail the backfill batch")
+        finally:
+            EmojiCountStage.write = real_write
+        st = await state()
+        if int(st["last_message_id"]) or await pizza_total() or await medal_total():
+            raise Exception(f"Failed batch left rows behind: {dict(st)} pizza={await pizza_total()}")
+
+        # First run dies midway: only whole committed batches count.
+        chan.fail_after = 170
+        prog = backfill_mod.BackfillProgress(guild_id=1, channels_total=1)
+        await cog._run_channel(guild, await state(), prog)
+        st = await state()
+        if int(st["done"]) or int(st["last_message_id"]) != base_id + 100 or await pizza_total() != 100:
+            raise Exception(f"Unexpected state after interrupted run: {dict(st)} pizza={await pizza_total()}")
+
+        # Resume from the watermark: every message before the cutoff counted exactly once.
+        chan.fail_after = None
+        await cog._run_channel(guild, await state(), prog)
+        st = await state()
+        if not int(st["done"]) or int(st["messages"]) != 251:
+            raise Exception(f"Backfill did not finish cleanly: {dict(st)}")
+        if await pizza_total() != 250:
+            raise Exception(f"Expected 250 'pizza' after resume, got {await pizza_total()}")
+        row = await bot.dbx.fetchone("SELECT COALESCE(SUM(count), 0) AS n FROM unicode_emoji_counts WHERE guild_id=1")
+        if int(row["n"]) != 250:
+            raise Exception(f"Expected 250 emoji from history, got {row['n']}")
+        if await medal_total() != 250:
+            raise Exception(f"History should go through the medal stage, got {await medal_total()}")
+        if prog.channels_done != 1 or prog.messages != 251:
+            raise Exception(f"Progress not reported: {prog}")
+
+        # Planning is per channel: live counts landing first don't stop a channel's backfill,
+        # but a channel whose history was counted before going live is not counted again.
+        from datetime import datetime, timezone
+
+        live_since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        since = int(live_since.timestamp())
+        g2 = types.SimpleNamespace(id=2, me=None, text_channels=[types.SimpleNamespace(id=c) for c in (20, 21, 22, 23)])
+        await bot.dbx.execute(
+            "INSERT INTO backfill_state (guild_id, channel_id, last_message_id, cutoff_id, messages, done, updated_at) "
+            "VALUES (2, 20, 5, 99, 5, 0, 0)"
+        )
+        word_id = (await bot.dbx.fetchone("SELECT word_id FROM words WHERE word='pizza'"))["word_id"]
+        await bot.dbx.executemany(
+            "INSERT INTO word_counts (guild_id, channel_id, user_id, word_id, count, updated_at) VALUES (2, ?, ?, ?, 1, ?)",
+            [(21, 100, word_id, since - 60), (21, 101, word_id, since + 60), (22, 100, word_id, since + 60)],
+        )
+        pending = await cog._plan(g2, live_since)
+        got = sorted((int(r["channel_id"]), int(r["last_message_id"])) for r in pending)
+        if got != [(20, 5), (22, 0), (23, 0)]:
+            raise Exception(f"Unexpected per-channel plan: {got}")
+        row = await bot.dbx.fetchone("SELECT done, cutoff_id FROM backfill_state WHERE guild_id=2 AND channel_id=21")
+        if not int(row["done"]) or int(row["cutoff_id"]) != discord.utils.time_snowflake(live_since):
+            raise Exception(f"Channel counted before going live should be planned as done: {dict(row)}")
+
+        await bot.close()
+        await bot.dbx.close()
+
+    asyncio.run(_run())
@@ -17,13 +17,18 @@ def run_bot_tests():
         bot = commands.Bot(command_prefix="!", intents=intents)
 
         # Ensure extensions load
+        await bot.load_extension("word_counter_dsc.cogs.ingest")
         await bot.load_extension("word_counter_dsc.cogs.tracker")
         await bot.load_extension("word_counter_dsc.cogs.search")
+        await bot.load_extension("word_counter_dsc.cogs.stats")
+        await bot.load_extension("word_counter_dsc.cogs.analytics")
         await bot.load_extension("word_counter_dsc.cogs.keyword")
         await bot.load_extension("word_counter_dsc.cogs.stopwords")
         await bot.load_extension("word_counter_dsc.cogs.help_cmd")
         await bot.load_extension("word_counter_dsc.cogs.medals")
         await bot.load_extension("word_counter_dsc.cogs.profile")
+        await bot.load_extension("word_counter_dsc.cogs.backfill")
+        await bot.load_extension("word_counter_dsc.cogs.admin")
 
         # Unload to ensure no crashes on cleanup
         await bot.close()
@@ -0,0 +1,177 @@
+import asyncio
+import types
+from datetime import datetime, timezone
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+
+def _ts(y, m, d, h=12):
+    return int(datetime(y, m, d, h, tzinfo=timezone.utc).timestamp())
+
+
+def run_bucket_tests():
+    from word_counter_dsc.buckets import month_start, week_start
+    from word_counter_dsc.pipeline import snowflake_seconds
+
+    # Weeks start on Monday (UTC), months on the 1st; snowflakes carry the send time
+    if week_start(_ts(2024, 6, 6)) != _ts(2024, 6, 3, 0) or week_start(_ts(2024, 6, 3, 0)) != _ts(2024, 6, 3, 0):
+        raise Exception("week_start should round back to Monday 00:00 UTC")
+    if month_start(_ts(2024, 1, 20), -1) != _ts(2023, 12, 1, 0):
+        raise Exception("month_start shift should cross the year boundary")
+    if snowflake_seconds(175928847299117063) != 1462015105:
+        raise Exception("snowflake_seconds decoded the wrong timestamp")
+    _run_snowflake_fallback_test()
+
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.buckets import compact_buckets, upsert_emoji_buckets
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.write_buffer import WordCountBuffer, purge_word_counts
+
+    async def buckets(dbx, table="word_buckets"):
+        rows = await dbx.fetchall(f"SELECT grain, bucket, SUM(count) AS n FROM {table} GROUP BY grain, bucket ORDER BY 1, 2")
+        return [(int(r["grain"]), int(r["bucket"]), int(r["n"])) for r in rows]
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        buf = WordCountBuffer(dbx, flush_interval=60, max_keys=1000)
+
+        # Daily buckets follow the message time: two old days in one week, one recent day,
+        # and a December day that ends up in a monthly bucket
+        for ts, n in ((_ts(2024, 6, 5), 2), (_ts(2024, 6, 6, 23), 3), (_ts(2024, 6, 12), 4), (_ts(2023, 12, 28), 5)):
+            buf.add(1, 10, 100, {"pizza": n}, ts)
+        buf.add(1, 11, 100, {"pizza": 1}, _ts(2024, 6, 12, 1))
+        await buf.flush()
+        got = await buckets(dbx)
+        want = [(0, _ts(2023, 12, 28, 0), 5), (0, _ts(2024, 6, 5, 0), 2), (0, _ts(2024, 6, 6, 0), 3), (0, _ts(2024, 6, 12, 0), 5)]
+        if got != want:
+            raise Exception(f"Unexpected daily buckets: {got}")
+
+        async with dbx.transaction() as tx:
+            await upsert_emoji_buckets(tx, [(1, 100, True, "cat", _ts(2024, 6, 5), 2), (1, 100, False, "🔥", _ts(2024, 6, 12), 1)])
+
+        # Defaults: 35 days daily, 26 weeks weekly, months kept forever
+        now = _ts(2024, 7, 15)
+        stats = await compact_buckets(dbx, [1], now=now)
+        got = await buckets(dbx)
+        want = [(0, _ts(2024, 6, 12, 0), 5), (1, _ts(2024, 6, 3, 0), 5), (2, _ts(2023, 12, 1, 0), 5)]
+        if got != want:
+            raise Exception(f"Unexpected buckets after compaction: {got}")
+        if await buckets(dbx, "emoji_buckets") != [(0, _ts(2024, 6, 12, 0), 1), (1, _ts(2024, 6, 3, 0), 2)]:
+            raise Exception("Emoji buckets were not compacted")
+        if stats["weeks"] != 5 or stats["months"] != 2 or await buckets(dbx, "guild_word_buckets") != want:
+            raise Exception(f"Unexpected compaction stats: {stats}")
+
+        # Running again changes nothing; totals are untouched by compaction
+        await compact_buckets(dbx, [1], now=now)
+        if await buckets(dbx) != want:
+            raise Exception("Second compaction pass was not a no-op")
+        row = await dbx.fetchone("SELECT count FROM guild_word_totals WHERE guild_id=1")
+        if int(row["count"]) != 15:
+            raise Exception(f"Totals changed: {row['count']}")
+
+        # Purged words leave no bucket rows behind
+        async with dbx.transaction() as tx:
+            await purge_word_counts(tx, 1, ["pizza"])
+        if await buckets(dbx):
+            raise Exception("Purge left word_buckets rows behind")
+
+        await buf.close()
+        await dbx.close()
+
+    asyncio.run(_run())
+
+
+def _run_snowflake_fallback_test():
+    """Messages without created_at are bucketed by their snowflake, not by arrival time."""
+    from word_counter_dsc.pipeline import IngestPipeline
+
+    class _Bot:
+        def get_cog(self, name):
+            return None
+
+    msg = types.SimpleNamespace(
+        id=175928847299117063, content="hi", author=types.SimpleNamespace(id=1, bot=False),
+        guild=types.SimpleNamespace(id=2), channel=types.SimpleNamespace(id=3), created_at=None,
+    )
+    parsed = asyncio.run(IngestPipeline(_Bot()).parse(msg))
+    if parsed is None or parsed.created_at != 1462015105:
+        raise Exception(f"Unexpected created_at: {getattr(parsed, 'created_at', None)}")
+
+
+def run_window_tests():
+    if aiosqlite is None:
+        return
+
+    import time
+
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.buckets import compact_buckets
+    from word_counter_dsc.leaderboards import top_users_for_word, top_words, user_summary, word_total
+    from word_counter_dsc.write_buffer import WordCountBuffer
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        buf = WordCountBuffer(dbx, flush_interval=60, max_keys=1000)
+        now = int(time.time())
+        day = 86400
+
+        buf.add(1, 10, 100, {"pizza": 5, "taco": 1}, now)            # today
+        buf.add(1, 10, 200, {"pizza": 2}, now - 3 * day)              # inside 7d
+        buf.add(1, 11, 200, {"pizza": 9, "taco": 4}, now - 20 * day)  # inside 30d
+        buf.add(1, 10, 300, {"pizza": 50}, now - 200 * day)           # all time only
+        buf.add(2, 20, 100, {"pizza": 7}, now)                        # other guild
+        await buf.close()
+
+        async def users(window):
+            return [(int(r["user_id"]), int(r["total"])) for r in await top_users_for_word(dbx, 1, "pizza", 10, window)]
+
+        if await users("24h") != [(100, 5)]:
+            raise Exception(f"24h leaderboard: {await users('24h')}")
+        if await users("7d") != [(100, 5), (200, 2)]:
+            raise Exception(f"7d leaderboard: {await users('7d')}")
+        if await users("30d") != [(200, 11), (100, 5)] or await users("all") != [(300, 50), (200, 11), (100, 5)]:
+            raise Exception("30d / all-time leaderboards are wrong")
+        if [await word_total(dbx, 1, "pizza", w) for w in ("24h", "30d", "all")] != [5, 16, 66]:
+            raise Exception("Windowed word totals are wrong")
+
+        # "24h" reads whole UTC days: today and all of yesterday, and says so
+        from word_counter_dsc.leaderboards import WINDOW_LABELS, window_start
+
+        noon = 1_700_000_000 - 1_700_000_000 % day + day // 2
+        if window_start("24h", noon) != noon - noon % day - day or "24 hours" in WINDOW_LABELS["24h"]:
+            raise Exception(f"24h window/label mismatch: {window_start('24h', noon)} / {WINDOW_LABELS['24h']}")
+
+        words = [(str(r["word"]), int(r["total"])) for r in await top_words(dbx, 1, 10, "30d")]
+        if words != [("pizza", 16), ("taco", 5)]:
+            raise Exception(f"Windowed /top (server): {words}")
+        words = [(str(r["word"]), int(r["total"])) for r in await top_words(dbx, 1, 10, "7d", user_id=200)]
+        if words != [("pizza", 2)]:
+            raise Exception(f"Windowed /top (user): {words}")
+        if await user_summary(dbx, 1, 200, "30d") != (15, 2) or await user_summary(dbx, 1, 300, "all") != (50, 1):
+            raise Exception("user_summary is wrong")
+
+        # Windowed reads seek on the bucket indexes instead of scanning word_buckets (once
+        # a compaction pass has refreshed the statistics of the initially empty tables)
+        await dbx.executemany(
+            "INSERT INTO word_buckets (guild_id, grain, bucket, word_id, user_id, count) VALUES (3, 0, ?, ?, ?, 1)",
+            [(now - now % day - d * day, 100 + w, u) for d in range(10) for w in range(40) for u in range(10)],
+        )
+        await compact_buckets(dbx, [1])
+        for sql, params, index in (
+            ("SELECT user_id, SUM(count) FROM word_buckets WHERE guild_id=? AND word_id=? AND grain=0 AND bucket >= ? GROUP BY user_id",
+             (1, 1, 0), "idx_word_buckets_guild_word"),
+            ("SELECT word_id, SUM(count) FROM word_buckets WHERE guild_id=? AND user_id=? AND grain=0 AND bucket >= ? GROUP BY word_id",
+             (1, 1, 0), "idx_word_buckets_guild_user"),
+        ):
+            plan = " ".join(str(r["detail"]) for r in await dbx.fetchall("EXPLAIN QUERY PLAN " + sql, params))
+            if f"COVERING INDEX {index}" not in plan:
+                raise Exception(f"Unexpected plan: {plan}")
+
+        await dbx.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+
+
+def run_config_bus_tests():
+    from word_counter_dsc.config_bus import NOTIFY_CHANNEL, SCOPE_KEYWORDS, SCOPE_STOPWORDS, ConfigBus
+
+    class FakeDBX:
+        """Stands in for Postgres LISTEN/NOTIFY: notify() fans out to every listening bus."""
+
+        def __init__(self):
+            self.listeners = []
+            self.sent = []
+
+        async def listen(self, channel, callback, on_lost=None):
+            self.listeners.append(callback)
+            return True
+
+        async def notify(self, channel, payload):
+            self.sent.append((channel, payload))
+            for cb in self.listeners:
+                cb(payload)
+
+    async def _run():
+        # Versions are per (guild, scope); a bump changes only its own
+        bus = ConfigBus()
+        v_kw, v_sw, v_other = bus.version(1, SCOPE_KEYWORDS), bus.version(1, SCOPE_STOPWORDS), bus.version(2, SCOPE_KEYWORDS)
+        if v_kw != bus.version(1, SCOPE_KEYWORDS):
+            raise Exception("Version changed without a bump")
+        await bus.bump(1, SCOPE_KEYWORDS)
+        if bus.version(1, SCOPE_KEYWORDS) == v_kw:
+            raise Exception("Bump did not change the version")
+        if bus.version(1, SCOPE_STOPWORDS) != v_sw or bus.version(2, SCOPE_KEYWORDS) != v_other:
+            raise Exception("Bump changed another guild's or scope's version")
+
+        # Two processes on one Postgres: a bump reaches the other bus once, not its own twice
+        dbx = FakeDBX()
+        a, b = ConfigBus(), ConfigBus()
+        await a.start(dbx)
+        await b.start(dbx)
+        before_a, before_b = a.version(7, SCOPE_STOPWORDS), b.version(7, SCOPE_STOPWORDS)
+        await a.bump(7, SCOPE_STOPWORDS)
+        if [c for c, _ in dbx.sent] != [NOTIFY_CHANNEL]:
+            raise Exception(f"Expected one notification: {dbx.sent}")
+        if a.version(7, SCOPE_STOPWORDS) != (before_a[0], before_a[1] + 1):
+            raise Exception("Own notification was applied a second time")
+        if b.version(7, SCOPE_STOPWORDS) == before_b:
+            raise Exception("Notification did not bump the other process")
+
+        # Malformed payloads are ignored; a lost listener invalidates every cached version
+        logging.getLogger("word_counter_dsc.config_bus").setLevel(logging.CRITICAL)
+        b._on_notify("garbage")
+        cached = b.version(3, SCOPE_KEYWORDS)
+        b._on_listener_lost()
+        if b.version(3, SCOPE_KEYWORDS) == cached:
+            raise Exception("Lost listener should advance the epoch")
+        await b.close()
+        await a.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,95 @@
+def run_emoji_tests():
+    from word_counter_dsc.benchmarks.bench_emoji import check_sequences
+    from word_counter_dsc.emoji_data import extract_emojis
+
+    # Multi-codepoint sequences (flags, keycaps, tones, ZWJ, tags) are one emoji each
+    check_sequences()
+
+    got = extract_emojis("gg 😂😂 ❤ ❤️ 🇮🇳 © ™ ▶ ⌚ 1️⃣")
+    want = ["😂", "😂", "❤", "❤️", "🇮🇳", "⌚", "1️⃣"]
+    if got != want:
+        raise Exception(f"extract_emojis mismatch: {got!r} != {want!r}")
+
+    if extract_emojis("plain ascii #1 :) <3") != []:
+        raise Exception("ASCII text must not produce emoji")
+
+    _run_emoji_index_tests()
+
+
+def _run_emoji_index_tests():
+    import asyncio
+    import logging
+    import types
+
+    try:
+        import aiosqlite  # noqa: F401
+        import discord
+        from discord.ext import commands
+    except Exception:  # pragma: no cover
+        return
+
+    from word_counter_dsc.cogs.emoji_stats import EmojiStatsCog
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.pipeline import get_pipeline
+
+    def emo(eid, name):
+        return types.SimpleNamespace(id=eid, name=name)
+
+    async def _run():
+        bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        bot.logger = logging.getLogger("test_emoji")
+        bot.dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        cog = EmojiStatsCog(bot)
+        await bot.add_cog(cog)
+
+        before = [emo(1, "pog"), emo(2, "kek"), emo(3, "sadge")]
+        guild = types.SimpleNamespace(id=5, emojis=before)
+        await cog.on_guild_join(guild)
+
+        author = types.SimpleNamespace(id=7, bot=False)
+        msg = types.SimpleNamespace(
+            id=1, author=author, guild=guild, channel=types.SimpleNamespace(id=3), created_at=None,
+            content="<:pog:1> <a:pog:1> <:oldname:2> :sadge: <:other:99> :notours:",
+        )
+        await get_pipeline(bot).ingest([msg])
+
+        async def totals():
+            rows = await bot.dbx.fetchall("SELECT emoji_name, count FROM emoji_counts WHERE guild_id=5")
+            return {str(r["emoji_name"]): int(r["count"]) for r in rows}
+
+        # Resolved by id (stale name in the message is fine); foreign emojis ignored
+        if await totals() != {"pog": 2, "kek": 1, "sadge": 1}:
+            raise Exception(f"Unexpected emoji counts: {await totals()}")
+
+        # Rename + swap: counts follow the emoji id
+        after = [emo(1, "kek"), emo(2, "pog"), emo(3, "sadcat")]
+        await bot.dbx.execute(
+            "INSERT INTO emoji_counts (guild_id, user_id, emoji_name, count, updated_at) VALUES (5, 7, 'sadcat', 4, 0)"
+        )
+        guild.emojis = after
+        await cog.on_guild_emojis_update(guild, before, after)
+        if await totals() != {"kek": 2, "pog": 1, "sadcat": 5}:
+            raise Exception(f"Rename migration lost or mixed counts: {await totals()}")
+
+        # Reactions use the cached index
+        payload = types.SimpleNamespace(guild_id=5, user_id=7, emoji=types.SimpleNamespace(id=3, name="x"))
+        await cog.on_raw_reaction_add(payload)
+        if (await totals())["sadcat"] != 6:
+            raise Exception("Reaction with a guild emoji id was not counted")
+
+        # Renamed while the bot was offline: a fresh cog finds the rename by id on join/ready
+        await bot.remove_cog(cog.qualified_name)
+        cog = EmojiStatsCog(bot)
+        await bot.add_cog(cog)
+        guild.emojis = [emo(1, "kekw"), emo(2, "pog"), emo(4, "new")]
+        await cog.on_guild_join(guild)
+        if await totals() != {"kekw": 2, "pog": 1, "sadcat": 6}:
+            raise Exception(f"Offline rename not carried over: {await totals()}")
+        stored = {int(r["emoji_id"]): str(r["name"]) for r in await bot.dbx.fetchall("SELECT * FROM guild_emojis")}
+        if stored != {1: "kekw", 2: "pog", 4: "new"}:
+            raise Exception(f"guild_emojis not kept in sync: {stored}")
+
+        await bot.close()
+        await bot.dbx.close()
+
+    asyncio.run(_run())
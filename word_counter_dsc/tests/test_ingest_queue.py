@@ -0,0 +1,97 @@
+import asyncio
+
+def run_ingest_queue_tests():
+    from word_counter_dsc.ingest_queue import IngestQueue
+
+    class FakePipeline:
+        def __init__(self):
+            self.calls = []
+            self.gate = asyncio.Event()
+
+        async def ingest(self, messages, emojis=True):
+            await self.gate.wait()
+            self.calls.append((list(messages), emojis))
+
+    async def _run():
+        # shed_emoji: messages past the threshold are queued without emoji stats, none lost
+        pipe = FakePipeline()
+        q = IngestQueue(pipe, maxsize=10, workers=1, policy="shed_emoji", batch_max=100, shed_at=0.5)
+        for i in range(10):
+            await q.submit(i)
+        if q.shed_emoji != 5 or q.depth != 10:
+            raise Exception(f"Expected 5 shed / depth 10, got {q.stats()}")
+        pipe.gate.set()
+        await q.close()
+        got = [(m, e) for msgs, e in pipe.calls for m in msgs]
+        if got != [(i, i < 5) for i in range(10)]:
+            raise Exception(f"shed_emoji processed {got}")
+
+        # sample: once full, only every Nth message gets in (and waits for space)
+        pipe = FakePipeline()
+        q = IngestQueue(pipe, maxsize=4, workers=1, policy="sample", batch_max=100, sample_every=3)
+        for i in range(4):
+            await q.submit(i)
+        overflow = [asyncio.ensure_future(q.submit(i)) for i in range(4, 10)]
+        await asyncio.sleep(0.01)
+        if q.dropped != 4:
+            raise Exception(f"Expected 4 of 6 overflow messages dropped, got {q.stats()}")
+        q.start()
+        pipe.gate.set()
+        kept = await asyncio.gather(*overflow)
+        await q.close()
+        processed = [m for msgs, _ in pipe.calls for m in msgs]
+        if kept != [False, False, True, False, False, True] or processed != [0, 1, 2, 3, 6, 9]:
+            raise Exception(f"sample kept {kept}, processed {processed}")
+
+        # fairness: a hot guild's backlog doesn't delay a quiet guild behind it
+        import types
+
+        def m(gid, i):
+            return types.SimpleNamespace(guild=types.SimpleNamespace(id=gid), n=i)
+
+        pipe = FakePipeline()
+        pipe.gate.set()
+        q = IngestQueue(pipe, maxsize=1000, workers=1, policy="block", batch_max=5, guild_inflight=1)
+        for i in range(50):
+            await q.submit(m(1, i))
+        await q.submit(m(2, 0))
+        q.start()
+        await q.close()
+        order = [(x.guild.id, x.n) for msgs, _ in pipe.calls for x in msgs]
+        if order.index((2, 0)) != 5:
+            raise Exception(f"Quiet guild should be served on the second turn, got position {order.index((2, 0))}")
+        if [n for g, n in order if g == 1] != list(range(50)):
+            raise Exception("Per-guild order must be preserved")
+
+        # block: the producer waits instead of dropping
+        pipe = FakePipeline()
+        q = IngestQueue(pipe, maxsize=2, workers=1, policy="block", batch_max=1)
+        q.start()
+        producer = asyncio.ensure_future(asyncio.gather(*(q.submit(i) for i in range(6))))
+        await asyncio.sleep(0.01)
+        if producer.done() or q.blocked == 0:
+            raise Exception("block policy should make producers wait when full")
+        pipe.gate.set()
+        await producer
+        await q.close()
+        if q.dropped or q.processed != 6:
+            raise Exception(f"block policy lost messages: {q.stats()}")
+
+        # block: waiting handlers are bounded in number and in time, the rest are dropped
+        pipe = FakePipeline()
+        q = IngestQueue(pipe, maxsize=1, workers=1, policy="block", max_waiters=2, wait_timeout=0.05)
+        await q.submit(0)
+        waiters = [asyncio.ensure_future(q.submit(i)) for i in range(1, 5)]
+        await asyncio.sleep(0.01)
+        if q.dropped != 2 or q.stats()["waiting"] != 2:
+            raise Exception(f"Expected 2 waiting and 2 dropped handlers, got {q.stats()}")
+        if await asyncio.gather(*waiters) != [False] * 4:
+            raise Exception("Handlers past the wait timeout should drop their message")
+        if q.dropped != 4 or q.timed_out != 2 or q.stats()["waiting"] != 0:
+            raise Exception(f"Unexpected counters after the wait timeout: {q.stats()}")
+        pipe.gate.set()
+        await q.close()
+        if q.processed != 1:
+            raise Exception(f"Only the queued message should be processed: {q.stats()}")
+
+    asyncio.run(_run())
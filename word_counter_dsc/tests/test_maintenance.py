@@ -0,0 +1,106 @@
+import asyncio
+import os
+import tempfile
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+
+def run_maintenance_tests():
+    from word_counter_dsc.maintenance import MaintenanceScheduler
+
+    async def _run_local():
+        # Without a DB: jittered interval loop, no overlap, metrics, clean shutdown
+        sched = MaintenanceScheduler(jitter=0.2, startup_delay=0)
+        gate = asyncio.Event()
+        calls = []
+
+        async def job():
+            calls.append(1)
+            await gate.wait()
+            return len(calls)
+
+        sched.add_job("tick", job, 0.02)
+        if sched.add_job("off", job, 0) is not None or "off" in sched.jobs:
+            raise Exception("interval 0 should disable a job")
+        await sched.start(None)
+        await asyncio.sleep(0.1)
+        if await sched.run_job("tick") or len(calls) != 1 or sched.jobs["tick"].skipped != 1:
+            raise Exception(f"A running job was started again: {sched.stats()}")
+        gate.set()
+        await asyncio.sleep(0.1)
+        s = sched.stats()["tick"]
+        if s["runs"] < 2 or s["max_ms"] < s["avg_ms"] or s["last_result"] != s["runs"]:
+            raise Exception(f"Unexpected job metrics: {s}")
+        await sched.close()
+        runs = len(calls)
+        await asyncio.sleep(0.05)
+        if len(calls) != runs or sched.jobs:
+            raise Exception("Jobs kept running after close()")
+
+    asyncio.run(_run_local())
+
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.cogs.medals import cleanup_removed_keywords
+    from word_counter_dsc.database import SQLiteDBX
+
+    async def _run_db():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+
+        # Two processes sharing a DB: only one runs the job per interval, restarts don't rerun it
+        calls = []
+
+        async def job():
+            calls.append(1)
+
+        a, b = MaintenanceScheduler(), MaintenanceScheduler()
+        for s in (a, b):
+            s.add_job("cleanup", job, 3600)
+            await s.start(dbx)  # loops wait out the startup delay; runs below are explicit
+        ran = [await a.run_job("cleanup"), await b.run_job("cleanup"), await a.run_job("cleanup")]
+        if ran != [True, False, False] or len(calls) != 1:
+            raise Exception(f"Due-time claim failed: {ran}")
+        if not await b.run_job("cleanup", force=True) or len(calls) != 2:
+            raise Exception("force=True should run regardless of the due time")
+        await a.close()
+        await b.close()
+
+        # Medal cleanup: expired removals go, recent ones and re-added keywords stay
+        await dbx.executemany(
+            "INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at) VALUES (?, ?, ?, 0, 30, 0)",
+            [(1, 10, "old"), (1, 11, "old"), (1, 10, "recent"), (1, 10, "readded"), (2, 10, "old")],
+        )
+        await dbx.executemany(
+            "INSERT INTO keyword_removals (guild_id, word, removed_at) VALUES (?, ?, ?)",
+            [(1, "old", 100), (1, "recent", 5000), (1, "readded", 100)],
+        )
+        await dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'readded', 200)")
+        if await cleanup_removed_keywords(dbx, 1000) != 2:
+            raise Exception("Expected 2 medal rows of removed keywords to be deleted")
+        left = sorted((int(r["guild_id"]), str(r["word"])) for r in await dbx.fetchall("SELECT guild_id, word FROM keyword_medals"))
+        removals = [str(r["word"]) for r in await dbx.fetchall("SELECT word FROM keyword_removals")]
+        if left != [(1, "readded"), (1, "recent"), (2, "old")] or removals != ["recent"]:
+            raise Exception(f"Unexpected cleanup result: {left} / {removals}")
+        await dbx.close()
+
+        # Vacuum only rewrites the file once enough of it is free
+        with tempfile.TemporaryDirectory() as tmp:
+            dbx = await SQLiteDBX(sqlite_path=os.path.join(tmp, "wc.db")).init()
+            if (await dbx.vacuum(0.25))["vacuumed"]:
+                raise Exception("Vacuumed a file without free pages")
+            await dbx.executemany(
+                "INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at) VALUES (1, ?, ?, 0, 1, 0)",
+                [(u, "x" * 200) for u in range(5000)],
+            )
+            await dbx.execute("DELETE FROM keyword_medals")
+            result = await dbx.vacuum(0.25)
+            after = await dbx.fetchone("PRAGMA freelist_count")
+            if not result["vacuumed"] or int(after[0]) != 0:
+                raise Exception(f"Expected a VACUUM: {result}")
+            await dbx.close()
+
+    asyncio.run(_run_db())
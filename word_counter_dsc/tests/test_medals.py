@@ -0,0 +1,180 @@
+import asyncio
+
+try:
+    import aiosqlite  # type: ignore
+    import discord  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+
+def run_medal_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.cogs.medals import (
+        KeywordSeed,
+        add_medal_progress,
+        crossed_threshold,
+        next_threshold,
+        recompute_tiers,
+        tier_for_count,
+    )
+    from word_counter_dsc.config import MEDAL_THRESHOLDS
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.write_buffer import WordCountBuffer
+
+    t0, t1 = MEDAL_THRESHOLDS[0], MEDAL_THRESHOLDS[1]
+    if (tier_for_count(t0 - 1), tier_for_count(t0), tier_for_count(10**9)) != (-1, 0, len(MEDAL_THRESHOLDS) - 1):
+        raise Exception("tier_for_count boundaries are wrong")
+    if next_threshold(t0) != t1 or next_threshold(10**9) is not None:
+        raise Exception("next_threshold is wrong")
+    # Several occurrences in one message: only the highest threshold crossed is announced
+    if crossed_threshold(t0 - 1, t1) != t1 or crossed_threshold(t0, t1 - 1) is not None:
+        raise Exception("crossed_threshold is wrong")
+
+    async def medals(dbx):
+        rows = await dbx.fetchall("SELECT user_id, word, tier, total_count FROM keyword_medals ORDER BY 1, 2")
+        return [(int(r["user_id"]), str(r["word"]), int(r["tier"]), int(r["total_count"])) for r in rows]
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+
+        # Seeding a new keyword starts from the word totals, flushed in the same transaction
+        buf = WordCountBuffer(dbx)
+        buf.add(1, 10, 100, {"pizza": t0 + 1, "taco": 3}, 1000)
+        buf.add(1, 10, 200, {"pizza": 2}, 1000)
+        seed = KeywordSeed(1, [], ["pizza"])
+        await seed.scan(dbx)
+        await buf.flush(then=lambda tx: seed.apply(tx, 1000))
+        await buf.close()
+        if await medals(dbx) != [(100, "pizza", 0, t0 + 1), (200, "pizza", -1, 2)]:
+            raise Exception(f"Unexpected seeded medals: {await medals(dbx)}")
+
+        # Seeds follow the live matcher (aliases, inflections, keyword/alias collisions), add onto
+        # progress that live hits recorded first, and pick up words first seen after the scan
+        buf = WordCountBuffer(dbx)
+        buf.add(1, 10, 100, {"fuck": 2, "fucking": 3, "tf": 1}, 1000)
+        await buf.flush()
+        seed = KeywordSeed(1, ["pizza"], ["fuck", "tf"])
+        await seed.scan(dbx)
+        buf.add(1, 10, 100, {"wtf": 4}, 1000)
+        async with dbx.transaction() as tx:
+            await add_medal_progress(tx, {(1, 100, "fuck"): 1}, 1000)
+        await buf.flush(then=lambda tx: seed.apply(tx, 1000))
+        await buf.close()
+        got = [m for m in await medals(dbx) if m[1] != "pizza"]
+        if got != [(100, "fuck", tier_for_count(10), 10), (100, "tf", tier_for_count(1), 1)]:
+            raise Exception(f"Seed did not follow matcher semantics: {got}")
+        await dbx.execute("DELETE FROM keyword_medals WHERE word <> 'pizza'")
+
+        # One statement updates every (user, keyword) and returns the new totals
+        deltas = {(1, 100, "pizza"): t1 - t0 - 1, (1, 200, "pizza"): 1, (1, 300, "pizza"): t0}
+        async with dbx.transaction() as tx:
+            rows = await add_medal_progress(tx, deltas, 2000)
+        got = {(int(r["user_id"]), int(r["tier"]), int(r["total_count"])) for r in rows}
+        if got != {(100, 1, t1), (200, -1, 3), (300, 0, t0)}:
+            raise Exception(f"Unexpected RETURNING rows: {got}")
+        crossed = {int(r["user_id"]): crossed_threshold(int(r["total_count"]) - deltas[(1, int(r["user_id"]), "pizza")], int(r["total_count"])) for r in rows}
+        if crossed != {100: t1, 200: None, 300: t0}:
+            raise Exception(f"Unexpected threshold crossings: {crossed}")
+
+        # awarded_at only moves when the tier does
+        async with dbx.transaction() as tx:
+            await add_medal_progress(tx, {(1, 100, "pizza"): 1}, 3000)
+        row = await dbx.fetchone("SELECT awarded_at FROM keyword_medals WHERE user_id=100")
+        if int(row["awarded_at"]) != 2000:
+            raise Exception("awarded_at changed without a tier change")
+
+        # Stored tiers from older thresholds are fixed in bulk, once per thresholds hash
+        await dbx.execute("UPDATE keyword_medals SET tier = 5 WHERE user_id IN (100, 200)")
+        await dbx.execute(
+            "INSERT INTO keyword_medals (guild_id, user_id, word, tier, total_count, awarded_at) VALUES (2, 100, 'taco', -1, ?, 0)",
+            (t1,),
+        )
+        if await recompute_tiers(dbx, "v1") != 3:
+            raise Exception("Expected 3 stale tiers to be recomputed")
+        if [m[2] for m in await medals(dbx)] != [tier_for_count(m[3]) for m in await medals(dbx)]:
+            raise Exception(f"Tiers not recomputed: {await medals(dbx)}")
+        await dbx.execute("UPDATE keyword_medals SET tier = 5 WHERE user_id=300")
+        if await recompute_tiers(dbx, "v1") != 0:
+            raise Exception("Recompute should not run again for the same thresholds hash")
+
+        await dbx.close()
+
+    asyncio.run(_run())
+    asyncio.run(_run_add_keywords())
+
+
+async def _run_add_keywords():
+    """/keyword add: every hit is counted once, whether a message lands during the seed's flush
+    (parsed without the keyword) or right after the config bump (counted live)."""
+    import logging
+    import types
+
+    from discord.ext import commands
+
+    from word_counter_dsc.cogs.keyword import KeywordCog
+    from word_counter_dsc.cogs.medals import MedalsCog
+    from word_counter_dsc.cogs.tracker import TrackerCog
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.pipeline import get_pipeline
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    bot.logger = logging.getLogger("test_medals")
+    bot.dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+    tracker, keywords = TrackerCog(bot), KeywordCog(bot)
+    for cog in (tracker, MedalsCog(bot), keywords):
+        await bot.add_cog(cog)
+    pipeline = get_pipeline(bot)
+    guild = types.SimpleNamespace(id=1, emojis=[])
+
+    async def say(i, text):
+        msg = types.SimpleNamespace(
+            id=1_000 + i, content=text, author=types.SimpleNamespace(id=100, bot=False),
+            guild=guild, channel=types.SimpleNamespace(id=10), created_at=None,
+        )
+        await pipeline.ingest([msg], live=False)
+
+    await say(0, "fuck fucking")  # buffered before the keyword exists (also warms the caches)
+
+    real_flush = tracker.buffer.flush
+
+    async def flush(then=None):
+        if then is None:
+            return await real_flush()
+
+        async def interleaved(tx):
+            # Lands in the buffer after the flush snapshot (a task: it must not wait on this tx)
+            pending.append(asyncio.create_task(say(1, "wtf")))
+            await asyncio.sleep(0.05)
+            await then(tx)
+
+        return await real_flush(then=interleaved)
+
+    pending = []
+
+    real_changed = keywords._config_changed
+
+    async def changed(gid, scope):
+        await real_changed(gid, scope)
+        await say(2, "fuck")  # parsed right after the bump: counted live
+
+    tracker.buffer.flush, keywords._config_changed = flush, changed
+
+    class Response:
+        async def defer(self, **kwargs):
+            pass
+
+    async def followup(*args, **kwargs):
+        pass
+
+    interaction = types.SimpleNamespace(guild_id=1, response=Response(), followup=types.SimpleNamespace(send=followup))
+    await KeywordCog.add_keywords.callback(keywords, interaction, "fuck")
+    await asyncio.gather(*pending)
+    await say(3, "fucks")
+    row = await bot.dbx.fetchone("SELECT total_count FROM keyword_medals WHERE guild_id=1 AND user_id=100 AND word='fuck'")
+    if row is None or int(row["total_count"]) != 5:
+        raise Exception(f"Keyword hits around /keyword add were lost or double-counted: {row and dict(row)}")
+
+    await bot.close()
+    await bot.dbx.close()
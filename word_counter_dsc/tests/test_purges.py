@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import types
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+
+def run_purge_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.cogs.stopwords import StopwordsCog
+    from word_counter_dsc.database import WORD_COUNT_TABLES, SQLiteDBX
+    from word_counter_dsc.leaderboards import top_words, word_total
+    from word_counter_dsc.maintenance import MaintenanceScheduler
+    from word_counter_dsc.purges import _purge_chunk, cancel_word_purges, purge_progress, queue_word_purges, run_word_purges
+    from word_counter_dsc.write_buffer import WordCountBuffer
+
+    async def rows_for(dbx, word, guild_id):
+        n = 0
+        for table in WORD_COUNT_TABLES:
+            row = await dbx.fetchone(
+                f"SELECT COUNT(*) AS n FROM {table} WHERE guild_id=? AND word_id=(SELECT word_id FROM words WHERE word=?)",
+                (guild_id, word),
+            )
+            n += int(row["n"])
+        return n
+
+    async def words(dbx, guild_id):
+        return {str(r["word"]) for r in await top_words(dbx, guild_id, 10)} | {
+            str(r["word"]) for r in await top_words(dbx, guild_id, 10, "30d")
+        }
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        buf = WordCountBuffer(dbx)
+        for cid in range(5):
+            for uid in range(4):
+                buf.add(1, cid, uid, {"lol": 2, "pizza": 1}, 1_700_000_000 + cid * 86400)
+                buf.add(2, cid, uid, {"lol": 1}, 1_700_000_000)
+        await buf.close()
+
+        # A server stopword disappears from reads at commit; its rows are still there
+        async with dbx.transaction() as tx:
+            await queue_word_purges(tx, 1, ["lol", "never-counted"])
+        if "lol" in await words(dbx, 1) or await word_total(dbx, 1, "lol") != 0:
+            raise Exception("Queued word is still visible")
+        if await word_total(dbx, 2, "lol") != 20 or await rows_for(dbx, "lol", 1) == 0:
+            raise Exception("Queuing a purge changed data it should not have")
+        progress = [(str(r["word"]), int(r["deleted"])) for r in await purge_progress(dbx, 1)]
+        if progress != [("lol", 0)]:
+            raise Exception(f"Unexpected purge progress: {progress}")
+
+        # The job deletes in small chunks until nothing is left, then drops the queue entry
+        stats = await run_word_purges(dbx, chunk_rows=3, pause=0)
+        if await rows_for(dbx, "lol", 1) or stats["words"] != 1 or stats["rows"] < 20:
+            raise Exception(f"Purge incomplete: {stats}")
+        if await purge_progress(dbx, 1) or await words(dbx, 1) != {"pizza"} or await rows_for(dbx, "lol", 2) == 0:
+            raise Exception("Purge touched the wrong rows or left its queue entry behind")
+
+        # Core stopword changes only queue the purge at startup; every guild is covered
+        await dbx.apply_core_stopwords(["lol"], "test-hash")
+        if await word_total(dbx, 2, "lol") != 0 or await rows_for(dbx, "lol", 2) == 0:
+            raise Exception("Core stopword purge should hide counts now and delete them later")
+        if [bool(r["all_guilds"]) for r in await purge_progress(dbx, 2)] != [True]:
+            raise Exception("Core purge should be reported as an all-servers purge")
+        await run_word_purges(dbx, chunk_rows=3, pause=0)
+        if await rows_for(dbx, "lol", 2) or await dbx.fetchall("SELECT * FROM word_purges"):
+            raise Exception("Core stopword purge incomplete")
+
+        # Removing a stopword before its purge ran cancels the purge: counts come back and are kept
+        class Response:
+            async def send_message(self, *args, **kwargs):
+                pass
+
+        bot = types.SimpleNamespace(
+            dbx=dbx, logger=logging.getLogger("test"), maintenance=MaintenanceScheduler(), get_cog=lambda name: None
+        )
+        cog = StopwordsCog(bot)
+        cog._start_purge = lambda: None  # keep the purge queued, as if the job had not got to it yet
+        interaction = types.SimpleNamespace(guild_id=1, response=Response())
+        await StopwordsCog.add_sw.callback(cog, interaction, "pizza")
+        if await word_total(dbx, 1, "pizza") != 0:
+            raise Exception("Added stopword is still visible")
+        await StopwordsCog.remove_sw.callback(cog, interaction, "pizza")
+        await run_word_purges(dbx, chunk_rows=3, pause=0)
+        if await word_total(dbx, 1, "pizza") != 20 or await rows_for(dbx, "pizza", 1) == 0:
+            raise Exception("Removed stopword's counts were hidden or purged")
+
+        # A run already working on a purge stops once it is cancelled
+        async with dbx.transaction() as tx:
+            await queue_word_purges(tx, 1, ["pizza"])
+        pizza = int((await dbx.fetchone("SELECT word_id FROM words WHERE word='pizza'"))["word_id"])
+        if await _purge_chunk(dbx, "word_counts", 1, pizza, 1) != 1:
+            raise Exception("Expected one chunk of a queued purge to be deleted")
+        async with dbx.transaction() as tx:
+            await cancel_word_purges(tx, 1, ["pizza"])
+        if await _purge_chunk(dbx, "word_counts", 1, pizza, 1) is not None:
+            raise Exception("Cancelled purge kept deleting")
+
+        # With the purge job disabled, a kick works through the queue directly
+        async with dbx.transaction() as tx:
+            await queue_word_purges(tx, 1, ["pizza"])
+        cog = StopwordsCog(bot)
+        bot.maintenance.add_job("word-purge", cog._run_purges, 0)  # PURGE_INTERVAL_SECONDS <= 0
+        cog._start_purge()
+        await cog._purge_kick
+        if await rows_for(dbx, "pizza", 1) or await dbx.fetchall("SELECT * FROM word_purges"):
+            raise Exception("Purge did not run with the job disabled")
+
+        await dbx.close()
+
+    asyncio.run(_run())
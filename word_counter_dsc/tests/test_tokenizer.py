@@ -0,0 +1,80 @@
+def run_tokenizer_tests():
+    from collections import Counter
+
+    from word_counter_dsc.utils import compile_abbreviations, tokenize, tokenize_expanded
+
+    rules = {"wtf": "what the fuck", "lol": "laughing out loud", "gg": "good game"}
+    table = compile_abbreviations(rules)
+
+    # Single-pass expansion must count the same words as appending expansions and re-tokenizing.
+    for text in ("WTF lol, that was GG", "gg gg gg", "nothing to expand", "", "wtf’s up"):
+        tokens0 = tokenize(text)
+        expansions = [rules[t] for t in tokens0 if t in rules]
+        legacy = tokenize(text + " " + " ".join(expansions)) if expansions else tokens0
+        got = tokenize_expanded(text, table)
+        if Counter(got) != Counter(legacy):
+            raise Exception(f"Abbreviation expansion mismatch for {text!r}: {got} vs {legacy}")
+
+    if tokenize_expanded("lol", {}) != ["lol"]:
+        raise Exception("Empty abbreviation table should behave like tokenize()")
+
+    # ASCII fast path + memoization must match the original NFKC-everywhere tokenizer.
+    from word_counter_dsc.benchmarks.bench_tokenize import build_corpus, check_equivalence
+
+    check_equivalence(build_corpus(3000, seed=11, unicode_share=0.5))
+
+    # Keyword matcher: same hits as build_keyword_regex for inside-word mode, whole tokens for mode 0
+    import re
+
+    from word_counter_dsc.utils import KeywordMatcher, build_keyword_regex
+
+    aliases = {"fuck": ["wtf", "tf"]}
+    m1 = KeywordMatcher(["fuck", "pizza"], aliases, match_mode=1)
+    text = "abso-fucking-lutely, WTF fucks pizzas pizza dessert tf"
+    counts = Counter(tokenize(text))
+    hits = m1.find(counts)
+    rx = build_keyword_regex("fuck", aliases["fuck"])
+    if hits["fuck"] != len(rx.findall(text)) or hits["pizza"] != len(build_keyword_regex("pizza").findall(text)):
+        raise Exception(f"Matcher hits differ from build_keyword_regex: {hits}")
+    if m1.match_token("assfuck") is not None:
+        raise Exception("Matches must start at a token boundary")
+
+    m0 = KeywordMatcher(["fuck", "pizza"], aliases, match_mode=0)
+    if m0.find(counts) != Counter({"fuck": 2, "pizza": 1}):
+        raise Exception(f"Whole-token matcher mismatch: {m0.find(counts)}")
+
+    # Count modes: UNIQUE dedupes before normalization, CAPPED clamps per message
+    from word_counter_dsc.utils import apply_count_mode
+
+    spam = "lol LOL lol " * 5000 + "pizza pizza"
+    if tokenize(spam, unique=True) != ["lol", "pizza"]:
+        raise Exception(f"unique tokenize mismatch: {tokenize(spam, unique=True)}")
+    counts = Counter(tokenize(spam))
+    if apply_count_mode(counts, "UNIQUE") != Counter({"lol": 1, "pizza": 1}):
+        raise Exception("UNIQUE should count each token once")
+    if apply_count_mode(counts, "CAPPED", 3) != Counter({"lol": 3, "pizza": 2}):
+        raise Exception("CAPPED should clamp to the cap")
+    if apply_count_mode(counts, "ALL") != counts:
+        raise Exception("ALL should keep every occurrence")
+
+    # A word that is both a keyword and another keyword's alias counts towards itself,
+    # whatever the hash seed (the keyword set is a frozenset)
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    probe = (
+        "from collections import Counter\n"
+        "from word_counter_dsc.utils import KeywordMatcher\n"
+        "m = KeywordMatcher(['fuck', 'wtf', 'a', 'b'], {'fuck': ['wtf'], 'a': ['x'], 'b': ['x']})\n"
+        "print(dict(sorted(m.find(Counter({'wtf': 1, 'x': 1})).items())))\n"
+    )
+    repo_root = str(Path(__file__).resolve().parents[2])
+    seen = set()
+    for seed in ("0", "1", "2", "3", "42", "1234"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=repo_root)
+        out = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True)
+        seen.add(out.stdout.strip())
+    if seen != {"{'a': 1, 'wtf': 1}"}:
+        raise Exception(f"Keyword/alias collision depends on the hash seed: {seen}")
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import types
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+
+def run_tracker_tests():
+    if aiosqlite is None:
+        return
+
+    import word_counter_dsc.cogs.tracker as tracker_mod
+    from word_counter_dsc.cogs.tracker import TrackerCog
+    from word_counter_dsc.database import SQLiteDBX
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        bot = types.SimpleNamespace(dbx=dbx, logger=logging.getLogger("test_tracker"))
+        cog = TrackerCog(bot)
+        await dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'fuck', 0)")
+
+        # Count modes apply to keyword hits too: several tokens can hit one keyword
+        text = "fuck fucking fucks wtf fuck"
+        saved = tracker_mod.COUNT_MODE, tracker_mod.COUNT_CAP
+        try:
+            for mode, cap, want in (("ALL", 3, 5), ("UNIQUE", 3, 1), ("CAPPED", 2, 2)):
+                tracker_mod.COUNT_MODE, tracker_mod.COUNT_CAP = mode, cap
+                counts, hits = await cog.count_message(1, text)
+                if hits != {"fuck": want}:
+                    raise Exception(f"{mode}: unexpected keyword hits {dict(hits)} (word counts {dict(counts)})")
+        finally:
+            tracker_mod.COUNT_MODE, tracker_mod.COUNT_CAP = saved
+
+        # Caches are reused until the config bus bumps their (guild, scope)
+        from word_counter_dsc.config_bus import SCOPE_ABBREVIATIONS, SCOPE_KEYWORDS, SCOPE_STOPWORDS
+
+        await cog.count_message(1, "pizza brb")
+        await dbx.execute("INSERT INTO stopwords (guild_id, word, created_at) VALUES (1, 'pizza', 0)")
+        await dbx.execute("INSERT INTO abbreviations (guild_id, abbreviation, expansion, created_at) VALUES (1, 'brb', 'be right back', 0)")
+        await dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'taco', 0)")
+        counts, hits = await cog.count_message(1, "pizza brb taco")
+        if "pizza" not in counts or "back" in counts or hits:
+            raise Exception(f"Caches were reloaded without a bump: {dict(counts)} {dict(hits)}")
+        for scope in (SCOPE_STOPWORDS, SCOPE_ABBREVIATIONS, SCOPE_KEYWORDS):
+            await cog.bus.bump(2, scope)  # another guild: no effect here
+        if (await cog.count_message(1, "pizza brb taco"))[1]:
+            raise Exception("Another guild's bump invalidated this guild's caches")
+        for scope in (SCOPE_STOPWORDS, SCOPE_ABBREVIATIONS, SCOPE_KEYWORDS):
+            await cog.bus.bump(1, scope)
+        counts, hits = await cog.count_message(1, "pizza brb taco")
+        if "pizza" in counts or "back" not in counts or hits != {"taco": 1}:
+            raise Exception(f"Bump did not invalidate the caches: {dict(counts)} {dict(hits)}")
+
+        await dbx.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,201 @@
+import asyncio
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+def run_transaction_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.database import SQLiteDBX
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+
+        # executemany inserts every row
+        await dbx.executemany(
+            "INSERT INTO keywords (guild_id, word, created_at) VALUES (?, ?, ?)",
+            [(1, w, 0) for w in ("alpha", "beta", "gamma")],
+        )
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM keywords WHERE guild_id=1")
+        if int(row["n"]) != 3:
+            raise Exception(f"executemany inserted {row['n']} rows, expected 3")
+
+        # transaction commits everything together
+        async with dbx.transaction() as tx:
+            await tx.executemany("DELETE FROM keywords WHERE guild_id=? AND word=?", [(1, "alpha"), (1, "beta")])
+            await tx.execute("INSERT INTO stopwords (guild_id, word, created_at) VALUES (1, 'alpha', 0)")
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM keywords WHERE guild_id=1")
+        if int(row["n"]) != 1:
+            raise Exception("transaction did not commit its deletes")
+
+        # ... and rolls back on error
+        try:
+            async with dbx.transaction() as tx:
+                await tx.execute("DELETE FROM keywords WHERE guild_id=1")
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM keywords WHERE guild_id=1")
+        if int(row["n"]) != 1:
+            raise Exception("transaction did not roll back on error")
+
+        # writes from other tasks wait for the open transaction instead of committing it early
+        async def writer():
+            await dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (2, 'late', 0)")
+
+        try:
+            async with dbx.transaction() as tx:
+                await tx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (2, 'early', 0)")
+                task = asyncio.create_task(writer())
+                await asyncio.sleep(0.05)
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+        await task
+        rows = await dbx.fetchall("SELECT word FROM keywords WHERE guild_id=2")
+        if [str(r["word"]) for r in rows] != ["late"]:
+            raise Exception(f"Concurrent write leaked into transaction: {[tuple(r) for r in rows]}")
+
+        await dbx.close()
+
+    asyncio.run(_run())
+
+
+def run_sqlite_wal_tests():
+    if aiosqlite is None:
+        return
+
+    # RETURNING and conditional upserts need SQLite 3.35+; older libraries fail at startup
+    from word_counter_dsc.database import check_sqlite_version
+
+    check_sqlite_version()
+    try:
+        check_sqlite_version((3, 34, 1))
+    except RuntimeError as e:
+        if "3.35.0" not in str(e):
+            raise Exception(f"Unclear SQLite version error: {e}")
+    else:
+        raise Exception("SQLite 3.34 should be rejected")
+
+    import os
+    import tempfile
+
+    from word_counter_dsc.database import SQLiteDBX
+
+    async def _run():
+        with tempfile.TemporaryDirectory() as tmp:
+            dbx = await SQLiteDBX(sqlite_path=os.path.join(tmp, "wc.db"), read_pool_size=2).init()
+            row = await dbx.fetchone("PRAGMA journal_mode")
+            if str(row[0]).lower() != "wal":
+                raise Exception(f"Expected WAL journal mode, got {row[0]}")
+            if len(dbx._reader_conns) != 2:
+                raise Exception("Read pool was not opened")
+
+            await dbx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'a', 0)")
+
+            # Readers are not blocked by an open write transaction and only see committed rows
+            async with dbx.transaction() as tx:
+                await tx.execute("INSERT INTO keywords (guild_id, word, created_at) VALUES (1, 'b', 0)")
+                rows = await asyncio.wait_for(dbx.fetchall("SELECT word FROM keywords WHERE guild_id=1"), 2)
+                if [str(r["word"]) for r in rows] != ["a"]:
+                    raise Exception(f"Reader saw uncommitted data: {[tuple(r) for r in rows]}")
+            row = await dbx.fetchone("SELECT COUNT(*) AS n FROM keywords WHERE guild_id=1")
+            if int(row["n"]) != 2:
+                raise Exception("Committed write not visible to readers")
+
+            # Read-only connections refuse writes
+            try:
+                async with dbx._read_conn() as conn:
+                    await conn.execute("DELETE FROM keywords")
+                raise Exception("Read pool connection accepted a write")
+            except aiosqlite.OperationalError:
+                pass
+
+            await dbx.close()
+
+    asyncio.run(_run())
+
+
+def run_migration_tests():
+    if aiosqlite is None:
+        return
+
+    import os
+    import tempfile
+
+    from word_counter_dsc.database import SCHEMA_SQLITE, SCHEMA_VERSION, SQLiteDBX
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        if await dbx.schema_version() != SCHEMA_VERSION:
+            raise Exception("schema_version not recorded after init")
+        rows = await dbx.fetchall("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='word_counts'")
+        names = {str(r["name"]) for r in rows}
+        for idx in ("idx_word_counts_guild_word", "idx_word_counts_guild_user", "idx_word_counts_word"):
+            if idx not in names:
+                raise Exception(f"Missing index {idx}")
+
+        # Already at the latest version: nothing re-runs
+        if await dbx.run_migrations():
+            raise Exception("Migrations re-applied on an up-to-date database")
+
+        plan = await dbx.fetchall(
+            "EXPLAIN QUERY PLAN SELECT user_id, SUM(count) FROM word_counts WHERE guild_id=? AND word_id=? GROUP BY user_id",
+            (1, 1),
+        )
+        detail = " ".join(str(r["detail"]) for r in plan)
+        if "guild_id=?" not in detail or "word_id=?" not in detail:
+            raise Exception(f"Rank query does not seek on (guild_id, word_id): {detail}")
+        await dbx.close()
+
+        # A database from before versioning (text word columns) is converted with its counts intact
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "legacy.db")
+            async with aiosqlite.connect(path) as conn:
+                await conn.executescript(SCHEMA_SQLITE)
+                await conn.executemany(
+                    "INSERT INTO word_counts (guild_id, channel_id, user_id, word, count, updated_at) VALUES (?, ?, ?, ?, ?, 0)",
+                    [(1, 10, 100, "pizza", 3), (1, 11, 100, "pizza", 4), (1, 10, 200, "taco", 2), (2, 20, 100, "pizza", 5)],
+                )
+                await conn.commit()
+
+            dbx = await SQLiteDBX(sqlite_path=path).init()
+            if await dbx.schema_version() != SCHEMA_VERSION:
+                raise Exception("Legacy database was not migrated")
+            row = await dbx.fetchone("SELECT COUNT(*) AS n FROM words")
+            if int(row["n"]) != 2:
+                raise Exception(f"Expected 2 interned words, got {row['n']}")
+            rows = await dbx.fetchall(
+                "SELECT guild_id, user_id, word, count FROM user_word_totals JOIN words USING (word_id) ORDER BY 1, 2, 3"
+            )
+            if [tuple(r) for r in rows] != [(1, 100, "pizza", 7), (1, 200, "taco", 2), (2, 100, "pizza", 5)]:
+                raise Exception(f"Unexpected totals after migration: {[tuple(r) for r in rows]}")
+            sql = await dbx.fetchone("SELECT sql FROM sqlite_master WHERE name='word_counts'")
+            if "WITHOUT ROWID" not in str(sql["sql"]) or "word_id" not in str(sql["sql"]):
+                raise Exception(f"word_counts not rebuilt on word_id: {sql['sql']}")
+            await dbx.close()
+
+        # A migration that fails part-way leaves neither its DDL nor a version bump behind
+        import word_counter_dsc.database as database
+
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        broken = (SCHEMA_VERSION + 1, "test", {"sqlite": ["CREATE TABLE half_done (x INTEGER)", "CREATE INDEX nope ON missing (x)"]})
+        database.MIGRATIONS.append(broken)
+        try:
+            await dbx.run_migrations()
+        except Exception:
+            pass
+        else:
+            raise Exception("Broken migration did not fail")
+        finally:
+            database.MIGRATIONS.remove(broken)
+        if await dbx.fetchone("SELECT name FROM sqlite_master WHERE name='half_done'") is not None:
+            raise Exception("DDL of a failed migration was committed")
+        if await dbx.schema_version() != SCHEMA_VERSION:
+            raise Exception("Failed migration bumped schema_version")
+        await dbx.close()
+
+    asyncio.run(_run())
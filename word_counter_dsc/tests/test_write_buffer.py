@@ -0,0 +1,143 @@
+import asyncio
+
+try:
+    import aiosqlite  # type: ignore
+except Exception:  # pragma: no cover
+    aiosqlite = None
+
+def run_write_buffer_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.write_buffer import WordCountBuffer, purge_word_counts
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        buf = WordCountBuffer(dbx, flush_interval=60, max_keys=1000)
+
+        # 50 messages from the same user/channel collapse into 2 keys
+        for i in range(50):
+            buf.add(1, 10, 100, {"hello": 1, "world": 2}, 1000 + i)
+
+        if buf.depth != 2:
+            raise Exception(f"Expected 2 buffered keys, got {buf.depth}")
+        if buf.pending_total(1, 100, "world") != 100:
+            raise Exception("pending_total should include buffered increments")
+
+        written = await buf.flush()
+        if written != 2 or buf.depth != 0:
+            raise Exception(f"Flush wrote {written} keys, depth after flush {buf.depth}")
+        if buf.pending_total(1, 100, "world") != 0:
+            raise Exception("pending_total should drop once increments are committed")
+
+        # A second flush adds on top of the stored rows
+        buf.add(1, 10, 100, {"hello": 3}, 2000)
+        await buf.close()
+
+        row = await dbx.fetchone(
+            "SELECT count, updated_at FROM word_counts JOIN words USING (word_id) "
+            "WHERE guild_id=1 AND channel_id=10 AND user_id=100 AND word='hello'"
+        )
+        if int(row["count"]) != 53 or int(row["updated_at"]) != 2000:
+            raise Exception(f"Unexpected row after flushes: {tuple(row)}")
+
+        stats = buf.stats()
+        if stats["flushes"] != 2 or stats["last_flush_keys"] != 1:
+            raise Exception(f"Unexpected buffer stats: {stats}")
+
+        # A word purged while a flush is waiting for the write lock is not written back
+        # after the purge (as /keyword remove does: purge, then discard).
+        buf.add(1, 10, 100, {"hello": 4, "gone": 5}, 3000)
+        async with dbx.transaction() as tx:
+            flushing = asyncio.create_task(buf.flush())
+            await asyncio.sleep(0.05)
+            await purge_word_counts(tx, 1, ["gone"])
+        if buf.discard(1, ["gone"]) != 1 or buf.pending_total(1, 100, "gone") != 0:
+            raise Exception("discard should drop the in-flight key")
+        if await flushing != 1:
+            raise Exception("Flush should only write the keys that were not discarded")
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM word_counts JOIN words USING (word_id) WHERE word='gone'")
+        if int(row["n"]) != 0:
+            raise Exception("Discarded in-flight counts were upserted after the purge")
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM word_buckets JOIN words USING (word_id) WHERE word='gone'")
+        if int(row["n"]) != 0:
+            raise Exception("Discarded in-flight buckets were upserted after the purge")
+
+        # A failed flush does not requeue words that were discarded meanwhile
+        async def fail(tx):
+            buf.discard(1, ["gone"])
+            raise RuntimeError("boom")
+
+        buf.add(1, 10, 100, {"hello": 1, "gone": 1}, 4000)
+        try:
+            await buf.flush(then=fail)
+        except RuntimeError:
+            pass
+        else:
+            raise Exception("Flush should re-raise the failure")
+        if buf.depth != 1 or buf.pending_total(1, 100, "gone") != 0 or buf.pending_total(1, 100, "hello") != 1:
+            raise Exception(f"Requeue after a failed flush brought discarded words back: {buf._pending}")
+        await buf.flush()
+
+        await dbx.close()
+
+    asyncio.run(_run())
+
+
+def run_rollup_tests():
+    if aiosqlite is None:
+        return
+
+    from word_counter_dsc.database import SQLiteDBX
+    from word_counter_dsc.write_buffer import WordCountBuffer, purge_word_counts
+
+    async def totals(dbx):
+        users = await dbx.fetchall("SELECT guild_id, user_id, word, count FROM user_word_totals JOIN words USING (word_id) ORDER BY 1, 2, 3")
+        guilds = await dbx.fetchall("SELECT guild_id, word, count FROM guild_word_totals JOIN words USING (word_id) ORDER BY 1, 2")
+        return [tuple(r) for r in users], [tuple(r) for r in guilds]
+
+    async def _run():
+        dbx = await SQLiteDBX(sqlite_path=":memory:").init()
+        buf = WordCountBuffer(dbx, flush_interval=60, max_keys=1000)
+
+        # Same user in two channels, plus a second user and a second guild
+        buf.add(1, 10, 100, {"pizza": 2, "taco": 1}, 1000)
+        buf.add(1, 11, 100, {"pizza": 3}, 1001)
+        buf.add(1, 10, 200, {"pizza": 1}, 1002)
+        buf.add(2, 20, 100, {"pizza": 7}, 1003)
+        await buf.flush()
+        buf.add(1, 10, 100, {"pizza": 4}, 1004)
+        await buf.flush()
+
+        users, guilds = await totals(dbx)
+        if users != [(1, 100, "pizza", 9), (1, 100, "taco", 1), (1, 200, "pizza", 1), (2, 100, "pizza", 7)]:
+            raise Exception(f"Unexpected user_word_totals: {users}")
+        if guilds != [(1, "pizza", 10), (1, "taco", 1), (2, "pizza", 7)]:
+            raise Exception(f"Unexpected guild_word_totals: {guilds}")
+
+        # A rebuild from word_counts reproduces the incrementally maintained rollups
+        await dbx.execute("UPDATE user_word_totals SET count = 0")
+        await dbx.execute("DELETE FROM guild_word_totals WHERE guild_id=1")
+        await dbx.rebuild_rollups(1)
+        users_after, guilds_after = await totals(dbx)
+        if guilds_after != guilds or users_after[:3] != users[:3] or users_after[3][3] != 0:
+            raise Exception(f"Guild rebuild mismatch: {users_after} / {guilds_after}")
+        await dbx.rebuild_rollups()
+        if await totals(dbx) != (users, guilds):
+            raise Exception("Full rebuild did not restore the rollups")
+
+        # Purges remove the word from the base table and both rollups, for that guild only
+        async with dbx.transaction() as tx:
+            await purge_word_counts(tx, 1, ["pizza"])
+        users, guilds = await totals(dbx)
+        if users != [(1, 100, "taco", 1), (2, 100, "pizza", 7)] or guilds != [(1, "taco", 1), (2, "pizza", 7)]:
+            raise Exception(f"Purge left rollup rows behind: {users} / {guilds}")
+        row = await dbx.fetchone("SELECT COUNT(*) AS n FROM word_counts JOIN words USING (word_id) WHERE guild_id=1 AND word='pizza'")
+        if int(row["n"]) != 0:
+            raise Exception("Purge left word_counts rows behind")
+
+        await buf.close()
+        await dbx.close()
+
+    asyncio.run(_run())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import re
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, Iterable, List, Sequence, Tuple
 
 ZWSP = "\u200b"
@@ -14,6 +16,12 @@ _TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z0-9]+)*|[\u0900-\u097F]+",
 # Examples: they'd -> they, he'll -> he, it's -> it, can't -> can (handles n't as 't')
 _CONTRACTION_RE = re.compile(r"^([a-z]+)(?:'(?:d|ll|ve|re|m|s|t))$", re.IGNORECASE)
 
+# Leading/trailing non-word chars (apostrophes inside a token are kept).
+_EDGE_PUNCT_RE = re.compile(r"^[^\w\u0900-\u097F']+|[^\w\u0900-\u097F']+$")
+
+# Upper bound on memoized normalize_word() results (chat vocabulary repeats heavily).
+NORMALIZE_CACHE_SIZE = 65536
+
 # --- Lightweight Porter Stemmer (for English) ---
 # Based on the original Porter stemming algorithm; implemented here to avoid extra deps.
 # Only applied to simple ASCII a-z words.
@@ -206,15 +214,27 @@ def normalize_word(w: str) -> str:
     - Case-fold (LOVE/Love/LoVe -> love)
     - Strip surrounding punctuation/symbols
     - Collapse common contractions to the base word (they'd -> they)
+
+    Pure-ASCII input skips Unicode normalization, and results are memoized in a
+    bounded LRU (NORMALIZE_CACHE_SIZE) since chat reuses the same tokens constantly.
     """
     if not w:
         return ""
-    w = unicodedata.normalize("NFKC", w)
-    w = w.replace("’", "'").replace("‘", "'")
-    w = w.casefold()
+    return _normalize_word_cached(w)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_word_cached(w: str) -> str:
+    if w.isascii():
+        # NFKC and the curly-quote swap are no-ops on ASCII, and casefold() == lower().
+        w = w.lower()
+    else:
+        w = unicodedata.normalize("NFKC", w)
+        w = w.replace("’", "'").replace("‘", "'")
+        w = w.casefold()
 
     # strip leading/trailing non-word chars (keep apostrophes inside)
-    w = re.sub(r"^[^\w\u0900-\u097F']+|[^\w\u0900-\u097F']+$", "", w)
+    w = _EDGE_PUNCT_RE.sub("", w)
 
     # collapse contractions (latin)
     m = _CONTRACTION_RE.match(w)
@@ -271,18 +291,87 @@ def stem_word(w: str) -> str:
             w = w[:-1]
     return w
 
-def tokenize(s: str) -> List[str]:
-    """Tokenize to normalized tokens (case-insensitive, punctuation-tolerant)."""
+def tokenize(s: str, unique: bool = False) -> List[str]:
+    """Tokenize to normalized tokens (case-insensitive, punctuation-tolerant).
+
+    With ``unique=True`` each distinct token is returned once, in first-seen order.
+    Repeated words are dropped before the regex scan and normalization, so a pasted
+    "lol lol lol ..." costs a split plus work per *distinct* token.
+    """
     s = normalize_text(s)
     if not s:
         return []
-    s = unicodedata.normalize("NFKC", s).replace("’", "'").replace("‘", "'")
+    if not s.isascii():
+        # Pure-ASCII chat (the common case) is already NFKC-normal; skip the pass.
+        s = unicodedata.normalize("NFKC", s).replace("’", "'").replace("‘", "'")
+    if unique:
+        # Tokens never span whitespace, so repeated chunks can be dropped before the regex scan.
+        s = " ".join(dict.fromkeys(s.split()))
     raw = _TOKEN_RE.findall(s)
+    if unique:
+        raw = dict.fromkeys(raw)
     out: List[str] = []
     for t in raw:
-        nt = normalize_word(t)
+        nt = _normalize_word_cached(t)
         if nt:
             out.append(nt)
+    if unique:
+        # Different spellings can normalize to the same token ("LOL", "lol").
+        out = list(dict.fromkeys(out))
+    return out
+
+
+COUNT_MODES = ("ALL", "UNIQUE", "CAPPED")
+
+
+def apply_count_mode(counts: Counter, mode: str, cap: int = 1) -> Counter:
+    """Apply a per-message counting mode to occurrence counts.
+
+    ALL keeps every occurrence, UNIQUE counts each item once per message and
+    CAPPED counts at most ``cap`` per message. Unknown modes behave like ALL.
+    """
+    if mode == "UNIQUE":
+        return Counter(dict.fromkeys(counts, 1))
+    if mode == "CAPPED":
+        cap = max(1, int(cap))
+        return Counter({k: min(c, cap) for k, c in counts.items() if c > 0})
+    return counts
+
+
+# abbreviation -> normalized expansion tokens
+AbbrevTable = Dict[str, Tuple[str, ...]]
+
+
+def compile_abbreviations(rules: Dict[str, str]) -> AbbrevTable:
+    """Pre-tokenize a guild's abbreviation rules (abbr -> expansion phrase) once.
+
+    The result is what tokenize_expanded() expects; build it when the rules change,
+    not per message.
+    """
+    table: AbbrevTable = {}
+    for abbr, expansion in rules.items():
+        if abbr:
+            table[abbr] = tuple(tokenize(expansion))
+    return table
+
+
+def tokenize_expanded(s: str, table: AbbrevTable | None, unique: bool = False) -> List[str]:
+    """tokenize() plus inline abbreviation expansion in the same pass.
+
+    Each token is kept and, if it is an abbreviation, followed by its pre-tokenized
+    expansion (lol -> lol, laugh, out, loud). The message is only normalized and
+    scanned once regardless of how many rules the guild has. ``unique`` is passed to
+    tokenize(); expansions may still repeat a token, so apply the count mode after.
+    """
+    tokens = tokenize(s, unique=unique)
+    if not table or not tokens:
+        return tokens
+    out: List[str] = []
+    for t in tokens:
+        out.append(t)
+        exp = table.get(t)
+        if exp:
+            out.extend(exp)
     return out
 def split_csv_words(s: str) -> List[str]:
     """Split a user input string into normalized words (comma/space/newline separated)."""
@@ -345,6 +434,87 @@ def count_keyword_occurrences(message: str, keyword: str, aliases: Sequence[str]
     alias_norm = [stem_word(a) for a in (aliases or []) if stem_word(a)]
     allowed = set([kw, *alias_norm])
     return sum(1 for t in tokens if t in allowed)
+
+_MATCH_END = "\0"  # trie node key marking "a keyword/alias ends here"
+
+
+class KeywordMatcher:
+    """Compiled multi-pattern matcher for a guild's keywords (+ KEYWORD_ALIASES).
+
+    Keywords and aliases are stored in one character trie, so every token is checked
+    against all patterns with a single walk instead of one regex / stem pass per
+    keyword. Semantics follow build_keyword_regex(): a hit starts at a token boundary,
+    and with match_mode=1 the token may continue past the pattern (fucks, fucking,
+    abso-fucking-lutely); with match_mode=0 the token must equal the keyword or alias.
+    When several patterns match the same token the longest one wins.
+
+    Build one per guild when its keywords change and reuse it for every message.
+    """
+
+    __slots__ = ("keywords", "match_mode", "_root")
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        aliases: Dict[str, Sequence[str]] | None = None,
+        match_mode: int = 1,
+    ):
+        self.keywords = frozenset(k for k in keywords if k)
+        self.match_mode = int(match_mode)
+        self._root: dict = {}
+        aliases = aliases or {}
+        # Keywords go in before any alias, so a word that is both a keyword and another
+        # keyword's alias counts towards itself. Sorted, so alias collisions between two
+        # keywords resolve the same way in every process (frozenset order is hash-seeded).
+        ordered = sorted(self.keywords)
+        for kw in ordered:
+            self._insert(kw, kw)
+        for kw in ordered:
+            for alias in aliases.get(kw, ()):
+                self._insert(alias, kw)
+
+    def _insert(self, pattern: str, kw: str) -> None:
+        p = normalize_word(pattern)
+        if not p:
+            return
+        node = self._root
+        for ch in p:
+            node = node.setdefault(ch, {})
+        # On a collision keep the first owner.
+        node.setdefault(_MATCH_END, kw)
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def match_token(self, token: str) -> str | None:
+        """Return the keyword a single normalized token counts towards, if any."""
+        node = self._root
+        best = None
+        for ch in token:
+            node = node.get(ch)
+            if node is None:
+                break
+            if self.match_mode >= 1:
+                best = node.get(_MATCH_END, best)
+        else:
+            if self.match_mode < 1:
+                best = node.get(_MATCH_END)
+        return best
+
+    def find(self, counts: Dict[str, int]) -> Counter:
+        """Keyword hits for a message given its token counts ({token: occurrences}).
+
+        Each distinct token is walked once, so repeated tokens cost nothing extra.
+        """
+        hits: Counter = Counter()
+        if not self._root:
+            return hits
+        for token, c in counts.items():
+            kw = self.match_token(token)
+            if kw is not None:
+                hits[kw] += c
+        return hits
+
 def user_mention(user_id: int) -> str:
     """Return a mention string. Use AllowedMentions.none() when sending to avoid pings."""
     return f"<@{int(user_id)}>"
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from word_counter_dsc.config import WORD_ID_CACHE_SIZE
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit.
+_CHUNK = 500
+
+
+class WordIds:
+    """Word text -> integer ``word_id`` from the ``words`` dictionary, with an in-process LRU cache.
+
+    Ids are never reassigned or deleted (purges remove counts, not dictionary entries), so a
+    cached id stays valid for the life of the database and across processes. Resolve ids on
+    the DBX itself, before opening a write transaction: new dictionary rows are committed
+    immediately, so a rolled-back transaction can't leave the cache holding ids that don't exist.
+    """
+
+    def __init__(self, dbx: Any, max_size: int = WORD_ID_CACHE_SIZE):
+        self.dbx = dbx
+        self.max_size = max(1, int(max_size))
+        self._ids: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, word: str, word_id: int) -> None:
+        self._ids[word] = word_id
+        self._ids.move_to_end(word)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    async def _select(self, words: list[str], out: dict[str, int]) -> None:
+        for i in range(0, len(words), _CHUNK):
+            chunk = words[i : i + _CHUNK]
+            rows = await self.dbx.fetchall(
+                "SELECT word_id, word FROM words WHERE word IN (" + ",".join(["?"] * len(chunk)) + ")",
+                tuple(chunk),
+            )
+            for r in rows:
+                w, wid = str(r["word"]), int(r["word_id"])
+                out[w] = wid
+                self._remember(w, wid)
+
+    async def lookup(self, words: Iterable[str], create: bool = False) -> dict[str, int]:
+        """Ids for ``words``. Unknown words are added when ``create`` is set, otherwise left out."""
+        out: dict[str, int] = {}
+        missing: list[str] = []
+        for w in {str(w) for w in words}:
+            wid = self._ids.get(w)
+            if wid is None:
+                missing.append(w)
+            else:
+                self._ids.move_to_end(w)
+                out[w] = wid
+        self.hits += len(out)
+        self.misses += len(missing)
+        if not missing:
+            return out
+
+        await self._select(missing, out)
+        new = [w for w in missing if w not in out]
+        if new and create:
+            # Insert only words that are really new: on Postgres a conflicting insert still
+            # consumes an identity value.
+            await self.dbx.executemany(
+                "INSERT INTO words (word) VALUES (?) ON CONFLICT(word) DO NOTHING",
+                [(w,) for w in new],
+            )
+            await self._select(new, out)
+        return out
+
+    async def get(self, word: str, create: bool = False) -> Optional[int]:
+        return (await self.lookup([word], create=create)).get(str(word))
+
+    def stats(self) -> dict[str, int]:
+        return {"cached": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+def get_word_ids(dbx: Any) -> WordIds:
+    """Return the DBX's WordIds cache, attaching one on first use."""
+    cache = getattr(dbx, "word_ids", None)
+    if cache is None:
+        cache = WordIds(dbx)
+        dbx.word_ids = cache
+    return cache
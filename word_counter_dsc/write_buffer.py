@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Optional
+
+from word_counter_dsc.buckets import day_start, upsert_word_buckets
+from word_counter_dsc.config import WRITE_BUFFER_FLUSH_SECONDS, WRITE_BUFFER_MAX_KEYS
+from word_counter_dsc.database import WORD_COUNT_TABLES
+from word_counter_dsc.word_ids import get_word_ids
+
+logger = logging.getLogger("word_counter_dsc.write_buffer")
+
+# (guild_id, channel_id, user_id, word)
+WordKey = tuple[int, int, int, str]
+# (guild_id, user_id, word, day)
+BucketKey = tuple[int, int, str, int]
+
+_UPSERT_SQL = """
+INSERT INTO word_counts (guild_id, channel_id, user_id, word_id, count, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, channel_id, user_id, word_id)
+DO UPDATE SET count = word_counts.count + excluded.count,
+              updated_at = excluded.updated_at
+"""
+
+
+_UPSERT_USER_TOTALS_SQL = """
+INSERT INTO user_word_totals (guild_id, user_id, word_id, count, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, user_id, word_id)
+DO UPDATE SET count = user_word_totals.count + excluded.count,
+              updated_at = excluded.updated_at
+"""
+
+_UPSERT_GUILD_TOTALS_SQL = """
+INSERT INTO guild_word_totals (guild_id, word_id, count, updated_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(guild_id, word_id)
+DO UPDATE SET count = guild_word_totals.count + excluded.count,
+              updated_at = excluded.updated_at
+"""
+
+
+async def resolve_word_ids(
+    dbx: Any,
+    rows: Iterable[tuple[int, int, int, str, int, int]],
+    bucket_rows: Iterable[tuple[int, int, str, int, int]] = (),
+) -> tuple[list[tuple[int, int, int, int, int, int]], list[tuple[int, int, int, int, int]]]:
+    """Swap the word text for its word_id in count rows and daily bucket rows.
+
+    ``rows`` are (guild_id, channel_id, user_id, word, count, updated_at) and ``bucket_rows``
+    (guild_id, user_id, word, day, count); the results are ready for upsert_word_counts()
+    and buckets.upsert_word_buckets(). Call on the DBX before opening the write transaction
+    (new words are committed to the ``words`` dictionary right away; see WordIds).
+    """
+    rows, bucket_rows = list(rows), list(bucket_rows)
+    if not rows and not bucket_rows:
+        return [], []
+    words = [r[3] for r in rows] + [b[2] for b in bucket_rows]
+    ids = await get_word_ids(dbx).lookup(words, create=True)
+    return (
+        [(gid, cid, uid, ids[w], c, ts) for gid, cid, uid, w, c, ts in rows],
+        [(gid, uid, ids[w], day, c) for gid, uid, w, day, c in bucket_rows],
+    )
+
+
+async def upsert_word_counts(tx: Any, rows: Iterable[tuple[int, int, int, int, int, int]]) -> None:
+    """Add (guild_id, channel_id, user_id, word_id, count, updated_at) rows onto word_counts and its rollups.
+
+    ``tx`` should be a transaction handle so the base rows and the user/guild totals
+    commit together; callers can add their own statements to the same commit (the
+    backfill stores its watermark there). Get word ids from resolve_word_ids() first.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    per_user: dict[tuple[int, int, int], list[int]] = {}
+    per_guild: dict[tuple[int, int], list[int]] = {}
+    for gid, _cid, uid, wid, c, ts in rows:
+        for agg, key in ((per_user, (gid, uid, wid)), (per_guild, (gid, wid))):
+            slot = agg.get(key)
+            if slot is None:
+                agg[key] = [c, ts]
+            else:
+                slot[0] += c
+                slot[1] = max(slot[1], ts)
+
+    await tx.executemany(_UPSERT_SQL, rows)
+    await tx.executemany(_UPSERT_USER_TOTALS_SQL, [(g, u, w, c, ts) for (g, u, w), (c, ts) in per_user.items()])
+    await tx.executemany(_UPSERT_GUILD_TOTALS_SQL, [(g, w, c, ts) for (g, w), (c, ts) in per_guild.items()])
+
+
+async def purge_word_counts(tx: Any, guild_id: int, words: Iterable[str]) -> None:
+    """Delete a guild's counts for ``words`` from word_counts, the rollups and the time buckets."""
+    pairs = [(int(guild_id), str(w)) for w in words]
+    if not pairs:
+        return
+    for table in WORD_COUNT_TABLES:
+        await tx.executemany(
+            f"DELETE FROM {table} WHERE guild_id=? AND word_id = (SELECT word_id FROM words WHERE word=?)",
+            pairs,
+        )
+
+
+class WordCountBuffer:
+    """Write-behind aggregation buffer for ``word_counts`` upserts.
+
+    Increments are summed in memory per (guild, channel, user, word), and per (guild, user,
+    word, day of the message) for the daily buckets, and written with ``executemany`` upserts
+    in one transaction (word_counts, its user/guild rollups and word_buckets), so DB write
+    volume follows the number of distinct keys rather than the number of messages. A
+    background task
+    flushes every ``flush_interval`` seconds, or as soon as ``max_keys`` distinct keys
+    are pending.
+    """
+
+    def __init__(
+        self,
+        dbx: Any,
+        flush_interval: float = WRITE_BUFFER_FLUSH_SECONDS,
+        max_keys: int = WRITE_BUFFER_MAX_KEYS,
+    ):
+        self.dbx = dbx
+        self.flush_interval = max(0.1, float(flush_interval))
+        self.max_keys = max(1, int(max_keys))
+
+        # key -> [count, updated_at]
+        self._pending: dict[WordKey, list[int]] = {}
+        # Snapshot currently being written (still counted by pending_total()).
+        self._inflight: dict[WordKey, list[int]] = {}
+        # (guild_id, user_id, word, day) -> count for word_buckets, snapshotted with _pending
+        self._buckets: dict[BucketKey, int] = {}
+        self._inflight_buckets: dict[BucketKey, int] = {}
+        # (guild_id, user_id, word) -> increments not yet committed (pending + inflight)
+        self._user_word: dict[tuple[int, int, str], int] = {}
+
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self.last_flush_ms: float = 0.0
+        self.last_flush_keys: int = 0
+        self.max_flush_ms: float = 0.0
+        self.flushes: int = 0
+        self.flush_failures: int = 0
+        self.increments: int = 0
+
+    # ---------------------------
+    # Producer side
+    # ---------------------------
+    def add(self, guild_id: int, channel_id: int, user_id: int, counts: Mapping[str, int], ts: int) -> None:
+        """Buffer per-word increments for one message sent at ``ts``. Never touches the DB."""
+        gid, cid, uid, ts = int(guild_id), int(channel_id), int(user_id), int(ts)
+        day = day_start(ts)
+        for w, c in counts.items():
+            c = int(c)
+            if c <= 0:
+                continue
+            key = (gid, cid, uid, str(w))
+            slot = self._pending.get(key)
+            if slot is None:
+                self._pending[key] = [c, ts]
+            else:
+                slot[0] += c
+                if ts > slot[1]:
+                    slot[1] = ts
+            bk = (gid, uid, str(w), day)
+            self._buckets[bk] = self._buckets.get(bk, 0) + c
+            uw = (gid, uid, str(w))
+            self._user_word[uw] = self._user_word.get(uw, 0) + c
+            self.increments += c
+
+        if len(self._pending) >= self.max_keys:
+            self._wake.set()
+
+    def discard(self, guild_id: int, words: Iterable[str]) -> int:
+        """Drop pending increments for words that were just purged (new stopwords, removed keywords)."""
+        gid = int(guild_id)
+        ws = {str(w) for w in words}
+        dropped = 0
+        # The in-flight snapshot too: a flush that has not written it yet leaves these keys out.
+        for keys in (self._pending, self._inflight):
+            drop = [k for k in keys if k[0] == gid and k[3] in ws]
+            for key in drop:
+                c, _ts = keys.pop(key)
+                self._forget(gid, key[2], key[3], c)
+            dropped += len(drop)
+        for buckets in (self._buckets, self._inflight_buckets):
+            for bk in [k for k in buckets if k[0] == gid and k[2] in ws]:
+                del buckets[bk]
+        return dropped
+
+    def _forget(self, guild_id: int, user_id: int, word: str, count: int) -> None:
+        uw = (guild_id, user_id, word)
+        left = self._user_word.get(uw, 0) - count
+        if left > 0:
+            self._user_word[uw] = left
+        else:
+            self._user_word.pop(uw, None)
+
+    def pending_total(self, guild_id: int, user_id: int, word: str) -> int:
+        """Increments for (guild, user, word) that are not committed to the DB yet."""
+        return self._user_word.get((int(guild_id), int(user_id), str(word)), 0)
+
+    def pending_words(self, guild_id: int) -> list[tuple[int, str, int]]:
+        """(user_id, word, count) for a guild's increments that are not committed yet."""
+        gid = int(guild_id)
+        return [(uid, w, c) for (g, uid, w), c in self._user_word.items() if g == gid]
+
+    @property
+    def depth(self) -> int:
+        """Number of distinct keys waiting for the next flush."""
+        return len(self._pending)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "inflight": len(self._inflight),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "last_flush_keys": self.last_flush_keys,
+            "increments": self.increments,
+        }
+
+    # ---------------------------
+    # Flushing
+    # ---------------------------
+    async def flush(self, then: Optional[Callable[[Any], Awaitable[Any]]] = None) -> int:
+        """Write all pending increments. Returns the number of keys written.
+
+        ``then(tx)`` runs in the same transaction after the upserts (or in its own when nothing
+        is pending), so it reads exactly the counts committed so far; increments buffered
+        meanwhile wait for the next flush.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                if then is not None:
+                    async with self.dbx.transaction() as tx:
+                        await then(tx)
+                return 0
+
+            self._inflight, self._pending = self._pending, {}
+            self._inflight_buckets, self._buckets = self._buckets, {}
+            items = list(self._inflight.items())
+            bucket_items = list(self._inflight_buckets.items())
+            t0 = time.perf_counter()
+            try:
+                rows, bucket_rows = await resolve_word_ids(
+                    self.dbx,
+                    [(gid, cid, uid, w, c, ts) for (gid, cid, uid, w), (c, ts) in items],
+                    [(gid, uid, w, day, c) for (gid, uid, w, day), c in bucket_items],
+                )
+                async with self.dbx.transaction() as tx:
+                    # discard() may have dropped keys while the ids were resolved or the write
+                    # lock was awaited; those words were purged and must not be written back.
+                    rows = [r for (k, _), r in zip(items, rows) if k in self._inflight]
+                    bucket_rows = [r for (k, _), r in zip(bucket_items, bucket_rows) if k in self._inflight_buckets]
+                    await upsert_word_counts(tx, rows)
+                    await upsert_word_buckets(tx, bucket_rows)
+                    if then is not None:
+                        await then(tx)
+            except BaseException:
+                self.flush_failures += 1
+                self._requeue_inflight()
+                raise
+
+            written = list(self._inflight.items())
+            for (gid, _cid, uid, w), (c, _ts) in written:
+                self._forget(gid, uid, w, c)
+            self._inflight = {}
+            self._inflight_buckets = {}
+
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.last_flush_keys = len(written)
+            self.flushes += 1
+            logger.debug("Flushed %d word_counts keys in %.1f ms", len(written), elapsed_ms)
+            return len(written)
+
+    def _requeue_inflight(self) -> None:
+        # Merge the failed snapshot back so the next flush retries it (minus keys that
+        # discard() already dropped from it).
+        for key, (c, ts) in self._inflight.items():
+            slot = self._pending.get(key)
+            if slot is None:
+                self._pending[key] = [c, ts]
+            else:
+                slot[0] += c
+                slot[1] = max(slot[1], ts)
+        for bk, c in self._inflight_buckets.items():
+            self._buckets[bk] = self._buckets.get(bk, 0) + c
+        self._inflight = {}
+        self._inflight_buckets = {}
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="word-count-flusher")
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Word count flush failed; %d keys kept for retry", self.depth)
+
+    async def close(self) -> None:
+        """Stop the background task and flush whatever is still buffered."""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                pass
+            self._task = None
+        await self.flush()